@@ -0,0 +1,107 @@
+"""
+Auth benchmark - login throughput versus latency of unrelated endpoints
+Run from the backend directory: python -m benchmarks.bench_auth
+
+Starts the API with uvicorn once per hashing mode (inline on the event loop,
+then the process pool), drives concurrent logins and meanwhile probes
+GET /health. With inline hashing every probe waits behind password hashes;
+with the pool the probe latency stays close to idle.
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+SIGNUP = {
+    "email": "bench@example.edu",
+    "password": "correct horse battery staple",
+    "name": "Bench",
+    "programming_experience": "beginner",
+    "hardware_experience": "none",
+    "primary_interest": "ai",
+}
+
+
+def p99(timings):
+    timings = sorted(timings)
+    return timings[min(len(timings) - 1, math.ceil(len(timings) * 0.99) - 1)] if timings else 0.0
+
+
+async def wait_ready(client: httpx.AsyncClient, path: str = "/health"):
+    for _ in range(100):
+        try:
+            await client.get(path)
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def drive(base_url: str, concurrency: int, duration: float):
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        await wait_ready(client)
+        await client.post("/api/auth/signup", json=SIGNUP)
+        login = {"email": SIGNUP["email"], "password": SIGNUP["password"]}
+        deadline = time.monotonic() + duration
+        logins, rejected, probes = 0, 0, []
+
+        async def login_loop():
+            nonlocal logins, rejected
+            while time.monotonic() < deadline:
+                response = await client.post("/api/auth/login", json=login)
+                if response.status_code == 503:
+                    rejected += 1
+                    await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+                else:
+                    logins += 1
+
+        async def probe_loop():
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                await client.get("/health")
+                probes.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0.02)
+
+        await asyncio.gather(probe_loop(), *(login_loop() for _ in range(concurrency)))
+        return logins / duration, rejected, statistics.median(probes), p99(probes)
+
+
+def run(concurrency: int, duration: float, port: int, workers):
+    print(f"{'hash_workers':>12} {'logins/s':>9} {'503s':>6} {'health_p50_ms':>14} {'health_p99_ms':>14}")
+    for hash_workers in workers:
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                "USER_DB_PATH": os.path.join(directory, "users.sqlite3"),
+                "PASSWORD_HASH_WORKERS": str(hash_workers),
+                "CORPUS_POLL_INTERVAL": "0",
+            }
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                env=env
+            )
+            try:
+                rate, rejected, p50, tail = asyncio.run(drive(f"http://127.0.0.1:{port}", concurrency, duration))
+            finally:
+                server.terminate()
+                server.wait()
+        label = "inline" if hash_workers == 0 else str(hash_workers)
+        print(f"{label:>12} {rate:>9.1f} {rejected:>6} {p50:>14.1f} {tail:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, os.cpu_count() or 1])
+    args = parser.parse_args()
+    run(args.concurrency, args.duration, args.port, args.workers)
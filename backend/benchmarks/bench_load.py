@@ -0,0 +1,200 @@
+"""
+Load benchmark - Throughput and latency of the API against a fake LLM provider
+Run from the backend directory: python -m benchmarks.bench_load
+
+Starts benchmarks/fake_llm.py and the API (uvicorn), with every provider
+pointed at the fake. For each scenario and concurrency level it runs a closed
+loop of requests and reports requests/sec and p50/p95/p99 latency. The answer
+and content caches are defeated (TTL 0, unique content), so every chat and
+translate request reaches the provider router; each request also carries a
+unique suffix so concurrent identical requests are not coalesced.
+
+    python -m benchmarks.bench_load --scenarios chat translate --concurrency 1 16 64
+    python -m benchmarks.bench_load --rate-limit groq=0.2 --latency groq=0.3,gemini=0.8
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.bench_auth import SIGNUP, wait_ready
+from benchmarks.fake_llm import add_arguments
+
+QUESTIONS = [
+    "What is ROS 2 and how do nodes communicate?",
+    "How does a humanoid robot keep its balance while walking?",
+    "Explain the difference between Gazebo and Isaac Sim.",
+    "What sensors does a robot use for SLAM?",
+    "How are vision-language-action models trained?",
+    "What is the role of URDF in robot simulation?",
+]
+
+PARAGRAPH = (
+    "A ROS 2 node is a process that performs computation. Nodes publish messages "
+    "to topics and subscribe to the topics other nodes publish, so a perception "
+    "node can feed a planner without either knowing about the other."
+)
+
+SCENARIOS = ("chat", "chat_stream", "translate", "login")
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, math.ceil(len(values) * q) - 1))] if values else 0.0
+
+
+def question(i: int) -> str:
+    return f"{QUESTIONS[i % len(QUESTIONS)]} (request {i})"
+
+
+async def send(client: httpx.AsyncClient, scenario: str, i: int) -> int:
+    if scenario == "chat":
+        response = await client.post("/api/chat/", json={"question": question(i)})
+        return response.status_code
+    if scenario == "chat_stream":
+        async with client.stream(
+            "POST", "/api/chat/stream", json={"question": question(i)}
+        ) as response:
+            async for _ in response.aiter_bytes():
+                pass
+            return response.status_code
+    if scenario == "translate":
+        response = await client.post(
+            "/api/content/translate", json={"content": f"{PARAGRAPH} ({i})", "target_language": "urdu"}
+        )
+        return response.status_code
+    if scenario == "login":
+        response = await client.post(
+            "/api/auth/login", json={"email": SIGNUP["email"], "password": SIGNUP["password"]}
+        )
+        return response.status_code
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+async def run_level(client: httpx.AsyncClient, scenario: str, concurrency: int, duration: float) -> Dict:
+    deadline = time.monotonic() + duration
+    timings: List[float] = []
+    statuses: Dict[int, int] = {}
+    counter = iter(range(10 ** 9))
+
+    async def worker():
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                status = await send(client, scenario, next(counter))
+            except httpx.TransportError:
+                status = 0
+            timings.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.monotonic()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.monotonic() - started
+    ok = sum(count for status, count in statuses.items() if 200 <= status < 300)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(timings),
+        "rps": round(len(timings) / elapsed, 1),
+        "ok": ok,
+        "rejected_429": statuses.get(429, 0),
+        "errors": len(timings) - ok - statuses.get(429, 0),
+        "p50_ms": round(percentile(timings, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(timings, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(timings, 0.99) * 1000, 1),
+        "statuses": statuses,
+    }
+
+
+async def drive(base_url: str, fake_url: str, scenarios, levels, duration: float) -> List[Dict]:
+    results = []
+    limits = httpx.Limits(max_connections=max(levels) + 8, max_keepalive_connections=max(levels) + 8)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client, \
+            httpx.AsyncClient(base_url=fake_url) as fake:
+        await wait_ready(client)
+        await wait_ready(fake, "/stats")
+        if "login" in scenarios:
+            await client.post("/api/auth/signup", json=SIGNUP)
+
+        print(f"{'scenario':>12} {'conc':>5} {'req':>6} {'req/s':>8} {'429':>5} {'err':>5} "
+              f"{'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8}")
+        for scenario in scenarios:
+            await send(client, scenario, -1)  # warm up
+            for concurrency in levels:
+                await fake.post("/stats/reset")
+                result = await run_level(client, scenario, concurrency, duration)
+                result["provider_calls"] = (await fake.get("/stats")).json()
+                results.append(result)
+                print(f"{scenario:>12} {concurrency:>5} {result['requests']:>6} {result['rps']:>8.1f} "
+                      f"{result['rejected_429']:>5} {result['errors']:>5} {result['p50_ms']:>8.1f} "
+                      f"{result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f}")
+                # Let the breakers and queues settle between levels
+                await asyncio.sleep(1.0)
+    return results
+
+
+def fake_arguments(args) -> List[str]:
+    return [
+        "--latency", args.latency, "--sigma", str(args.sigma), "--rate-limit", args.rate_limit,
+        "--retry-after", str(args.retry_after), "--tokens", str(args.tokens),
+        "--token-interval", str(args.token_interval),
+    ]
+
+
+def run(args) -> List[Dict]:
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            **os.environ,
+            "GROQ_BASE_URL": f"{fake_url}/groq/v1",
+            "OPENAI_BASE_URL": f"{fake_url}/openai/v1",
+            "GEMINI_BASE_URL": f"{fake_url}/gemini/v1beta",
+            "GROQ_API_KEY": "fake",
+            "GEMINI_API_KEY": "fake",
+            "OPENAI_API_KEY": "fake",
+            "ANSWER_CACHE_TTL": "0",
+            "CORPUS_POLL_INTERVAL": "0",
+            "USER_DB_PATH": os.path.join(directory, "users.sqlite3"),
+            "CHAT_DB_PATH": os.path.join(directory, "chat.sqlite3"),
+            "CONTENT_CACHE_PATH": os.path.join(directory, "content_cache.sqlite3"),
+        }
+        fake = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.fake_llm", "--port", str(args.fake_port), *fake_arguments(args)]
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+            env=env
+        )
+        try:
+            return asyncio.run(drive(
+                f"http://127.0.0.1:{args.port}", fake_url, args.scenarios, args.concurrency, args.duration
+            ))
+        finally:
+            for process in (server, fake):
+                process.terminate()
+                process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=["chat", "translate", "login"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario and level")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fake-port", type=int, default=8790)
+    parser.add_argument("--json", help="also write the results to this file")
+    add_arguments(parser)
+    args = parser.parse_args()
+    results = run(args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
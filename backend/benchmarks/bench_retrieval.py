@@ -0,0 +1,221 @@
+"""
+Retrieval benchmark - quality and scaling of chapter and chunk retrieval
+Run from the backend directory: python -m benchmarks.bench_retrieval > retrieval.json
+
+Quality: recall@1/3/5 and MRR of RAGService.search_relevant_chapters over
+the labeled questions in benchmarks/retrieval_questions.py, per retrieval
+mode, on the built-in chapters.
+
+Scaling: the built-in chapters plus synthetic sections (1k, 10k, 100k by
+default) are written as a markdown corpus. Each (size, mode) is measured in
+a fresh process so peak RSS is its own: corpus load and index build time,
+memory, chapter search and context build latency, and the labeled recall
+with the synthetic sections as distractors.
+
+Tables go to stderr, JSON to stdout (or --output). With --baseline, the run
+is compared against an earlier JSON file and exits with status 1 when
+recall, MRR or p95 latency regress past the tolerances.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.retrieval_questions import QUESTIONS
+from benchmarks.synthetic_corpus import generate_chapters, topic_term
+from services.corpus_store import CorpusStore, export_builtin, write_chapter
+
+MODES = ("keyword", "dense", "hybrid")
+RECALL_AT = (1, 3, 5)
+MRR_DEPTH = 10
+
+
+def log(message: str = ""):
+    print(message, file=sys.stderr)
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile_ms(timings: List[float], q: float) -> float:
+    timings = sorted(timings)
+    return round(timings[min(len(timings) - 1, max(0, int(len(timings) * q + 0.5) - 1))] * 1000, 3)
+
+
+def evaluate(rag, questions=QUESTIONS) -> Dict:
+    """recall@k (share of each question's relevant chapters in the top k, averaged) and MRR@10."""
+    recall = {k: 0.0 for k in RECALL_AT}
+    reciprocal_ranks = 0.0
+    for question, relevant in questions:
+        ranked = [hit["chapter"] for hit in rag.search_relevant_chapters(question, limit=MRR_DEPTH)]
+        for k in RECALL_AT:
+            recall[k] += len(set(ranked[:k]) & set(relevant)) / len(relevant)
+        rank = next((i for i, chapter in enumerate(ranked, 1) if chapter in relevant), None)
+        reciprocal_ranks += 1 / rank if rank else 0.0
+    result = {f"recall@{k}": round(recall[k] / len(questions), 4) for k in RECALL_AT}
+    result["mrr"] = round(reciprocal_ranks / len(questions), 4)
+    return result
+
+
+def latency(fn, queries: List[str], repeats: int) -> Dict:
+    fn(queries[0])  # warm caches once
+    timings = []
+    for _ in range(repeats):
+        for query in queries:
+            start = time.perf_counter()
+            fn(query)
+            timings.append(time.perf_counter() - start)
+    return {"p50_ms": round(statistics.median(timings) * 1000, 3), "p95_ms": percentile_ms(timings, 0.95)}
+
+
+def write_corpus(directory: str, sections: int) -> int:
+    """Built-in chapters plus `sections` synthetic ones, numbered from module 101 so ids never clash."""
+    export_builtin(directory)
+    synthetic_dir = os.path.join(directory, "synthetic")
+    os.makedirs(synthetic_dir, exist_ok=True)
+    for chapter in generate_chapters(sections):
+        module, section = chapter["chapter"].split(".")
+        chapter["chapter"] = f"{int(module) + 100}.{section}"
+        write_chapter(os.path.join(synthetic_dir, f"{chapter['chapter'].replace('.', '-')}.md"), chapter)
+    return sections
+
+
+def measure_scale(directory: str, sections: int, mode: str, repeats: int) -> Dict:
+    """Runs in a child process; see run_scaling."""
+    from services.rag_service import RAGService
+
+    start = time.perf_counter()
+    corpus = CorpusStore(directory)
+    corpus_load = time.perf_counter() - start
+    baseline_rss = peak_rss_mb()
+
+    start = time.perf_counter()
+    rag = RAGService(corpus, retrieval_mode=mode)
+    build = time.perf_counter() - start
+    peak = peak_rss_mb()
+
+    questions = [question for question, _ in QUESTIONS]
+    topics = max(1, sections // 10)
+    topic_queries = [f"{topic_term(t, 1)} {topic_term(t, 2)}" for t in range(0, topics, max(1, topics // 8))]
+    return {
+        "sections": sections,
+        "mode": mode,
+        "chapters": len(corpus),
+        "chunks": len(rag._chunks_by_id),
+        "corpus_load_s": round(corpus_load, 3),
+        "build_s": round(build, 3),
+        "peak_rss_mb": round(peak, 1),
+        "index_rss_mb": round(peak - baseline_rss, 1),
+        "search": latency(lambda q: rag.search_relevant_chapters(q, limit=3), questions, repeats),
+        "topic_search": latency(lambda q: rag.search_relevant_chapters(q, limit=3), topic_queries, repeats),
+        "context": latency(rag.build_context, questions, repeats),
+        **evaluate(rag),
+    }
+
+
+def run_quality(modes) -> List[Dict]:
+    from services.rag_service import RAGService
+
+    log(f"{'mode':>8} {'questions':>9} {'recall@1':>9} {'recall@3':>9} {'recall@5':>9} {'mrr':>7}")
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        export_builtin(directory)
+        corpus = CorpusStore(directory)
+        for mode in modes:
+            result = {"mode": mode, "questions": len(QUESTIONS), **evaluate(RAGService(corpus, retrieval_mode=mode))}
+            results.append(result)
+            log(f"{mode:>8} {len(QUESTIONS):>9} {result['recall@1']:>9.3f} {result['recall@3']:>9.3f} "
+                f"{result['recall@5']:>9.3f} {result['mrr']:>7.3f}")
+    return results
+
+
+def run_scaling(sizes, modes, repeats: int) -> List[Dict]:
+    log(f"{'sections':>9} {'mode':>8} {'chunks':>8} {'load_s':>7} {'build_s':>8} {'index_mb':>9} "
+        f"{'search_p50':>10} {'search_p95':>10} {'ctx_p95':>8} {'recall@3':>9} {'mrr':>6}")
+    results = []
+    # spawn: every measurement starts from a fresh interpreter, so peak RSS is its own
+    context = multiprocessing.get_context("spawn")
+    for sections in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            write_corpus(directory, sections)
+            for mode in modes:
+                with context.Pool(1) as pool:
+                    result = pool.apply(measure_scale, (directory, sections, mode, repeats))
+                results.append(result)
+                log(f"{sections:>9} {mode:>8} {result['chunks']:>8} {result['corpus_load_s']:>7.2f} "
+                    f"{result['build_s']:>8.2f} {result['index_rss_mb']:>9.1f} "
+                    f"{result['search']['p50_ms']:>10.3f} {result['search']['p95_ms']:>10.3f} "
+                    f"{result['context']['p95_ms']:>8.3f} {result['recall@3']:>9.3f} {result['mrr']:>6.3f}")
+    return results
+
+
+def compare(current: Dict, baseline: Dict, max_recall_drop: float, max_latency_ratio: float) -> List[str]:
+    """Regressions of `current` against `baseline`, matched by mode (and size for scaling)."""
+    problems = []
+    quality = {row["mode"]: row for row in baseline.get("quality", [])}
+    for row in current.get("quality", []):
+        before = quality.get(row["mode"])
+        if before is None:
+            continue
+        for metric in [f"recall@{k}" for k in RECALL_AT] + ["mrr"]:
+            if row[metric] < before[metric] - max_recall_drop:
+                problems.append(f"quality {row['mode']} {metric}: {before[metric]} -> {row[metric]}")
+    scaling = {(row["sections"], row["mode"]): row for row in baseline.get("scaling", [])}
+    for row in current.get("scaling", []):
+        before = scaling.get((row["sections"], row["mode"]))
+        if before is None:
+            continue
+        label = f"scaling {row['sections']} {row['mode']}"
+        if row["mrr"] < before["mrr"] - max_recall_drop:
+            problems.append(f"{label} mrr: {before['mrr']} -> {row['mrr']}")
+        for key in ("search", "context"):
+            if row[key]["p95_ms"] > before[key]["p95_ms"] * max_latency_ratio:
+                problems.append(f"{label} {key} p95_ms: {before[key]['p95_ms']} -> {row[key]['p95_ms']}")
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1000, 10000, 100000],
+                        help="synthetic sections per scaling run; pass none to skip scaling")
+    parser.add_argument("--repeats", type=int, default=5, help="passes over the queries when timing")
+    parser.add_argument("--output", help="write the JSON here instead of stdout")
+    parser.add_argument("--baseline", help="earlier JSON output to check for regressions")
+    parser.add_argument("--max-recall-drop", type=float, default=0.02)
+    parser.add_argument("--max-latency-ratio", type=float, default=1.5)
+    args = parser.parse_args()
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "quality": run_quality(args.modes),
+        "scaling": run_scaling(args.sizes, args.modes, args.repeats) if args.sizes else [],
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(report, json.load(f), args.max_recall_drop, args.max_latency_ratio)
+        for problem in problems:
+            log(f"REGRESSION {problem}")
+        sys.exit(1 if problems else 0)
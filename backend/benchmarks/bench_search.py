@@ -0,0 +1,63 @@
+"""
+Search benchmark - per-query latency of the BM25 index as the corpus grows
+Run from the backend directory: python -m benchmarks.bench_search
+
+Query cost is proportional to the postings of the query terms. Topic queries
+use terms whose document frequency stays bounded as the corpus grows, so
+their latency stays flat; common-word queries grow with the number of matches.
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.synthetic_corpus import generate_chapters, topic_term
+from services.search_index import BM25Index
+
+COMMON_QUERIES = [
+    "what is URDF",
+    "explain ROS 2 topics and services",
+    "how does gazebo simulate sensors",
+    "whisper voice commands",
+]
+
+
+def topic_queries(size: int):
+    topics = max(1, size // 10)
+    return [f"{topic_term(t, 1)} {topic_term(t, 2)}" for t in range(0, topics, max(1, topics // 8))]
+
+
+def measure(index: BM25Index, queries, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, limit=3)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[max(0, int(len(timings) * 0.95) - 1)]
+
+
+def run(sizes, repeats: int):
+    print(f"{'chapters':>10} {'build_s':>9} {'topic_p50_ms':>13} {'topic_p95_ms':>13} "
+          f"{'common_p50_ms':>14} {'common_p95_ms':>14}")
+    for size in sizes:
+        chapters = generate_chapters(size)
+        start = time.perf_counter()
+        index = BM25Index.from_documents(
+            (ch["chapter"], ch["title"], ch["content"]) for ch in chapters
+        )
+        build_seconds = time.perf_counter() - start
+
+        topic_p50, topic_p95 = measure(index, topic_queries(size), repeats)
+        common_p50, common_p95 = measure(index, COMMON_QUERIES, repeats)
+        print(f"{size:>10} {build_seconds:>9.2f} {topic_p50:>13.3f} {topic_p95:>13.3f} "
+              f"{common_p50:>14.3f} {common_p95:>14.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[15, 100, 1000, 5000])
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+    run(args.sizes, args.repeats)
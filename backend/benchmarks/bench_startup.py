@@ -0,0 +1,117 @@
+"""
+Startup benchmark - Time from process start to the first served request and to readiness
+Run from the backend directory: python -m benchmarks.bench_startup
+
+Starts the API (uvicorn) repeatedly and polls it: "live" is the first 200 from
+/health/live (the port is open and the app answers), "ready" the first 200
+from /health/ready (the retrieval indexes are warm). With --sections the
+built-in chapters plus that many synthetic sections are served from a
+markdown corpus; with --saved-index the indexes are saved once beforehand
+(python -m services.rag_service build-index) and memory-mapped at startup.
+
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --sections 10000 --saved-index
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.bench_retrieval import write_corpus
+
+
+def poll(client: httpx.Client, path: str, started: float, timeout: float) -> float:
+    """Seconds from `started` until `path` first answers 200."""
+    while time.perf_counter() - started < timeout:
+        try:
+            if client.get(path).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(f"{path} not ready after {timeout}s")
+
+
+def start_once(env: Dict[str, str], port: int, timeout: float) -> Dict:
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+            live = poll(client, "/health/live", started, timeout)
+            ready = poll(client, "/health/ready", started, timeout)
+        return {"live_s": round(live, 3), "ready_s": round(ready, 3)}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summarize(runs: List[Dict]) -> Dict:
+    return {
+        key: {"median": round(statistics.median(run[key] for run in runs), 3),
+              "max": max(run[key] for run in runs)}
+        for key in ("live_s", "ready_s")
+    }
+
+
+def run(args) -> Dict:
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            **os.environ,
+            "RAG_RETRIEVAL_MODE": args.mode,
+            "RAG_INDEX_DIR": os.path.join(directory, "index") if args.saved_index else "",
+            "CORPUS_POLL_INTERVAL": "0",
+            "USER_DB_PATH": os.path.join(directory, "users.sqlite3"),
+            "CHAT_DB_PATH": os.path.join(directory, "chat.sqlite3"),
+            "CONTENT_CACHE_PATH": os.path.join(directory, "content_cache.sqlite3"),
+            "SHARED_STATE_PATH": os.path.join(directory, "shared_state.sqlite3"),
+        }
+        if args.sections:
+            env["CORPUS_DIR"] = os.path.join(directory, "corpus")
+            write_corpus(env["CORPUS_DIR"], args.sections)
+        if args.saved_index:
+            subprocess.run(
+                [sys.executable, "-m", "services.rag_service", "build-index", env["RAG_INDEX_DIR"]],
+                env=env, check=True, stdout=subprocess.DEVNULL
+            )
+
+        print(f"{'run':>4} {'live_s':>8} {'ready_s':>8}")
+        runs = []
+        for i in range(args.runs):
+            result = start_once(env, args.port, args.timeout)
+            runs.append(result)
+            print(f"{i + 1:>4} {result['live_s']:>8.3f} {result['ready_s']:>8.3f}")
+        return {
+            "sections": args.sections,
+            "mode": args.mode,
+            "saved_index": args.saved_index,
+            "runs": runs,
+            **summarize(runs),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--sections", type=int, default=0, help="synthetic sections added to the built-in chapters")
+    parser.add_argument("--mode", choices=("keyword", "dense", "hybrid"), default="keyword")
+    parser.add_argument("--saved-index", action="store_true", help="build the index artifact first and load it")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    report = run(args)
+    print(f"median live {report['live_s']['median']:.3f}s, ready {report['ready_s']['median']:.3f}s")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
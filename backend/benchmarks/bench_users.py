@@ -0,0 +1,100 @@
+"""
+User store benchmark - login lookups and signups against a large user table
+Run from the backend directory: python -m benchmarks.bench_users [--users 100000]
+
+Password hashing is left out (stored hashes are placeholders) so the numbers
+show the storage path alone. The linear scan over a dict of users, which the
+auth router used before, is measured alongside for comparison.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+from services.user_store import UserStore
+
+
+def make_user(n: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "email": f"student{n}@example.edu",
+        "name": f"Student {n}",
+        "password": "$5$rounds=535000$placeholder",
+        "programming_experience": "intermediate",
+        "hardware_experience": "some",
+        "primary_interest": "ai",
+        "created_at": "2026-01-01T00:00:00",
+    }
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return statistics.median(timings), timings[max(0, int(len(timings) * 0.99) - 1)]
+
+
+def timed(fn, args_list):
+    timings = []
+    start = time.perf_counter()
+    for args in args_list:
+        begin = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - begin) * 1000)
+    return len(args_list) / (time.perf_counter() - start), *percentiles(timings)
+
+
+async def concurrent_logins(store: UserStore, emails, concurrency: int) -> float:
+    queue = list(emails)
+
+    async def worker():
+        while queue:
+            await store.get_by_email(queue.pop())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(emails) / (time.perf_counter() - start)
+
+
+def run(users: int, operations: int, concurrency: int):
+    with tempfile.TemporaryDirectory() as directory:
+        store = UserStore(os.path.join(directory, "users.sqlite3"))
+        start = time.perf_counter()
+        store.create_many_sync(make_user(n) for n in range(users))
+        print(f"loaded {store.count_sync()} users in {time.perf_counter() - start:.1f}s")
+
+        rng = random.Random(7)
+        emails = [f"student{rng.randrange(users)}@example.edu" for _ in range(operations)]
+        rate, p50, p99 = timed(store.get_by_email_sync, [(email,) for email in emails])
+        print(f"login lookup    {rate:>10.0f} ops/s  p50 {p50:.3f} ms  p99 {p99:.3f} ms")
+
+        rate = asyncio.run(concurrent_logins(store, emails, concurrency))
+        print(f"login lookup x{concurrency:<2}{rate:>10.0f} ops/s  (threadpool, {store.pool_size} connections)")
+
+        new_users = [(make_user(users + n),) for n in range(operations)]
+        rate, p50, p99 = timed(store.create_sync, new_users)
+        print(f"signup insert   {rate:>10.0f} ops/s  p50 {p50:.3f} ms  p99 {p99:.3f} ms")
+        store.close()
+
+    users_db = {user["id"]: user for user in (make_user(n) for n in range(users))}
+
+    def scan(email):
+        for user in users_db.values():
+            if user["email"] == email:
+                return user
+
+    sample = emails[:max(1, operations // 100)]
+    rate, p50, p99 = timed(scan, [(email,) for email in sample])
+    print(f"dict scan       {rate:>10.0f} ops/s  p50 {p50:.3f} ms  p99 {p99:.3f} ms  (previous users_db)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--operations", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    run(args.users, args.operations, args.concurrency)
@@ -0,0 +1,57 @@
+"""
+Vector benchmark - top-k latency of the memory-mapped float32 vector index
+Run from the backend directory: python -m benchmarks.bench_vector
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from services.vector_index import DEFAULT_DIM, HashingEmbedder, VectorIndex
+
+QUERIES = [
+    "what is URDF",
+    "how do robots simulate cameras",
+    "moving from simulation to physical hardware",
+    "voice commands with whisper",
+]
+
+
+def run(rows: int, dim: int, repeats: int, limit: int):
+    rng = np.random.default_rng(7)
+    matrix = rng.standard_normal((rows, dim), dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    ids = [f"chunk-{i}" for i in range(rows)]
+    embedder = HashingEmbedder(dim).fit(QUERIES)
+
+    with tempfile.TemporaryDirectory() as directory:
+        VectorIndex(ids, matrix, embedder).save(directory)
+        start = time.perf_counter()
+        index = VectorIndex.load(directory, mmap=True)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        index.search(QUERIES[0], limit)  # fault the pages in once
+        timings = []
+        for _ in range(repeats):
+            for query in QUERIES:
+                start = time.perf_counter()
+                index.search(query, limit)
+                timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+
+    print(f"rows={rows} dim={dim} matrix={matrix.nbytes / 1e6:.1f}MB load_ms={load_ms:.2f}")
+    print(f"top-{limit} p50_ms={statistics.median(timings):.2f} "
+          f"p95_ms={timings[int(len(timings) * 0.95) - 1]:.2f} max_ms={timings[-1]:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    parser.add_argument("--repeats", type=int, default=25)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+    run(args.rows, args.dim, args.repeats, args.limit)
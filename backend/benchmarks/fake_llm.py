@@ -0,0 +1,225 @@
+"""
+Fake LLM server - Local stand-in for the Groq, OpenAI and Gemini APIs
+Run from the backend directory: python -m benchmarks.fake_llm --port 8790
+
+Serves the OpenAI-compatible chat completions API under /groq/v1 and
+/openai/v1, and Gemini generateContent / streamGenerateContent under
+/gemini/v1beta, so the app can be load tested without spending provider
+quota. Point the app at it with
+
+    GROQ_BASE_URL=http://127.0.0.1:8790/groq/v1
+    OPENAI_BASE_URL=http://127.0.0.1:8790/openai/v1
+    GEMINI_BASE_URL=http://127.0.0.1:8790/gemini/v1beta
+
+Time to first token is drawn per request from a log-normal distribution
+around a per-provider median; further tokens follow at a fixed interval.
+A per-provider fraction of requests is answered with 429 and Retry-After.
+GET /stats returns the calls served and 429s injected per provider.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from typing import Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+PROVIDERS = ("groq", "gemini", "openai")
+
+WORDS = (
+    "the robot uses its sensors to build a model of the world and plans each motion "
+    "through the joint controllers while ROS 2 nodes exchange messages over topics"
+).split()
+
+
+def per_provider(value: str, default: float) -> Dict[str, float]:
+    """"0.3" applies to every provider; "groq=0.2,gemini=0.5" sets those and leaves the rest at `default`."""
+    if "=" not in value:
+        return {name: float(value) for name in PROVIDERS}
+    parsed = {name: float(number) for name, number in (item.split("=") for item in value.split(",") if item)}
+    return {name: parsed.get(name, default) for name in PROVIDERS}
+
+
+class FakeConfig:
+    def __init__(
+        self,
+        latency: str = "0.3",
+        sigma: float = 0.5,
+        rate_limit: str = "0",
+        retry_after: float = 1.0,
+        tokens: int = 120,
+        token_interval: float = 0.005,
+        seed: int = 7
+    ):
+        self.latency = per_provider(latency, 0.3)
+        self.sigma = sigma
+        self.rate_limit = per_provider(rate_limit, 0.0)
+        self.retry_after = retry_after
+        self.tokens = tokens
+        self.token_interval = token_interval
+        self.random = random.Random(seed)
+
+    def first_token_delay(self, provider: str) -> float:
+        # Log-normal with the configured median: most calls near it, a long slow tail
+        return self.random.lognormvariate(math.log(max(self.latency[provider], 1e-6)), self.sigma)
+
+    def rate_limited(self, provider: str) -> bool:
+        return self.random.random() < self.rate_limit[provider]
+
+    def completion(self, max_tokens: int) -> List[str]:
+        count = max(1, min(self.tokens, max_tokens or self.tokens))
+        return [WORDS[i % len(WORDS)] + " " for i in range(count)]
+
+
+def create_app(config: FakeConfig) -> FastAPI:
+    app = FastAPI(title="Fake LLM provider")
+    stats = {name: {"calls": 0, "rate_limited": 0, "streams": 0} for name in PROVIDERS}
+
+    def rejected(provider: str):
+        """429 response in the provider's own error format, or None."""
+        stats[provider]["calls"] += 1
+        if not config.rate_limited(provider):
+            return None
+        stats[provider]["rate_limited"] += 1
+        headers = {"Retry-After": str(config.retry_after)}
+        if provider == "gemini":
+            body = {"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}}
+        else:
+            body = {"error": {"message": "Rate limit reached", "type": "rate_limit_error", "code": "rate_limit_exceeded"}}
+        return JSONResponse(body, status_code=429, headers=headers)
+
+    async def chat_completions(provider: str, request: Request):
+        body = await request.json()
+        response = rejected(provider)
+        if response is not None:
+            return response
+        words = config.completion(body.get("max_tokens") or 0)
+        model = body.get("model", "fake")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        delay = config.first_token_delay(provider)
+
+        if not body.get("stream"):
+            await asyncio.sleep(delay + config.token_interval * (len(words) - 1))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(words).strip()},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(words), "total_tokens": len(words)},
+            }
+
+        stats[provider]["streams"] += 1
+
+        def chunk(delta: Dict, finish_reason=None) -> str:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(data)}\n\n"
+
+        async def events():
+            await asyncio.sleep(delay)
+            yield chunk({"role": "assistant", "content": ""})
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(config.token_interval)
+                yield chunk({"content": word})
+            yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/groq/v1/chat/completions")
+    async def groq(request: Request):
+        return await chat_completions("groq", request)
+
+    @app.post("/openai/v1/chat/completions")
+    async def openai(request: Request):
+        return await chat_completions("openai", request)
+
+    @app.post("/gemini/v1beta/models/{target}")
+    async def gemini(target: str, request: Request):
+        model, _, method = target.partition(":")
+        body = await request.json()
+        response = rejected("gemini")
+        if response is not None:
+            return response
+        max_tokens = body.get("generationConfig", {}).get("maxOutputTokens") or 0
+        words = config.completion(max_tokens)
+        delay = config.first_token_delay("gemini")
+
+        def candidate(text: str, finish_reason=None) -> Dict:
+            content = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+            if finish_reason:
+                content["finishReason"] = finish_reason
+            return {"candidates": [content], "modelVersion": model}
+
+        if method == "generateContent":
+            await asyncio.sleep(delay + config.token_interval * (len(words) - 1))
+            return candidate("".join(words).strip(), "STOP")
+        if method != "streamGenerateContent":
+            return JSONResponse({"error": {"code": 404, "message": f"Unknown method {method}"}}, status_code=404)
+
+        stats["gemini"]["streams"] += 1
+
+        async def events():
+            await asyncio.sleep(delay)
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(config.token_interval)
+                last = i == len(words) - 1
+                yield f"data: {json.dumps(candidate(word, 'STOP' if last else None))}\r\n\r\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        for counters in stats.values():
+            for key in counters:
+                counters[key] = 0
+        return stats
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Options shared with bench_load, which passes them through."""
+    parser.add_argument("--latency", default="0.3", help='median seconds to first token, "0.3" or "groq=0.2,gemini=0.6"')
+    parser.add_argument("--sigma", type=float, default=0.5, help="log-normal spread; 0 gives a fixed latency")
+    parser.add_argument("--rate-limit", default="0", help='fraction of calls answered with 429, "0.05" or per provider')
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--tokens", type=int, default=120, help="words per completion")
+    parser.add_argument("--token-interval", type=float, default=0.005, help="seconds between streamed words")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--seed", type=int, default=7)
+    add_arguments(parser)
+    args = parser.parse_args()
+    config = FakeConfig(
+        args.latency, args.sigma, args.rate_limit, args.retry_after, args.tokens, args.token_interval, args.seed
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
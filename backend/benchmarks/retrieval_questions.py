@@ -0,0 +1,69 @@
+"""
+Labeled retrieval questions for the built-in textbook chapters
+Each entry is (question, relevant chapter ids). Questions are phrased the way
+students ask them, so many share few exact words with the chapter text.
+"""
+
+QUESTIONS = [
+    # 1.1 Introduction to Physical AI
+    ("How is physical AI different from a chatbot running in the cloud?", ["1.1"]),
+    ("What is embodied intelligence?", ["1.1"]),
+    ("Why does a robot arm need to think about friction and center of mass?", ["1.1"]),
+    # 1.2 ROS 2 Architecture
+    ("What middleware does ROS 2 use under the hood?", ["1.2"]),
+    ("What is the difference between a topic, a service and an action?", ["1.2"]),
+    ("Why was the ROS master removed in ROS 2?", ["1.2"]),
+    ("How do I configure QoS reliability for a publisher?", ["1.2"]),
+    # 1.3 Building ROS 2 Packages
+    ("How do I create a new Python package with ros2 pkg create?", ["1.3"]),
+    ("What goes into package.xml?", ["1.3"]),
+    ("How do I build my workspace with colcon?", ["1.3"]),
+    # 1.4 URDF for Humanoids
+    ("What is the difference between a revolute and a prismatic joint?", ["1.4"]),
+    ("How do I describe the links and joints of a humanoid robot model?", ["1.4"]),
+    ("How can I view my robot model in RViz?", ["1.4"]),
+    # 2.1 Gazebo Simulation Environment
+    ("How do I spawn a robot into Gazebo?", ["2.1"]),
+    ("Why test robot algorithms in a physics simulator before real hardware?", ["2.1"]),
+    ("Which apt package installs the Gazebo ROS integration?", ["2.1"]),
+    # 2.2 Sensor Simulation
+    ("How do I simulate a LiDAR in Gazebo?", ["2.2"]),
+    ("Which message type does a simulated laser scanner publish?", ["2.2"]),
+    ("Can I simulate an IMU for balance control?", ["2.2"]),
+    # 2.3 Unity for Robot Visualization
+    ("When should I use Unity instead of Gazebo?", ["2.3"]),
+    ("How does Unity talk to ROS 2?", ["2.3"]),
+    ("What do I need to install for the Unity Robotics Hub?", ["2.3"]),
+    # 3.1 NVIDIA Isaac Sim
+    ("What GPU do I need to run Isaac Sim?", ["3.1"]),
+    ("What is USD and why does Omniverse use it?", ["3.1"]),
+    ("How can I generate synthetic training data for a perception model?", ["3.1"]),
+    # 3.2 Isaac ROS
+    ("How does visual SLAM work without a LiDAR?", ["3.2"]),
+    ("Which GPU-accelerated perception packages does Isaac ROS provide?", ["3.2"]),
+    ("Can I run semantic segmentation on NVIDIA hardware inside ROS 2?", ["3.2"]),
+    # 3.3 Navigation with Nav2
+    ("What does the costmap represent in Nav2?", ["3.3"]),
+    ("What is the difference between the planner server and the controller server?", ["3.3"]),
+    ("Why is navigation harder for a bipedal robot on stairs?", ["3.3"]),
+    # 3.4 Sim-to-Real Transfer
+    ("Why do policies trained in simulation fail on the real robot?", ["3.4"]),
+    ("What parameters should I randomize during training?", ["3.4", "3.1"]),
+    ("How do I close the sim-to-real gap?", ["3.4"]),
+    # 4.1 Voice-to-Action
+    ("How do I transcribe speech with Whisper?", ["4.1"]),
+    ("How does the robot turn a spoken command into an action?", ["4.1"]),
+    ("How should the robot handle background noise in voice commands?", ["4.1"]),
+    # 4.2 Cognitive Planning with LLMs
+    ("How can a large language model break a task like cleaning the room into steps?", ["4.2"]),
+    ("How do we stop an LLM planner from commanding unsafe movements?", ["4.2"]),
+    ("What does grounding an LLM in robot capabilities mean?", ["4.2"]),
+    # 4.3 Multi-Modal Interaction
+    ("How does the robot know what 'put it there' refers to?", ["4.3"]),
+    ("Why combine gesture and gaze with speech?", ["4.3"]),
+    ("What should the robot do when it is unsure what the user meant?", ["4.3"]),
+    # 4.4 Capstone Project: The Autonomous Humanoid
+    ("What does the capstone project pipeline look like end to end?", ["4.4"]),
+    ("How is the autonomous humanoid capstone evaluated?", ["4.4"]),
+    ("Which components are required for the final project?", ["4.4"]),
+]
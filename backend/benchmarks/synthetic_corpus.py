@@ -0,0 +1,53 @@
+"""
+Synthetic corpus generator for benchmarks
+Scales the textbook by recombining sentences from the real chapters
+"""
+
+import random
+import re
+from typing import Dict, List
+
+from data.textbook_content import CHAPTERS
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+# Distinct terms each synthetic section adds on top of the shared sentences
+TOPIC_TERMS_PER_SECTION = 12
+
+
+def _sentence_pool() -> List[str]:
+    sentences = []
+    for chapter in CHAPTERS:
+        sentences.extend(s for s in SENTENCE_SPLIT.split(chapter["content"]) if s.strip())
+    return sentences
+
+
+def topic_term(topic: int, k: int) -> str:
+    """Vocabulary word specific to one synthetic topic."""
+    return f"topic{topic}term{k}"
+
+
+def generate_chapters(count: int, sentences_per_chapter: int = 10, seed: int = 7) -> List[Dict]:
+    """
+    Build `count` chapter dicts shaped like CHAPTERS entries.
+    Every section mixes real textbook sentences (shared vocabulary) with
+    terms from its own topic, of which there is one per ten sections, so
+    the vocabulary grows with the corpus like a real multi-book library.
+    """
+    rng = random.Random(seed)
+    pool = _sentence_pool()
+    titles = [ch["title"] for ch in CHAPTERS]
+    chapters = []
+    for i in range(count):
+        topic = i // 10
+        sentences = [rng.choice(pool) for _ in range(sentences_per_chapter)]
+        topic_words = " ".join(
+            topic_term(topic, rng.randrange(TOPIC_TERMS_PER_SECTION * 2))
+            for _ in range(TOPIC_TERMS_PER_SECTION)
+        )
+        chapters.append({
+            "chapter": f"{i // 100 + 1}.{i % 100 + 1}",
+            "title": f"{rng.choice(titles)} {i}",
+            "content": " ".join(sentences) + "\n\n" + topic_words,
+        })
+    return chapters
@@ -1 +1 @@
-from .textbook_content import CHAPTERS
+from .textbook_content import CHAPTERS, MODULES
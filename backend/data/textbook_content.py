@@ -3,6 +3,14 @@ Textbook content for RAG ingestion
 Physical AI & Humanoid Robotics
 """
 
+# Module titles, keyed by the module number that prefixes chapter ids ("1" for "1.1")
+MODULES = {
+    "1": "The Robotic Nervous System (ROS 2)",
+    "2": "The Digital Twin (Gazebo & Unity)",
+    "3": "The AI-Robot Brain (NVIDIA Isaac)",
+    "4": "Vision-Language-Action (VLA)",
+}
+
 CHAPTERS = [
     {
         "chapter": "1.1",
@@ -139,6 +147,7 @@ When uncertain, robots should ask clarifying questions rather than guess. Gracef
     {
         "chapter": "4.4",
         "title": "Capstone Project: The Autonomous Humanoid",
+        "short_title": "Capstone Project",
         "content": """The capstone integrates all course concepts: voice commands via Whisper, LLM planning for task decomposition, Nav2 navigation, and object manipulation.
 
 Architecture: Microphone -> Whisper -> LLM Planner -> Nav2 -> Robot, with parallel object detection feeding manipulation controller.
@@ -0,0 +1,53 @@
+"""
+Gunicorn configuration - several uvicorn workers sharing one preloaded app
+Run from the backend directory: gunicorn -c gunicorn.conf.py main:app
+
+The app is imported once in the master, and the corpus, BM25 and vector
+indexes and chapter listings are loaded (memory-mapped from RAG_INDEX_DIR
+when saved there) or built before the workers are forked, so they are
+shared copy-on-write and every worker reports ready at once. Per-process resources (LLM connection pools, hashing
+processes, SQLite connections, background tasks) are opened by the app
+lifespan or on first use inside each worker. State that must agree across
+workers lives in SQLite: users, chat history, the content cache and
+services/shared_state.py (token revocations, provider cool-downs,
+idempotent results and conversation sessions).
+
+Some state stays per worker: the answer cache (a question answered on one
+worker is generated again on another), in-flight request coalescing, the
+admission queue and the /metrics registry. A scrape of /metrics reports the
+counters of whichever worker answered it; for fleet totals run one worker
+per instance or scrape each worker's port.
+"""
+
+import gc
+import multiprocessing
+import os
+
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+preload_app = True
+timeout = 120
+graceful_timeout = 30
+
+# Read by the app while the master preloads it: LLM_CONCURRENCY is split
+# between the workers, and each worker gets its share of hashing processes
+os.environ["WEB_CONCURRENCY"] = str(workers)
+os.environ.setdefault("PASSWORD_HASH_WORKERS", str(max(1, multiprocessing.cpu_count() // workers)))
+
+# Objects allocated while preloading stay put, and collections in the workers
+# do not write to their GC headers, so the pages are not copied after fork
+gc.disable()
+
+
+def when_ready(server):
+    import main
+
+    main.warm_indexes()
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"App preloaded; {gc.get_freeze_count()} objects frozen before forking {workers} workers")
+
+
+def post_fork(server, worker):
+    gc.enable()
@@ -3,10 +3,15 @@ Physical AI & Humanoid Robotics Textbook - Backend API
 FastAPI backend with RAG chatbot functionality
 """
 
-from fastapi import FastAPI, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional, List
+import math
 import os
 from dotenv import load_dotenv
 
@@ -14,12 +19,59 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import routers
-from routers import chat, auth, content
+from routers import chat, auth, content, providers
+from services.llm_client import llm_client
+from services.content_cache import content_cache
+from services.corpus_store import corpus_store
+from services.user_store import user_store
+from services.password_hasher import password_hasher
+from services.provider_router import ProvidersUnavailableError
+from services.chat_store import chat_store
+from services.shared_state import shared_state
+from services.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+
+
+def warm_indexes():
+    """Load or build the retrieval indexes; gunicorn calls this in the master before forking."""
+    chat.rag_service.warm()
+
+
+async def warm_up():
+    """Runs after the server starts accepting connections; /health/ready reports when it is done."""
+    try:
+        await run_in_threadpool(warm_indexes)
+    except Exception as e:
+        print(f"Retrieval index warm-up failed: {e}")
+    # Import the provider SDKs and open pooled LLM connections before the first question needs them
+    await llm_client.startup()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm in the background so the port opens at once (GET /health/ready)
+    warming = asyncio.create_task(warm_up())
+    # Start the hashing workers up front rather than on the first login
+    password_hasher.startup()
+    # Pick up edits to the markdown corpus without a restart
+    corpus_store.start()
+    # Write chat history and feedback in batches off the request path
+    chat_store.start()
+    yield
+    warming.cancel()
+    await chat_store.stop()
+    await corpus_store.stop()
+    await llm_client.shutdown()
+    content_cache.close()
+    user_store.close()
+    shared_state.close()
+    password_hasher.shutdown()
+
 
 app = FastAPI(
     title="Physical AI Textbook API",
     description="RAG Chatbot API for Physical AI & Humanoid Robotics Textbook",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS configuration - allow all origins for this educational project
@@ -31,10 +83,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latency and response size per route, served at /metrics
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(ProvidersUnavailableError)
+async def providers_unavailable(request: Request, exc: ProvidersUnavailableError):
+    """429 when the request was shed by admission control, 503 when every provider is down."""
+    headers = {"Retry-After": str(max(1, math.ceil(exc.retry_after)))} if exc.retry_after else {}
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)}, headers=headers)
+
+
 # Include routers
 app.include_router(chat.router, prefix="/api/chat", tags=["chat"])
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(content.router, prefix="/api/content", tags=["content"])
+app.include_router(providers.router, prefix="/api/providers", tags=["providers"])
 
 
 @app.get("/")
@@ -51,6 +114,29 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/health/live")
+async def liveness():
+    """The process is up and serving; restart it only when this fails."""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """503 until the retrieval indexes are warm; route traffic here only after a 200."""
+    if not chat.rag_service.ready.is_set():
+        return JSONResponse(status_code=503, content={"status": "warming"})
+    return {"status": "ready"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus text exposition of request, retrieval, LLM and cache metrics.
+    The numbers are this worker process's only, not the sum over gunicorn workers.
+    """
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
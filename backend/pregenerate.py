@@ -0,0 +1,88 @@
+"""
+Pregenerate - Offline batch generation of translated and personalized chapters
+Writes every (chapter x language x level) variant to the variants artifact.
+
+Usage (from the backend directory):
+    python pregenerate.py [--concurrency 4] [--retries 3] [--output PATH]
+
+The job is resumable: variants already present in the artifact are skipped,
+unless their chapter has been edited since they were generated.
+"""
+
+import argparse
+import asyncio
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from services.corpus_store import corpus_store
+from services.chapter_variants import VARIANTS_PATH, VariantStore, generate_variant, source_hash, variant_matrix
+from services.llm_client import llm_client
+from services.provider_router import ProvidersUnavailableError
+
+
+async def generate_with_retries(chapter: dict, language: str, level: str, retries: int) -> str:
+    delay = 2.0
+    for attempt in range(retries + 1):
+        try:
+            return await generate_variant(chapter["content"], language, level)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            # Wait out open circuit breakers instead of hammering the providers
+            wait = getattr(e, "retry_after", None) if isinstance(e, ProvidersUnavailableError) else None
+            wait = max(delay, wait or 0.0)
+            print(f"  {chapter['chapter']} {language}/{level} failed ({e}), retrying in {wait:.0f}s")
+            await asyncio.sleep(wait)
+            delay *= 2
+
+
+async def run(output: str, concurrency: int, retries: int) -> int:
+    store = VariantStore(output)
+    variants = [(chapter_id, language, level) for chapter_id in corpus_store.ids() for language, level in variant_matrix()]
+    jobs = [job for job in variants if not store.is_current(*job)]
+    print(f"{len(variants) - len(jobs)} variants up to date, {len(jobs)} to generate")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+    skipped = 0
+
+    async def worker(chapter_id: str, language: str, level: str):
+        nonlocal failures, skipped
+        async with semaphore:
+            # Bodies are loaded per job, so only the ones in flight are in memory
+            chapter = corpus_store.chapter(chapter_id)
+            # A file deleted since the job list was made reads as missing or empty
+            if chapter is None or not chapter["content"]:
+                skipped += 1
+                print(f"  {chapter_id} {language}/{level} skipped: chapter missing or empty in the corpus")
+                return
+            start = time.monotonic()
+            try:
+                content = await generate_with_retries(chapter, language, level, retries)
+            except Exception as e:
+                failures += 1
+                print(f"  {chapter_id} {language}/{level} gave up: {e}")
+                return
+            store.append(chapter["chapter"], language, level, content, source_hash(chapter["content"]))
+            print(f"  {chapter['chapter']} {language}/{level} done in {time.monotonic() - start:.1f}s")
+
+    await llm_client.startup()
+    try:
+        await asyncio.gather(*(worker(*job) for job in jobs))
+    finally:
+        await llm_client.shutdown()
+
+    print(f"Finished: {len(jobs) - failures - skipped} generated, {failures} failed, {skipped} skipped -> {output}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pregenerate translated and personalized chapters")
+    parser.add_argument("--output", default=VARIANTS_PATH, help="JSONL artifact to append to")
+    parser.add_argument("--concurrency", type=int, default=4, help="Variants generated in parallel")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per variant")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(run(args.output, args.concurrency, args.retries)))
@@ -1,31 +1,29 @@
 """
 Auth Router - User authentication endpoints
-Simple JWT-based authentication with in-memory storage
+Simple JWT-based authentication with users persisted in SQLite
 """
 
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr
-from typing import Optional, Dict
+from typing import Optional
 import os
 import jwt
+import hashlib
 import uuid
 from datetime import datetime, timedelta
-from passlib.context import CryptContext
+from services.user_store import EmailTakenError, user_store
+from services.password_hasher import HasherBusyError, password_hasher
+from services.token_cache import revoked_tokens, token_cache
+from services.metrics import registry
 
 router = APIRouter()
 
-# Password hashing - using sha256_crypt (pure Python, no C dependencies)
-pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
-
 # JWT settings
 SECRET_KEY = os.getenv("JWT_SECRET", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = 24
 
-# Simple in-memory user storage (replace with database in production)
-users_db: Dict[str, dict] = {}
-
 # Security
 security = HTTPBearer(auto_error=False)
 
@@ -60,11 +58,26 @@ class AuthResponse(BaseModel):
     token: Optional[str] = None
 
 
+AUTH_ATTEMPTS = registry.counter(
+    "auth_attempts_total", "Signup, login and token checks by outcome", ("handler", "outcome")
+)
+
+
+def busy(error: HasherBusyError) -> HTTPException:
+    """503 with Retry-After when the password hashing queue is full."""
+    return HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": str(max(1, round(error.retry_after)))}
+    )
+
+
 def create_access_token(data: dict) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
-    to_encode.update({"exp": expire})
+    # jti identifies the token in the revocation list
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
@@ -79,27 +92,63 @@ def verify_token(token: str) -> Optional[dict]:
         return None
 
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Optional[UserProfile]:
-    """Get current user from JWT token"""
-    if not credentials:
-        return None
+def to_profile(user: dict) -> UserProfile:
+    return UserProfile(
+        id=user["id"],
+        email=user["email"],
+        name=user["name"],
+        programming_experience=user["programming_experience"],
+        hardware_experience=user["hardware_experience"],
+        primary_interest=user["primary_interest"]
+    )
+
+
+def token_id(token: str, payload: dict) -> str:
+    """The token's jti; tokens issued before jti was added fall back to their hash."""
+    return payload.get("jti") or hashlib.sha256(token.encode("utf-8")).hexdigest()
+
 
-    payload = verify_token(credentials.credentials)
+async def authenticate(token: str) -> Optional[tuple]:
+    """
+    Resolve a token to (profile, jti, exp).
+    Verified tokens are cached until they expire, so repeat requests skip
+    the JWT decode and the user lookup; revoked tokens are rejected.
+    """
+    cached = token_cache.get(token)
+    if cached is not None:
+        if revoked_tokens.is_revoked(cached[1]):
+            token_cache.discard(token)
+            AUTH_ATTEMPTS.inc("token", "revoked")
+            return None
+        AUTH_ATTEMPTS.inc("token", "cached")
+        return cached
+
+    payload = verify_token(token)
     if not payload:
+        AUTH_ATTEMPTS.inc("token", "invalid")
+        return None
+    jti = token_id(token, payload)
+    if revoked_tokens.is_revoked(jti):
+        AUTH_ATTEMPTS.inc("token", "revoked")
         return None
 
     user_id = payload.get("sub")
-    if user_id and user_id in users_db:
-        user = users_db[user_id]
-        return UserProfile(
-            id=user["id"],
-            email=user["email"],
-            name=user["name"],
-            programming_experience=user["programming_experience"],
-            hardware_experience=user["hardware_experience"],
-            primary_interest=user["primary_interest"]
-        )
-    return None
+    user = await user_store.get(user_id) if user_id else None
+    if not user:
+        AUTH_ATTEMPTS.inc("token", "unknown_user")
+        return None
+    entry = (to_profile(user), jti, float(payload["exp"]))
+    token_cache.set(token, *entry)
+    AUTH_ATTEMPTS.inc("token", "verified")
+    return entry
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Optional[UserProfile]:
+    """Get current user from JWT token"""
+    if not credentials:
+        return None
+    entry = await authenticate(credentials.credentials)
+    return entry[0] if entry else None
 
 
 @router.post("/signup", response_model=AuthResponse)
@@ -107,16 +156,20 @@ async def signup(request: SignupRequest):
     """
     Register a new user with background information.
     """
-    # Check if email already exists
-    for user in users_db.values():
-        if user["email"] == request.email:
-            raise HTTPException(status_code=400, detail="Email already registered")
+    # Check if email already exists (the unique index settles races)
+    if await user_store.get_by_email(request.email):
+        AUTH_ATTEMPTS.inc("signup", "email_taken")
+        raise HTTPException(status_code=400, detail="Email already registered")
 
     # Create new user
     user_id = str(uuid.uuid4())
-    hashed_password = pwd_context.hash(request.password)
+    try:
+        hashed_password = await password_hasher.hash(request.password)
+    except HasherBusyError as e:
+        AUTH_ATTEMPTS.inc("signup", "busy")
+        raise busy(e)
 
-    users_db[user_id] = {
+    user = {
         "id": user_id,
         "email": request.email,
         "name": request.name,
@@ -126,6 +179,12 @@ async def signup(request: SignupRequest):
         "primary_interest": request.primary_interest,
         "created_at": datetime.utcnow().isoformat()
     }
+    try:
+        await user_store.create(user)
+    except EmailTakenError:
+        AUTH_ATTEMPTS.inc("signup", "email_taken")
+        raise HTTPException(status_code=400, detail="Email already registered")
+    AUTH_ATTEMPTS.inc("signup", "success")
 
     # Create token
     token = create_access_token({"sub": user_id, "email": request.email})
@@ -133,14 +192,7 @@ async def signup(request: SignupRequest):
     return AuthResponse(
         success=True,
         message="User registered successfully",
-        user=UserProfile(
-            id=user_id,
-            email=request.email,
-            name=request.name,
-            programming_experience=request.programming_experience,
-            hardware_experience=request.hardware_experience,
-            primary_interest=request.primary_interest
-        ),
+        user=to_profile(user),
         token=token
     )
 
@@ -151,18 +203,22 @@ async def login(request: LoginRequest):
     Authenticate a user and return JWT token.
     """
     # Find user by email
-    user = None
-    for u in users_db.values():
-        if u["email"] == request.email:
-            user = u
-            break
+    user = await user_store.get_by_email(request.email)
 
     if not user:
+        AUTH_ATTEMPTS.inc("login", "unknown_email")
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
     # Verify password
-    if not pwd_context.verify(request.password, user["password"]):
+    try:
+        valid = await password_hasher.verify(request.password, user["password"])
+    except HasherBusyError as e:
+        AUTH_ATTEMPTS.inc("login", "busy")
+        raise busy(e)
+    if not valid:
+        AUTH_ATTEMPTS.inc("login", "wrong_password")
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    AUTH_ATTEMPTS.inc("login", "success")
 
     # Create token
     token = create_access_token({"sub": user["id"], "email": user["email"]})
@@ -170,14 +226,7 @@ async def login(request: LoginRequest):
     return AuthResponse(
         success=True,
         message="Login successful",
-        user=UserProfile(
-            id=user["id"],
-            email=user["email"],
-            name=user["name"],
-            programming_experience=user["programming_experience"],
-            hardware_experience=user["hardware_experience"],
-            primary_interest=user["primary_interest"]
-        ),
+        user=to_profile(user),
         token=token
     )
 
@@ -193,11 +242,17 @@ async def get_me(current_user: UserProfile = Depends(get_current_user)):
 
 
 @router.post("/logout")
-async def logout():
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
     Logout current user.
-    Note: With JWT, logout is handled client-side by removing the token.
+    The token is revoked server-side until it expires; clients should still drop it.
     """
+    if credentials:
+        entry = await authenticate(credentials.credentials)
+        if entry:
+            _, jti, expires = entry
+            revoked_tokens.revoke(jti, expires)
+            token_cache.discard(credentials.credentials)
     return {"success": True, "message": "Logged out successfully"}
 
 
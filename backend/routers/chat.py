@@ -2,20 +2,48 @@
 Chat Router - RAG Chatbot API endpoints
 """
 
-from fastapi import APIRouter, HTTPException
+import json
+import uuid
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
-from services.rag_service import RAGService
+from services.rag_service import INDEX_DIR, RAGService
+from services.chat_store import chat_store
+from services.conversation import conversations
+from services.provider_router import ProvidersUnavailableError
+from services.singleflight import IdempotencyConflictError, coalesce, fingerprint, idempotency_store
+from services.metrics import registry
+from routers.auth import UserProfile, get_current_user
 
 router = APIRouter()
-rag_service = RAGService()
+# Indexes are loaded (or built) by the app lifespan, see main.py
+rag_service = RAGService(index_dir=INDEX_DIR, warm=False)
+
+registry.collector(
+    "answer_cache_lookups_total", "Chat answer cache lookups by result", "counter",
+    lambda: [
+        ("", {"result": "exact"}, rag_service.answer_cache.exact_hits),
+        ("", {"result": "similar"}, rag_service.answer_cache.similar_hits),
+        ("", {"result": "miss"}, rag_service.answer_cache.misses),
+    ]
+)
+
+
+def require_index():
+    """
+    503 with Retry-After while the retrieval indexes are still warming, rather
+    than waiting for them on the event loop.
+    """
+    if not rag_service.ready.is_set():
+        raise HTTPException(status_code=503, detail="Retrieval index is warming up", headers={"Retry-After": "2"})
 
 
 class ChatRequest(BaseModel):
     question: str
     context: Optional[str] = None
-    user_id: Optional[str] = None
     language: str = "english"  # Support for "english", "urdu", etc.
+    session_id: Optional[str] = None  # Continue a conversation; omit to start one
 
 
 class Source(BaseModel):
@@ -28,6 +56,7 @@ class ChatResponse(BaseModel):
     answer: str
     sources: List[Source]
     message_id: str
+    session_id: Optional[str] = None
 
 
 class FeedbackRequest(BaseModel):
@@ -36,44 +65,155 @@ class FeedbackRequest(BaseModel):
     feedback: Optional[str] = None
 
 
-@router.post("/", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+@router.post("/", response_model=ChatResponse, dependencies=[Depends(require_index)])
+async def chat(
+    request: ChatRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: Optional[UserProfile] = Depends(get_current_user)
+):
     """
     Ask a question to the RAG chatbot.
     Optionally provide context (selected text) for more focused answers.
     Supports multiple languages: english, urdu
+    Identical concurrent questions share one generation. With an
+    Idempotency-Key header, retries return the original result, message_id and
+    session_id, and the turn is recorded once. Send the returned session_id with follow-up questions to keep the
+    conversation; earlier turns are summarized server-side.
+    Messages are saved to the signed-in user's history (Authorization header).
     """
-    try:
-        result = await rag_service.get_answer(
-            question=request.question,
-            context=request.context,
-            user_id=request.user_id,
-            language=request.language
+    user_id = current_user.id if current_user else None
+    # A first question has no history, so it can still share a generation
+    session = await conversations.session(request.session_id) if request.session_id else None
+    history = conversations.history(session) if session else ""
+
+    async def answer_and_record() -> dict:
+        nonlocal session
+        result = await coalesce(
+            "chat",
+            fingerprint(request.question, request.context, request.language, session.id if session else None),
+            lambda: rag_service.get_answer(
+                question=request.question,
+                context=request.context,
+                user_id=user_id,
+                language=request.language,
+                history=history,
+                previous_question=session.last_question if session else None
+            )
+        )
+        if session is None:
+            session = await conversations.session(None)
+        conversations.record(session, request.question, result["answer"])
+        # Coalesced requests are still separate messages
+        result = {**result, "message_id": str(uuid.uuid4()), "session_id": session.id}
+        # Buffered; written to disk by the chat store's background task
+        chat_store.record_message(
+            result["message_id"], user_id, request.question,
+            result["answer"], result["sources"], request.language
         )
         return result
+
+    try:
+        if idempotency_key:
+            # A replay returns the stored result (same message_id and session_id) without recording the turn again
+            return await idempotency_store.run(
+                f"chat:{idempotency_key}",
+                fingerprint(request.question, request.context, request.language, request.session_id, user_id),
+                answer_and_record
+            )
+        return await answer_and_record()
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ProvidersUnavailableError:
+        raise  # 429/503 with Retry-After, see main.py
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/stream", dependencies=[Depends(require_index)])
+async def chat_stream(request: ChatRequest, current_user: Optional[UserProfile] = Depends(get_current_user)):
+    """
+    Ask a question and receive the answer as server-sent events.
+    Events: "sources" (sent before generation starts), "token" (one per text
+    delta), "error" (if generation fails) and "done" (carries message_id and
+    session_id).
+    """
+    user_id = current_user.id if current_user else None
+    session = await conversations.session(request.session_id)
+
+    async def events():
+        sources, parts, failed = [], [], False
+        async for event, data in rag_service.stream_answer(
+            question=request.question,
+            context=request.context,
+            user_id=user_id,
+            language=request.language,
+            history=conversations.history(session),
+            previous_question=session.last_question
+        ):
+            if event == "sources":
+                sources = data["sources"]
+            elif event == "token":
+                parts.append(data["text"])
+            elif event == "error":
+                failed = True
+            elif event == "done":
+                data = {**data, "session_id": session.id}
+                if not failed:
+                    conversations.record(session, request.question, "".join(parts))
+                    chat_store.record_message(
+                        data["message_id"], user_id, request.question,
+                        "".join(parts), sources, request.language
+                    )
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/cache/stats")
+async def get_answer_cache_stats():
+    """
+    Get hit/miss counters of the answer cache.
+    """
+    return rag_service.answer_cache.stats()
+
+
 @router.post("/feedback")
 async def submit_feedback(request: FeedbackRequest):
     """
     Submit feedback on a chatbot response.
     """
     try:
-        # Store feedback (implement in database service)
+        chat_store.record_feedback(request.message_id, request.rating, request.feedback)
         return {"status": "feedback_received", "message_id": request.message_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/history/{user_id}")
-async def get_chat_history(user_id: str, limit: int = 50):
+async def get_chat_history(
+    user_id: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    current_user: Optional[UserProfile] = Depends(get_current_user)
+):
     """
-    Get chat history for a user.
+    Get chat history for the signed-in user, newest first.
+    Pass `next_cursor` from the response as `cursor` to fetch older messages.
     """
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    if current_user.id != user_id:
+        raise HTTPException(status_code=403, detail="Not allowed to read another user's history")
+    if not 1 <= limit <= 200:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 200")
+    if cursor is not None and not cursor.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     try:
-        # Retrieve from database (implement in database service)
-        return {"user_id": user_id, "messages": []}
+        page = await chat_store.history(user_id, limit, cursor)
+        return {"user_id": user_id, **page}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -2,158 +2,24 @@
 Content Router - Chapters, content, and translation endpoints
 """
 
-from fastapi import APIRouter, HTTPException
+import json
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List
-import os
-import httpx
-from openai import OpenAI
+from typing import Optional
+from services import content_service
+from services.content_cache import content_cache
+from services.chapter_variants import variant_store
+from services.provider_router import ProvidersUnavailableError
+from services.singleflight import IdempotencyConflictError, coalesce, fingerprint
+from services.chapter_index import CachedPayload, ChapterIndex, cached_response
 
 router = APIRouter()
 
-# Import textbook content
-from data.textbook_content import CHAPTERS
-
-# Lazy initialization for LLM clients
-_groq_client = None
-_openai_client = None
-
-def get_groq_client():
-    global _groq_client
-    if _groq_client is None:
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise ValueError("GROQ_API_KEY environment variable is required")
-        _groq_client = OpenAI(
-            api_key=api_key,
-            base_url="https://api.groq.com/openai/v1"
-        )
-    return _groq_client
-
-def get_openai_client():
-    global _openai_client
-    if _openai_client is None:
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable is required")
-        _openai_client = OpenAI(api_key=api_key)
-    return _openai_client
-
-def call_gemini(prompt: str, max_tokens: int = 4000) -> str:
-    """Call Gemini API directly via REST as fallback."""
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY not configured")
-
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
-
-    payload = {
-        "contents": [{"parts": [{"text": prompt}]}],
-        "generationConfig": {
-            "maxOutputTokens": max_tokens,
-            "temperature": 0.3
-        }
-    }
-
-    # Retry up to 2 times on timeout
-    last_error = None
-    for attempt in range(2):
-        try:
-            response = httpx.post(url, json=payload, timeout=120.0)
-            response.raise_for_status()
-            data = response.json()
-
-            # Check if response has the expected structure
-            if "candidates" in data and len(data["candidates"]) > 0:
-                if "content" in data["candidates"][0] and "parts" in data["candidates"][0]["content"]:
-                    if len(data["candidates"][0]["content"]["parts"]) > 0:
-                        return data["candidates"][0]["content"]["parts"][0]["text"]
-
-            print(f"Unexpected Gemini response structure: {data}")
-            raise Exception("Invalid response format from Gemini API")
-
-        except httpx.TimeoutException:
-            last_error = Exception("Gemini request timed out.")
-            if attempt == 1:
-                print(f"Gemini timeout after 2 attempts")
-                raise last_error
-            print(f"Gemini timeout, retrying... (attempt {attempt + 1})")
-
-        except Exception as e:
-            last_error = e
-            error_str = str(e)
-            print(f"Gemini API error (attempt {attempt + 1}): {error_str}")
-
-            # If it's not a timeout, don't retry
-            if not isinstance(e, httpx.TimeoutException):
-                raise e
-
-    # Fallback if loop exits without returning
-    if last_error:
-        raise last_error
-    raise Exception("Unknown error in Gemini API call")
-
-def call_openai(system_prompt: str, user_prompt: str, max_tokens: int = 4000) -> str:
-    """Call OpenAI API as third fallback."""
-    try:
-        print(f"Falling back to OpenAI API")
-        response = get_openai_client().chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.3,
-            max_tokens=max_tokens
-        )
-        result = response.choices[0].message.content or ""
-        print(f"OpenAI API success")
-        return result
-    except Exception as e:
-        error_str = str(e)
-        print(f"OpenAI API error: {error_str}")
-        raise Exception(f"OpenAI error: {error_str}")
-
-def call_llm(system_prompt: str, user_prompt: str, max_tokens: int = 4000) -> str:
-    """Call LLM with automatic fallback: Groq → Gemini → OpenAI."""
-    full_prompt = f"{system_prompt}\n\n{user_prompt}"
+from services.corpus_store import corpus_store
 
-    # Try Groq first
-    try:
-        response = get_groq_client().chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.3,
-            max_tokens=max_tokens
-        )
-        return response.choices[0].message.content or ""
-    except Exception as e:
-        error_str = str(e)
-        # Check if it's a rate limit error (429)
-        if "429" in error_str or "rate_limit" in error_str.lower():
-            print(f"Groq rate limit hit, falling back to Gemini")
-            try:
-                # Fall back to Gemini
-                return call_gemini(full_prompt, max_tokens)
-            except Exception as gemini_error:
-                gemini_error_str = str(gemini_error)
-                print(f"Gemini fallback failed: {gemini_error_str}")
-
-                # If Gemini is also rate limited, try OpenAI
-                if "429" in gemini_error_str or "rate_limit" in gemini_error_str.lower():
-                    try:
-                        return call_openai(system_prompt, user_prompt, max_tokens)
-                    except Exception as openai_error:
-                        print(f"OpenAI fallback failed: {str(openai_error)}")
-                        raise Exception(f"All LLM services failed: Groq and Gemini rate limited, OpenAI error: {str(openai_error)}")
-                else:
-                    raise Exception(f"Groq rate limited, Gemini error: {gemini_error_str}")
-        else:
-            print(f"Groq error: {error_str}")
-            raise e
+# Chapter lookups are a dict hit on "1-1" or "1.1"; follows corpus edits
+chapter_index = ChapterIndex(corpus_store)
 
 
 class TranslateRequest(BaseModel):
@@ -178,162 +44,157 @@ class PersonalizeResponse(BaseModel):
 
 
 @router.post("/translate", response_model=TranslateResponse)
-async def translate_content(request: TranslateRequest):
+async def translate_content(
+    request: TranslateRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """
     Translate text to Urdu (or other languages).
     Keeps technical terms in English for clarity.
+    Repeat requests for the same content are served from the content cache;
+    identical concurrent requests share one generation.
     """
     try:
-        system_prompt = """You are an expert translator specializing in technical and educational content.
-Translate the following content to Urdu while:
-1. Keeping technical terms (like ROS 2, URDF, NVIDIA, Python, Gazebo, Isaac, LLM, API, etc.) in English
-2. Using proper Urdu script (نستعلیق)
-3. Keeping code blocks and commands exactly as they are
-4. Preserving the educational and clear tone
-5. Making the translation natural and easy to understand for Urdu speakers
-
-Only return the translated text, nothing else."""
-
-        user_prompt = f"Translate this to Urdu:\n\n{request.content}"
-
-        translated = call_llm(system_prompt, user_prompt, max_tokens=4000)
+        translated = await coalesce(
+            "translate",
+            fingerprint(request.content, request.target_language),
+            lambda: content_service.translate(request.content, request.target_language),
+            idempotency_key
+        )
 
         return TranslateResponse(
             translated_content=translated,
             target_language=request.target_language
         )
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ProvidersUnavailableError:
+        raise  # 429/503 with Retry-After, see main.py
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/personalize", response_model=PersonalizeResponse)
-async def personalize_content(request: PersonalizeRequest):
+async def personalize_content(
+    request: PersonalizeRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """
     Personalize content based on user's experience level.
     Adjusts complexity, adds explanations, or provides advanced insights.
+    Repeat requests for the same content are served from the content cache;
+    identical concurrent requests share one generation.
     """
     try:
-        level_instructions = {
-            "beginner": """Explain concepts in simpler terms.
-Add more context and background information.
-Use analogies to explain technical concepts.
-Break down complex ideas into smaller steps.
-Define technical terms when first used.""",
-            "intermediate": """Maintain the current level of technical detail.
-Add practical tips and common pitfalls to avoid.
-Include connections to related concepts.
-Provide context for why things work the way they do.""",
-            "advanced": """Add more technical depth and nuances.
-Include advanced use cases and optimizations.
-Reference underlying implementations.
-Discuss trade-offs and alternative approaches.
-Add links to further reading for deep dives."""
-        }
+        personalized = await coalesce(
+            "personalize",
+            fingerprint(request.content, request.user_level),
+            lambda: content_service.personalize(request.content, request.user_level),
+            idempotency_key
+        )
 
-        level_instruction = level_instructions.get(request.user_level, level_instructions["intermediate"])
+        return PersonalizeResponse(
+            personalized_content=personalized
+        )
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ProvidersUnavailableError:
+        raise  # 429/503 with Retry-After, see main.py
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        system_prompt = f"""You are an expert educator specializing in robotics and AI.
-Personalize the following educational content for a {request.user_level} level learner.
 
-Guidelines:
-{level_instruction}
+def stream_pieces(total: int, pieces):
+    """
+    Server-sent events for piecewise generation: one "piece" event per finished
+    piece (with its index, in completion order), then "done"; "error" on failure.
+    """
+    async def events():
+        try:
+            async for index, content in pieces:
+                data = {"index": index, "total": total, "content": content}
+                yield f"event: piece\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+            return
+        yield f"event: done\ndata: {json.dumps({'total': total})}\n\n"
 
-Keep all code examples intact but add comments if helpful.
-Maintain the overall structure but adjust explanations.
-Keep technical terms but explain them appropriately for the level.
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-Return the personalized content only, no meta-commentary."""
 
-        user_prompt = f"Personalize this content:\n\n{request.content}"
+@router.post("/translate/stream")
+async def translate_content_stream(request: TranslateRequest):
+    """
+    Translate long content piece by piece, streaming each piece as it completes.
+    """
+    total, pieces = content_service.translate_pieces(request.content, request.target_language)
+    return stream_pieces(total, pieces)
 
-        personalized = call_llm(system_prompt, user_prompt, max_tokens=4000)
 
-        return PersonalizeResponse(
-            personalized_content=personalized
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+@router.post("/personalize/stream")
+async def personalize_content_stream(request: PersonalizeRequest):
+    """
+    Personalize long content piece by piece, streaming each piece as it completes.
+    """
+    total, pieces = content_service.personalize_pieces(request.content, request.user_level)
+    return stream_pieces(total, pieces)
 
 
-@router.get("/chapters")
-async def get_chapters():
+@router.get("/cache/stats")
+async def get_cache_stats():
     """
-    Get list of all chapters.
+    Get hit/miss counters and size of the translation/personalization cache.
     """
-    return {
-        "modules": [
-            {
-                "id": "module-1",
-                "title": "The Robotic Nervous System (ROS 2)",
-                "chapters": [
-                    {"id": "1-1", "title": "Introduction to Physical AI"},
-                    {"id": "1-2", "title": "ROS 2 Architecture"},
-                    {"id": "1-3", "title": "Building ROS 2 Packages"},
-                    {"id": "1-4", "title": "URDF for Humanoids"}
-                ]
-            },
-            {
-                "id": "module-2",
-                "title": "The Digital Twin (Gazebo & Unity)",
-                "chapters": [
-                    {"id": "2-1", "title": "Gazebo Simulation Environment"},
-                    {"id": "2-2", "title": "Sensor Simulation"},
-                    {"id": "2-3", "title": "Unity for Robot Visualization"}
-                ]
-            },
-            {
-                "id": "module-3",
-                "title": "The AI-Robot Brain (NVIDIA Isaac)",
-                "chapters": [
-                    {"id": "3-1", "title": "NVIDIA Isaac Sim"},
-                    {"id": "3-2", "title": "Isaac ROS"},
-                    {"id": "3-3", "title": "Navigation with Nav2"},
-                    {"id": "3-4", "title": "Sim-to-Real Transfer"}
-                ]
-            },
-            {
-                "id": "module-4",
-                "title": "Vision-Language-Action (VLA)",
-                "chapters": [
-                    {"id": "4-1", "title": "Voice-to-Action"},
-                    {"id": "4-2", "title": "Cognitive Planning with LLMs"},
-                    {"id": "4-3", "title": "Multi-Modal Interaction"},
-                    {"id": "4-4", "title": "Capstone Project"}
-                ]
-            }
-        ]
-    }
+    return content_cache.stats()
 
 
-@router.get("/chapter/{chapter_id}")
-async def get_chapter(chapter_id: str):
+@router.get("/chapters")
+async def get_chapters(request: Request):
     """
-    Get content for a specific chapter.
+    Get list of all chapters, grouped by module.
     """
-    # Convert chapter_id format (e.g., "1-1" to "1.1")
-    normalized_id = chapter_id.replace("-", ".")
+    return cached_response(request, chapter_index.listing)
 
-    for chapter in CHAPTERS:
-        if chapter["chapter"] == normalized_id:
-            return {
-                "chapter": chapter["chapter"],
-                "title": chapter["title"],
-                "content": chapter["content"]
-            }
 
-    return {"error": "Chapter not found"}
+@router.get("/chapter/{chapter_id}")
+async def get_chapter(request: Request, chapter_id: str, lang: str = "english", level: str = "original"):
+    """
+    Get content for a specific chapter ("1-1" and "1.1" ids both work).
+    Optionally request a precomputed variant: lang ("english", "urdu") and
+    level ("original", "beginner", "intermediate", "advanced").
+    Variants are generated offline by pregenerate.py; no LLM call is made here.
+    Variants of a chapter edited since they were generated are not available.
+    """
+    chapter = chapter_index.get(chapter_id)
+    if chapter is None:
+        return {"error": "Chapter not found"}
+
+    if (lang, level) == ("english", "original"):
+        payload = chapter_index.payload(chapter_id)
+        if payload is None:
+            # Removed by the corpus watcher since the lookup above
+            return {"error": "Chapter not found"}
+        return cached_response(request, payload)
+
+    content = variant_store.get(chapter["chapter"], lang, level)
+    if content is None:
+        return {"error": "Variant not available", "lang": lang, "level": level}
+    return cached_response(request, CachedPayload({
+        "chapter": chapter["chapter"],
+        "title": chapter["title"],
+        "content": content,
+        "lang": lang,
+        "level": level
+    }))
 
 
 @router.get("/status")
-async def get_status():
+async def get_status(request: Request):
     """
     Get the status of the content service.
     """
-    return {
-        "status": "ready",
-        "total_chapters": len(CHAPTERS),
-        "chapters": [
-            {"id": ch["chapter"], "title": ch["title"]}
-            for ch in CHAPTERS
-        ]
-    }
+    return cached_response(request, chapter_index.status)
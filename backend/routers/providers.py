@@ -0,0 +1,16 @@
+"""
+Providers Router - Inspect LLM provider health and routing state
+"""
+
+from fastapi import APIRouter
+from services.provider_router import provider_router
+
+router = APIRouter()
+
+
+@router.get("/status")
+async def get_provider_status():
+    """
+    Get per-provider latency, error rate and circuit breaker state.
+    """
+    return provider_router.snapshot()
@@ -0,0 +1,187 @@
+"""
+Admission Control - Per-provider concurrency limits with priority queueing
+Interactive chat is admitted ahead of bulk translate/personalize work, and a
+request whose expected queue wait would overrun its deadline is shed at once
+instead of piling onto a provider that is already saturated.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from services.metrics import registry
+
+
+def _parse_map(value: str) -> Dict[str, float]:
+    return {name: float(number) for name, number in (item.split("=") for item in value.split(",") if item)}
+
+
+# Concurrent calls allowed per provider, across all worker processes
+PROVIDER_CONCURRENCY = _parse_map(os.getenv("LLM_CONCURRENCY", "groq=8,gemini=8,openai=8"))
+DEFAULT_CONCURRENCY = 8
+# Worker processes sharing those limits (gunicorn and uvicorn both read WEB_CONCURRENCY)
+WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+# Requests allowed to wait per provider before new ones are refused
+MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+# Seconds each endpoint's request may take in total, queueing included
+ENDPOINT_DEADLINES = _parse_map(os.getenv("LLM_DEADLINES", "chat=30,translate=120,personalize=120,summarize=120"))
+DEFAULT_DEADLINE = 60.0
+# Lower is served first; conversation summaries are background work
+ENDPOINT_PRIORITY = {"chat": 0, "translate": 1, "personalize": 1, "summarize": 2}
+DEFAULT_PRIORITY = 1
+WAIT_WINDOW = 200
+
+QUEUE_WAIT_SECONDS = registry.histogram(
+    "llm_queue_wait_seconds", "Time admitted requests waited for a provider slot", ("provider", "priority")
+)
+
+
+class AdmissionRejected(Exception):
+    """The request was shed; `retry_after` estimates when capacity frees up."""
+
+    def __init__(self, provider: str, reason: str, retry_after: float):
+        super().__init__(f"{provider} {reason}")
+        self.provider = provider
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def request_ticket(endpoint: Optional[str]) -> Tuple[int, float]:
+    """(priority, absolute deadline) for a new request to `endpoint`."""
+    deadline = ENDPOINT_DEADLINES.get(endpoint or "", DEFAULT_DEADLINE)
+    return ENDPOINT_PRIORITY.get(endpoint or "", DEFAULT_PRIORITY), time.monotonic() + deadline
+
+
+class ProviderQueue:
+    """
+    Counting semaphore for one provider whose waiters are served in
+    (priority, arrival) order. A released slot is handed straight to the
+    next waiter, so a later arrival cannot jump the queue.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int = MAX_QUEUE):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._waiting = 0
+        self._sequence = itertools.count()
+        self.admitted = 0
+        self.shed = 0
+        self.timed_out = 0
+        self.waits: Dict[int, deque] = {}
+
+    def depth(self) -> int:
+        return self._waiting
+
+    def expected_wait(self, priority: int, service_time: float) -> float:
+        """Queue wait for a new request: waiters served before it, `limit` at a time."""
+        if self.active < self.limit and not self._waiting:
+            return 0.0
+        ahead = sum(1 for p, _, future in self._waiters if p <= priority and not future.done())
+        return (ahead + 1) / self.limit * service_time
+
+    def _record_wait(self, priority: int, seconds: float):
+        self.waits.setdefault(priority, deque(maxlen=WAIT_WINDOW)).append(seconds)
+        QUEUE_WAIT_SECONDS.observe(seconds, self.name, str(priority))
+
+    async def acquire(self, priority: int, deadline: float, service_time: float):
+        now = time.monotonic()
+        if self.active < self.limit and not self._waiting:
+            self.active += 1
+            self.admitted += 1
+            self._record_wait(priority, 0.0)
+            return
+
+        wait = self.expected_wait(priority, service_time)
+        if self._waiting >= self.max_queue:
+            self.shed += 1
+            raise AdmissionRejected(self.name, "queue is full", wait)
+        if now + wait + service_time > deadline:
+            self.shed += 1
+            raise AdmissionRejected(self.name, "expected wait exceeds the request deadline", wait)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._waiting += 1
+        try:
+            # Give up once there is no longer time to be served
+            await asyncio.wait_for(asyncio.shield(future), timeout=max(0.0, deadline - now - service_time))
+        except asyncio.TimeoutError:
+            if not future.done():
+                future.cancel()
+                self._waiting -= 1
+                self.timed_out += 1
+                raise AdmissionRejected(self.name, "deadline passed while queued", service_time)
+        except asyncio.CancelledError:
+            if not future.done():
+                future.cancel()
+                self._waiting -= 1
+                raise
+            # The slot was handed over just as the caller went away
+            self.release()
+            raise
+        self.admitted += 1
+        self._record_wait(priority, time.monotonic() - now)
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue  # timed out or cancelled
+            self._waiting -= 1
+            future.set_result(None)  # the slot passes to this waiter
+            return
+        self.active -= 1
+
+    def snapshot(self) -> Dict:
+        waits = {}
+        for priority, samples in self.waits.items():
+            ordered = sorted(samples)
+            waits[str(priority)] = {
+                "p50": round(ordered[len(ordered) // 2], 3),
+                "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+            } if ordered else {}
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": self._waiting,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "timed_out": self.timed_out,
+            "wait_seconds": waits,
+        }
+
+
+class AdmissionController:
+    """One ProviderQueue per provider; each worker gets its share of the limits."""
+
+    def __init__(self, providers, concurrency: Dict[str, float] = PROVIDER_CONCURRENCY, workers: int = WORKERS):
+        self.queues = {
+            name: ProviderQueue(name, max(1, math.ceil(concurrency.get(name, DEFAULT_CONCURRENCY) / workers)))
+            for name in providers
+        }
+
+    @asynccontextmanager
+    async def slot(self, provider: str, priority: int, deadline: float, service_time: float) -> AsyncIterator[None]:
+        """Hold one of the provider's concurrency slots for the duration of a call."""
+        queue = self.queues[provider]
+        await queue.acquire(priority, deadline, service_time)
+        try:
+            yield
+        finally:
+            queue.release()
+
+    def snapshot(self) -> Dict:
+        return {
+            "priorities": ENDPOINT_PRIORITY,
+            "deadlines": ENDPOINT_DEADLINES,
+            "providers": {name: queue.snapshot() for name, queue in self.queues.items()},
+        }
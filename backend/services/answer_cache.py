@@ -0,0 +1,154 @@
+"""
+Answer Cache - Semantic cache for RAG chat answers
+Exact hits on the normalized question, near-duplicate hits by vector similarity
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.search_index import TOKEN_PATTERN
+from services.vector_index import HashingEmbedder
+
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+# Cosine similarity above which two phrasings count as the same question
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.85"))
+
+Scope = Tuple[Tuple[str, ...], str, str]
+
+# The embedder drops these as stop words, but they change what is being asked
+QUESTION_WORDS = frozenset({"what", "when", "where", "which", "who", "why", "how"})
+
+
+def normalize_question(question: str) -> str:
+    """
+    Lower-case, drop punctuation, collapse whitespace. Every word is kept:
+    "Why use URDF?" and "How do I use URDF?" are different questions.
+    """
+    return " ".join(TOKEN_PATTERN.findall(question.lower()))
+
+
+def question_words(normalized: str) -> frozenset:
+    return QUESTION_WORDS.intersection(normalized.split())
+
+
+def answer_scope(chapter_ids: List[str], language: str, context: Optional[str]) -> Scope:
+    """Answers are only reused for the same retrieved chapters, language and selected text."""
+    context_hash = hashlib.sha256(context.encode("utf-8")).hexdigest() if context else ""
+    return tuple(sorted(chapter_ids)), language.lower(), context_hash
+
+
+class AnswerCache:
+    """
+    LRU cache with a TTL. Entries are grouped by scope so a near-duplicate
+    lookup only compares against questions that retrieved the same chapters
+    and use the same question words.
+    A lock guards the entries: invalidation runs in the corpus watcher's thread.
+    """
+
+    def __init__(
+        self,
+        ttl: float = ANSWER_CACHE_TTL,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        similarity: float = ANSWER_CACHE_SIMILARITY
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.embedder = HashingEmbedder()
+        self._entries: "OrderedDict[Tuple[Scope, str], Dict]" = OrderedDict()
+        self._by_scope: Dict[Scope, set] = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def _drop(self, key: Tuple[Scope, str]):
+        self._entries.pop(key, None)
+        keys = self._by_scope.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_scope[key[0]]
+
+    def get(self, question: str, scope: Scope) -> Optional[str]:
+        now = time.monotonic()
+        normalized = normalize_question(question)
+        key = (scope, normalized)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires"] > now:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry["answer"]
+
+        best_key, best_score = None, self.similarity
+        vector = self.embedder.embed(normalized)
+        asks = question_words(normalized)
+        with self._lock:
+            for other in list(self._by_scope.get(scope, ())):
+                candidate = self._entries[other]
+                if candidate["expires"] <= now:
+                    self._drop(other)
+                    continue
+                # Near-duplicates must ask the same kind of question
+                if candidate["asks"] != asks:
+                    continue
+                score = float(np.dot(vector, candidate["vector"]))
+                if score >= best_score:
+                    best_key, best_score = other, score
+
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.similar_hits += 1
+            return self._entries[best_key]["answer"]
+
+    def set(self, question: str, scope: Scope, answer: str):
+        normalized = normalize_question(question)
+        key = (scope, normalized)
+        entry = {
+            "answer": answer,
+            "vector": self.embedder.embed(normalized),
+            "asks": question_words(normalized),
+            "expires": time.monotonic() + self.ttl,
+        }
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = entry
+            self._by_scope.setdefault(scope, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_chapters(self, chapter_ids: List[str]) -> int:
+        """
+        Drop every answer whose scope includes one of the given chapters, plus
+        the unscoped ones, which were built from the chapter openings.
+        """
+        targets = set(chapter_ids)
+        dropped = 0
+        with self._lock:
+            stale = [scope for scope in self._by_scope if not scope[0] or targets.intersection(scope[0])]
+            for scope in stale:
+                for key in list(self._by_scope.get(scope, ())):
+                    self._drop(key)
+                    dropped += 1
+        return dropped
+
+    def stats(self) -> Dict:
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.similar_hits) / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,136 @@
+"""
+Chapter Index - Pre-serialized chapter payloads with strong ETags
+Serialized once per chapter version so chapter endpoints are a dict lookup
+plus a header check
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from fastapi import Request, Response
+
+from services.corpus_store import CorpusStore, module_of
+
+# Browsers and CDNs may reuse chapter responses for this long without revalidating
+CHAPTER_MAX_AGE = int(os.getenv("CHAPTER_CACHE_MAX_AGE", "300"))
+# Serialized chapter payloads kept in memory
+CHAPTER_PAYLOAD_CACHE = int(os.getenv("CHAPTER_PAYLOAD_CACHE", "128"))
+
+
+class CachedPayload:
+    """A JSON body serialized once, with its strong ETag."""
+
+    def __init__(self, data, cache_control: str = f"public, max-age={CHAPTER_MAX_AGE}"):
+        self.body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+        self.cache_control = cache_control
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison is what If-None-Match calls for
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def cached_response(request: Request, payload: CachedPayload) -> Response:
+    """Return the payload, or 304 Not Modified when the client already has it."""
+    headers = {"ETag": payload.etag, "Cache-Control": payload.cache_control}
+    if etag_matches(request.headers.get("if-none-match"), payload.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload.body, media_type="application/json", headers=headers)
+
+
+class ChapterIndex:
+    """
+    Chapters keyed by both "1-1" and "1.1" ids, plus the listing and status payloads.
+    Chapter payloads are serialized on first request and kept in an LRU; a
+    corpus change drops only the affected payloads and rebuilds the metadata.
+    Changes arrive from the corpus watcher's thread, so the LRU is locked.
+    """
+
+    def __init__(self, corpus: CorpusStore, max_payloads: int = CHAPTER_PAYLOAD_CACHE):
+        self.corpus = corpus
+        self.max_payloads = max_payloads
+        self._payloads: "OrderedDict[str, CachedPayload]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every change, so a payload read before the change is not cached after it
+        self._generation = 0
+        self.rebuild()
+        corpus.subscribe(self.apply_changes)
+
+    def rebuild(self):
+        """Rebuild the id aliases, listing and status from corpus metadata."""
+        chapters = self.corpus.chapters()
+        modules = self.corpus.modules()
+        aliases: Dict[str, str] = {}
+        for chapter in chapters:
+            for chapter_id in (chapter["chapter"], chapter["chapter"].replace(".", "-")):
+                aliases[chapter_id] = chapter["chapter"]
+
+        listing: List[Dict] = []
+        for chapter in chapters:
+            module_number = module_of(chapter["chapter"])
+            if not listing or listing[-1]["id"] != f"module-{module_number}":
+                listing.append({
+                    "id": f"module-{module_number}",
+                    "title": modules.get(module_number, f"Module {module_number}"),
+                    "chapters": []
+                })
+            listing[-1]["chapters"].append({
+                "id": chapter["chapter"].replace(".", "-"),
+                "title": chapter.get("short_title", chapter["title"])
+            })
+
+        # Swap everything in at once so readers never see a half-built index
+        self.aliases = aliases
+        self.listing = CachedPayload({"modules": listing})
+        self.status = CachedPayload({
+            "status": "ready",
+            "total_chapters": len(chapters),
+            "chapters": [{"id": ch["chapter"], "title": ch["title"]} for ch in chapters]
+        }, cache_control="no-cache")
+
+    def apply_changes(self, changed: List[str], removed: List[str]):
+        with self._lock:
+            self._generation += 1
+            for chapter_id in list(changed) + list(removed):
+                self._payloads.pop(chapter_id, None)
+        self.rebuild()
+
+    def get(self, chapter_id: str) -> Optional[Dict]:
+        """Chapter metadata (without the body)."""
+        canonical = self.aliases.get(chapter_id)
+        return self.corpus.get(canonical) if canonical else None
+
+    def payload(self, chapter_id: str) -> Optional[CachedPayload]:
+        canonical = self.aliases.get(chapter_id)
+        if canonical is None:
+            return None
+        with self._lock:
+            payload = self._payloads.get(canonical)
+            if payload is not None:
+                self._payloads.move_to_end(canonical)
+                return payload
+            generation = self._generation
+        chapter = self.corpus.chapter(canonical)
+        if chapter is None:
+            return None
+        payload = CachedPayload({
+            "chapter": chapter["chapter"],
+            "title": chapter["title"],
+            "content": chapter["content"],
+            "lang": "english",
+            "level": "original"
+        })
+        with self._lock:
+            if generation == self._generation:
+                self._payloads[canonical] = payload
+                while len(self._payloads) > self.max_payloads:
+                    self._payloads.popitem(last=False)
+        return payload
@@ -0,0 +1,136 @@
+"""
+Chapter Variants - Precomputed translated and personalized chapters
+Generated offline by pregenerate.py and served without any LLM call
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+
+from services import content_service
+from services.corpus_store import CorpusStore, corpus_store
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "chapter_variants.jsonl")
+VARIANTS_PATH = os.getenv("CONTENT_VARIANTS_PATH", DEFAULT_PATH)
+
+LANGUAGES = ("english", "urdu")
+# "original" keeps the textbook wording; the others go through personalize
+LEVELS = ("original", "beginner", "intermediate", "advanced")
+
+
+def variant_matrix() -> Iterator[Tuple[str, str]]:
+    """Every (language, level) pair except the original English text."""
+    for language in LANGUAGES:
+        for level in LEVELS:
+            if (language, level) != ("english", "original"):
+                yield language, level
+
+
+def source_hash(content: str) -> str:
+    """Identifies the chapter text a variant was generated from."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+async def generate_variant(content: str, language: str, level: str) -> str:
+    """Personalize first, then translate, so each step hits the content cache."""
+    if level != "original":
+        content = await content_service.personalize(content, level)
+    if language != "english":
+        content = await content_service.translate(content, language)
+    return content
+
+
+class VariantStore:
+    """
+    Append-only JSONL artifact of generated variants, one record per line.
+    Each appended line is a checkpoint, so an interrupted job resumes where
+    it stopped. Readers reload the file when its modification time changes.
+    Every record carries the hash of the chapter text it was generated from;
+    once the chapter is edited its variants are stale and no longer served.
+    """
+
+    def __init__(self, path: str = VARIANTS_PATH, corpus: CorpusStore = corpus_store):
+        self.path = path
+        self.corpus = corpus
+        # (chapter, language, level) -> (source hash, content)
+        self._variants: Dict[Tuple[str, str, str], Tuple[str, str]] = {}
+        # chapter -> (corpus signature, source hash), so a body is hashed once per version
+        self._sources: Dict[str, Tuple[str, str]] = {}
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        variants = {}
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # partial line from an interrupted write
+                if record.get("prompt_version") != content_service.PROMPT_VERSION:
+                    continue
+                # Records written before sources were tracked never match, so they are regenerated
+                variants[(record["chapter"], record["language"], record["level"])] = (
+                    record.get("source", ""), record["content"]
+                )
+        self._variants = variants
+        self._mtime = mtime
+
+    def current_source(self, chapter: str) -> Optional[str]:
+        """Source hash of the chapter as it is now, or None if it is gone."""
+        signature = self.corpus.signature(chapter)
+        if signature is None:
+            return None
+        with self._lock:
+            cached = self._sources.get(chapter)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        body = self.corpus.chapter(chapter)
+        if body is None:
+            return None
+        source = source_hash(body["content"])
+        with self._lock:
+            self._sources[chapter] = (signature, source)
+        return source
+
+    def get(self, chapter: str, language: str, level: str) -> Optional[str]:
+        """The variant, if it was generated from the chapter's current text."""
+        with self._lock:
+            self._load()
+            variant = self._variants.get((chapter, language, level))
+        if variant is None or variant[0] != self.current_source(chapter):
+            return None
+        return variant[1]
+
+    def is_current(self, chapter: str, language: str, level: str) -> bool:
+        return self.get(chapter, language, level) is not None
+
+    def append(self, chapter: str, language: str, level: str, content: str, source: str):
+        """`source` is source_hash() of the chapter text the variant was generated from."""
+        record = {
+            "chapter": chapter,
+            "language": language,
+            "level": level,
+            "prompt_version": content_service.PROMPT_VERSION,
+            "source": source,
+            "content": content,
+        }
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._variants[(chapter, language, level)] = (source, content)
+
+
+# Shared store read by the content router
+variant_store = VariantStore()
@@ -0,0 +1,228 @@
+"""
+Chat Store - Persistent chat history and feedback with write-behind batching
+Chat handlers only append to an in-memory buffer; a background task writes
+the buffer to SQLite in batched transactions.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from services.metrics import registry
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".data", "chat.sqlite3")
+CHAT_DB_PATH = os.getenv("CHAT_DB_PATH", DEFAULT_PATH)
+# Seconds between background flushes
+CHAT_FLUSH_INTERVAL = float(os.getenv("CHAT_FLUSH_INTERVAL", "1.0"))
+# A buffer this large is flushed without waiting for the interval
+CHAT_FLUSH_BATCH = int(os.getenv("CHAT_FLUSH_BATCH", "500"))
+# Records held in memory at most; beyond this the oldest are dropped
+CHAT_BUFFER_MAX = int(os.getenv("CHAT_BUFFER_MAX", "50000"))
+
+INSERT_MESSAGE = (
+    "INSERT OR IGNORE INTO messages (message_id, user_id, question, answer, sources, language, created_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+INSERT_FEEDBACK = "INSERT INTO feedback (message_id, rating, feedback, created_at) VALUES (?, ?, ?, ?)"
+
+
+class ChatStore:
+    """
+    Append-only messages and feedback. Messages are indexed by
+    (user_id, seq) for history pages and by message_id for feedback.
+    """
+
+    def __init__(
+        self,
+        path: str = CHAT_DB_PATH,
+        flush_interval: float = CHAT_FLUSH_INTERVAL,
+        flush_batch: int = CHAT_FLUSH_BATCH,
+        buffer_max: int = CHAT_BUFFER_MAX
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.buffer_max = buffer_max
+        self._buffer: List[Tuple[str, tuple]] = []
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self.flushed = 0
+        self.batches = 0
+        self.dropped = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, message_id TEXT NOT NULL UNIQUE, user_id TEXT, "
+                "question TEXT NOT NULL, answer TEXT NOT NULL, sources TEXT NOT NULL, "
+                "language TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS messages_user ON messages (user_id, seq)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS feedback ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, message_id TEXT NOT NULL, "
+                "rating TEXT NOT NULL, feedback TEXT, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS feedback_message ON feedback (message_id)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    # Hot path: buffer only
+
+    def _append(self, statement: str, row: tuple):
+        self._buffer.append((statement, row))
+        if len(self._buffer) > self.buffer_max:
+            # The disk has fallen far behind; shed the oldest records rather than memory
+            overflow = len(self._buffer) - self.buffer_max
+            del self._buffer[:overflow]
+            self.dropped += overflow
+        if len(self._buffer) >= self.flush_batch and self._wakeup is not None:
+            self._wakeup.set()
+
+    def record_message(
+        self,
+        message_id: str,
+        user_id: Optional[str],
+        question: str,
+        answer: str,
+        sources: List[Dict],
+        language: str
+    ):
+        self._append(INSERT_MESSAGE, (
+            message_id, user_id, question, answer,
+            json.dumps(sources, ensure_ascii=False), language, time.time()
+        ))
+
+    def record_feedback(self, message_id: str, rating: str, feedback: Optional[str]):
+        self._append(INSERT_FEEDBACK, (message_id, rating, feedback, time.time()))
+
+    # Background writer
+
+    def _write(self, batch: List[Tuple[str, tuple]]):
+        with self._lock:
+            conn = self._connect()
+            with conn:  # one transaction per batch
+                for statement in (INSERT_MESSAGE, INSERT_FEEDBACK):
+                    rows = [row for stmt, row in batch if stmt == statement]
+                    if rows:
+                        conn.executemany(statement, rows)
+
+    async def flush(self):
+        """Write everything buffered so far."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            while self._buffer:
+                batch, self._buffer = self._buffer[:self.flush_batch], self._buffer[self.flush_batch:]
+                try:
+                    await run_in_threadpool(self._write, batch)
+                except Exception:
+                    # Keep the records for the next attempt
+                    self._buffer[:0] = batch
+                    raise
+                self.flushed += len(batch)
+                self.batches += 1
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Chat store flush failed, will retry: {e}")
+
+    def start(self):
+        if self._flusher is None:
+            self._wakeup = asyncio.Event()
+            self._flusher = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # Reads
+
+    def _history(self, user_id: str, limit: int, before: Optional[int]) -> List[Dict]:
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT seq, message_id, question, answer, sources, language, created_at FROM messages "
+                "WHERE user_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                (user_id, before if before is not None else 2 ** 63 - 1, limit)
+            ).fetchall()
+        return [
+            {
+                "seq": seq,
+                "message_id": message_id,
+                "question": question,
+                "answer": answer,
+                "sources": json.loads(sources),
+                "language": language,
+                "created_at": created_at,
+            }
+            for seq, message_id, question, answer, sources, language, created_at in rows
+        ]
+
+    async def history(self, user_id: str, limit: int = 50, cursor: Optional[str] = None) -> Dict:
+        """
+        One page of a user's messages, newest first. Pass the returned
+        `next_cursor` to get the next (older) page; it is None on the last page.
+        Buffered writes are flushed first so a user always sees their latest message.
+        """
+        await self.flush()
+        before = int(cursor) if cursor else None
+        messages = await run_in_threadpool(self._history, user_id, limit, before)
+        next_cursor = str(messages[-1]["seq"]) if len(messages) == limit else None
+        for message in messages:
+            del message["seq"]
+        return {"messages": messages, "next_cursor": next_cursor}
+
+    def stats(self) -> Dict:
+        return {
+            "buffered": len(self._buffer),
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "dropped": self.dropped,
+        }
+
+
+# Shared store for the chat router
+chat_store = ChatStore()
+
+registry.collector(
+    "chat_store_buffered", "Chat records waiting to be written", "gauge",
+    lambda: [("", {}, len(chat_store._buffer))]
+)
+registry.collector(
+    "chat_store_records_total", "Chat records written to disk or dropped on overflow", "counter",
+    lambda: [("", {"result": "flushed"}, chat_store.flushed), ("", {"result": "dropped"}, chat_store.dropped)]
+)
@@ -0,0 +1,140 @@
+"""
+Chunking - Paragraph-level chunk store and token-budgeted context packing
+Chapters are split once at ingestion; prompts only carry the chunks that matter
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from services.search_index import tokenize
+
+PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+
+# Paragraphs shorter than this are merged with the following one
+MIN_CHUNK_CHARS = 200
+# Paragraphs longer than this are split at sentence boundaries
+MAX_CHUNK_CHARS = 1200
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+
+Span = Tuple[int, int]
+
+
+def _paragraph_spans(text: str) -> List[Span]:
+    """(start, end) offsets of the non-blank paragraphs in text."""
+    spans = []
+    position = 0
+    for separator in list(PARAGRAPH_SPLIT.finditer(text)) + [None]:
+        end = separator.start() if separator else len(text)
+        block = text[position:end]
+        stripped = block.strip()
+        if stripped:
+            start = position + block.index(stripped)
+            spans.append((start, start + len(stripped)))
+        if separator:
+            position = separator.end()
+    return spans
+
+
+def _split_long(text: str, span: Span, max_chars: int) -> List[Span]:
+    """Cut an over-long paragraph at sentence boundaries."""
+    start, end = span
+    if end - start <= max_chars:
+        return [span]
+    pieces = []
+    piece_start = start
+    last_break = None
+    for match in SENTENCE_BREAK.finditer(text, start, end):
+        if match.start() - piece_start > max_chars and last_break is not None:
+            pieces.append((piece_start, last_break[0]))
+            piece_start = last_break[1]
+        last_break = (match.start(), match.end())
+    if end - piece_start > max_chars and last_break is not None and last_break[1] > piece_start:
+        pieces.append((piece_start, last_break[0]))
+        piece_start = last_break[1]
+    pieces.append((piece_start, end))
+    return pieces
+
+
+def split_chapter(
+    chapter: Dict,
+    min_chars: int = MIN_CHUNK_CHARS,
+    max_chars: int = MAX_CHUNK_CHARS
+) -> List[Dict]:
+    """
+    Split one chapter into paragraph chunks that keep its metadata.
+    Chunks hold (start, end) offsets into the chapter body rather than a copy
+    of the text; use chunk_text() to read them.
+    """
+    text = chapter["content"]
+    paragraphs: List[Span] = []
+    for span in _paragraph_spans(text):
+        paragraphs.extend(_split_long(text, span, max_chars))
+
+    # Merge short neighbouring paragraphs; a merged span covers its separators
+    merged: List[Span] = []
+    buffer: Optional[Span] = None
+    for start, end in paragraphs:
+        buffer = (buffer[0], end) if buffer else (start, end)
+        if buffer[1] - buffer[0] >= min_chars:
+            merged.append(buffer)
+            buffer = None
+    if buffer:
+        if merged and buffer[1] - merged[-1][0] <= max_chars:
+            merged[-1] = (merged[-1][0], buffer[1])
+        else:
+            merged.append(buffer)
+
+    return [
+        {
+            "id": f"{chapter['chapter']}#{position}",
+            "chapter": chapter["chapter"],
+            "title": chapter["title"],
+            "position": position,
+            "start": start,
+            "end": end,
+        }
+        for position, (start, end) in enumerate(merged)
+    ]
+
+
+def chunk_text(body: str, chunk: Dict) -> str:
+    return body[chunk["start"]:chunk["end"]]
+
+
+def format_chunk(chunk: Dict) -> str:
+    return f"[Chapter {chunk['chapter']} - {chunk['title']}]\n{chunk['content']}"
+
+
+def pack_context(
+    ranked_chunks: List[Dict],
+    token_budget: int,
+    max_overlap: float = 0.8
+) -> List[Dict]:
+    """
+    Greedily fill the token budget with the best chunks.
+    A chunk is skipped when it does not fit or when its token set overlaps an
+    already selected chunk by more than `max_overlap` (Jaccard similarity).
+    """
+    selected: List[Dict] = []
+    selected_terms: List[set] = []
+    remaining = token_budget
+    for chunk in ranked_chunks:
+        cost = estimate_tokens(format_chunk(chunk))
+        if cost > remaining:
+            continue
+        terms = set(tokenize(chunk["content"]))
+        if any(
+            len(terms & other) / (len(terms | other) or 1) > max_overlap
+            for other in selected_terms
+        ):
+            continue
+        selected.append(chunk)
+        selected_terms.append(terms)
+        remaining -= cost
+    return selected
@@ -0,0 +1,204 @@
+"""
+Content Cache - Content-addressed cache for translated and personalized text
+An in-memory LRU tier in front of a SQLite tier that survives restarts
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from services.metrics import registry
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache", "content_cache.sqlite3")
+CACHE_PATH = os.getenv("CONTENT_CACHE_PATH", DEFAULT_PATH)
+MEMORY_ENTRIES = int(os.getenv("CONTENT_CACHE_MEMORY_ENTRIES", "256"))
+MAX_DISK_BYTES = int(os.getenv("CONTENT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+def normalize_content(content: str) -> str:
+    """Normalize text so trivially different copies share one cache entry."""
+    content = unicodedata.normalize("NFC", content).replace("\r\n", "\n")
+    return "\n".join(line.rstrip() for line in content.strip().split("\n"))
+
+
+def cache_key(kind: str, content: str, variant: str, prompt_version: str, model: str) -> str:
+    """Hash of (kind, normalized content, language or level, prompt version, model)."""
+    payload = json.dumps([kind, normalize_content(content), variant, prompt_version, model])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+SIZE_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS entries_added AFTER INSERT ON entries "
+    "BEGIN UPDATE totals SET bytes = bytes + NEW.size; END",
+    "CREATE TRIGGER IF NOT EXISTS entries_removed AFTER DELETE ON entries "
+    "BEGIN UPDATE totals SET bytes = bytes - OLD.size; END",
+    "CREATE TRIGGER IF NOT EXISTS entries_resized AFTER UPDATE OF size ON entries "
+    "BEGIN UPDATE totals SET bytes = bytes + NEW.size - OLD.size; END",
+)
+# An upsert rather than INSERT OR REPLACE, whose implicit delete skips the triggers
+UPSERT = (
+    "INSERT INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, accessed = excluded.accessed"
+)
+
+
+class ContentCache:
+    """
+    Two-tier cache. Memory holds the most recently used entries; SQLite holds
+    everything up to `max_disk_bytes`, evicting least recently used rows first.
+    The byte total lives in the database, kept by triggers, so every worker
+    process sharing the file enforces the same limit.
+    """
+
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        memory_entries: int = MEMORY_ENTRIES,
+        max_disk_bytes: int = MAX_DISK_BYTES
+    ):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Reopened after a fork: a connection must not be shared between processes
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+            conn.execute("CREATE TABLE IF NOT EXISTS totals (bytes INTEGER NOT NULL)")
+            conn.execute(
+                "INSERT INTO totals (bytes) SELECT COALESCE(SUM(size), 0) FROM entries "
+                "WHERE NOT EXISTS (SELECT 1 FROM totals)"
+            )
+            for trigger in SIZE_TRIGGERS:
+                conn.execute(trigger)
+            conn.commit()
+            self._disk_bytes = self._total(conn)
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def _total(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT bytes FROM totals").fetchone()[0]
+
+    def _remember(self, key: str, value: str):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+                conn.commit()
+            return row[0] if row else None
+
+    def _disk_set(self, key: str, value: str):
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            conn = self._connect()
+            # One write transaction, so the total cannot change underneath the eviction
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(UPSERT, (key, value, size, time.time()))
+                total = self._total(conn)
+                while total > self.max_disk_bytes:
+                    oldest = conn.execute(
+                        "SELECT key, size FROM entries WHERE key != ? ORDER BY accessed LIMIT 64", (key,)
+                    ).fetchall()
+                    if not oldest:
+                        break
+                    for old_key, old_size in oldest:
+                        conn.execute("DELETE FROM entries WHERE key = ?", (old_key,))
+                        total -= old_size
+                        self.evictions += 1
+                        if total <= self.max_disk_bytes:
+                            break
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            self._disk_bytes = total
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return value
+        value = await run_in_threadpool(self._disk_get, key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self._remember(key, value)
+        return value
+
+    async def set(self, key: str, value: str):
+        self._remember(key, value)
+        await run_in_threadpool(self._disk_set, key, value)
+
+    def stats(self) -> Dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "memory_entries": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+            "max_disk_bytes": self.max_disk_bytes,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+# Shared cache for the content endpoints
+content_cache = ContentCache()
+
+registry.collector(
+    "content_cache_hits_total", "Content cache lookups by tier (memory, disk or miss)", "counter",
+    lambda: [
+        ("", {"tier": "memory"}, content_cache.memory_hits),
+        ("", {"tier": "disk"}, content_cache.disk_hits),
+        ("", {"tier": "miss"}, content_cache.misses),
+    ]
+)
+registry.collector(
+    "content_cache_disk_bytes", "Bytes of generated content stored on disk", "gauge",
+    lambda: [("", {}, content_cache._disk_bytes)]
+)
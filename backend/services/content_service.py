@@ -0,0 +1,207 @@
+"""
+Content Service - Translation and personalization of textbook content
+Shared by the content router and offline jobs; results go through the content cache.
+Long content is split at paragraph and code-block boundaries and the pieces
+are generated concurrently, then reassembled in order.
+"""
+
+import asyncio
+import os
+import re
+import time
+from typing import AsyncIterator, Awaitable, Callable, List, Tuple
+
+from services.content_cache import cache_key, content_cache
+from services.llm_client import GEMINI_MODEL, GROQ_MODEL, OPENAI_MODEL
+from services.metrics import registry
+from services.provider_router import provider_router
+from services.singleflight import single_flight
+
+# Bump when the prompts below change so stale cache entries are not served
+PROMPT_VERSION = "1"
+# Any configured provider may answer, so the whole model set is part of the key
+MODEL_TAG = f"{GROQ_MODEL}|{GEMINI_MODEL}|{OPENAI_MODEL}"
+
+# Pieces are cut at paragraph boundaries once they reach this size
+PIECE_MAX_CHARS = int(os.getenv("CONTENT_PIECE_MAX_CHARS", "2500"))
+# Pieces of one request generated at the same time
+PIECE_CONCURRENCY = int(os.getenv("CONTENT_PIECE_CONCURRENCY", "4"))
+
+CODE_FENCE = re.compile(r"^\s*```")
+
+TRANSLATE_SYSTEM_PROMPT = """You are an expert translator specializing in technical and educational content.
+Translate the following content to Urdu while:
+1. Keeping technical terms (like ROS 2, URDF, NVIDIA, Python, Gazebo, Isaac, LLM, API, etc.) in English
+2. Using proper Urdu script (نستعلیق)
+3. Keeping code blocks and commands exactly as they are
+4. Preserving the educational and clear tone
+5. Making the translation natural and easy to understand for Urdu speakers
+
+Only return the translated text, nothing else."""
+
+LEVEL_INSTRUCTIONS = {
+    "beginner": """Explain concepts in simpler terms.
+Add more context and background information.
+Use analogies to explain technical concepts.
+Break down complex ideas into smaller steps.
+Define technical terms when first used.""",
+    "intermediate": """Maintain the current level of technical detail.
+Add practical tips and common pitfalls to avoid.
+Include connections to related concepts.
+Provide context for why things work the way they do.""",
+    "advanced": """Add more technical depth and nuances.
+Include advanced use cases and optimizations.
+Reference underlying implementations.
+Discuss trade-offs and alternative approaches.
+Add links to further reading for deep dives."""
+}
+
+
+def personalize_system_prompt(user_level: str) -> str:
+    level_instruction = LEVEL_INSTRUCTIONS.get(user_level, LEVEL_INSTRUCTIONS["intermediate"])
+    return f"""You are an expert educator specializing in robotics and AI.
+Personalize the following educational content for a {user_level} level learner.
+
+Guidelines:
+{level_instruction}
+
+Keep all code examples intact but add comments if helpful.
+Maintain the overall structure but adjust explanations.
+Keep technical terms but explain them appropriately for the level.
+
+Return the personalized content only, no meta-commentary."""
+
+
+def split_content(content: str, max_chars: int = PIECE_MAX_CHARS) -> List[str]:
+    """
+    Split content into pieces of up to `max_chars`, only at blank lines outside
+    fenced code blocks. A single paragraph or code block longer than the limit
+    stays whole rather than being cut mid-way.
+    """
+    blocks: List[str] = []
+    current: List[str] = []
+    in_code = False
+    for line in content.split("\n"):
+        if CODE_FENCE.match(line):
+            in_code = not in_code
+        if not line.strip() and not in_code:
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+            continue
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+
+    pieces: List[str] = []
+    for block in blocks:
+        if pieces and len(pieces[-1]) + len(block) + 2 <= max_chars:
+            pieces[-1] = f"{pieces[-1]}\n\n{block}"
+        else:
+            pieces.append(block)
+    return pieces or [content]
+
+
+CACHE_LOOKUPS = registry.counter(
+    "content_cache_lookups_total", "Content piece lookups by kind and result", ("kind", "result")
+)
+GENERATION_SECONDS = registry.histogram(
+    "content_generation_seconds", "Time to generate and store one uncached content piece", ("kind",)
+)
+
+
+async def _cached(kind: str, content: str, variant: str, generate: Callable[[], Awaitable[str]]) -> str:
+    """Serve from the cache; on a miss, identical concurrent calls share one generation."""
+    key = cache_key(kind, content, variant, PROMPT_VERSION, MODEL_TAG)
+    cached = await content_cache.get(key)
+    if cached is not None:
+        CACHE_LOOKUPS.inc(kind, "hit")
+        return cached
+    CACHE_LOOKUPS.inc(kind, "miss")
+
+    async def generate_and_store() -> str:
+        start = time.monotonic()
+        result = await generate()
+        await content_cache.set(key, result)
+        GENERATION_SECONDS.observe(time.monotonic() - start, kind)
+        return result
+
+    return await single_flight.do(f"content:{key}", generate_and_store)
+
+
+async def _translate_piece(piece: str, target_language: str) -> str:
+    async def generate() -> str:
+        user_prompt = f"Translate this to Urdu:\n\n{piece}"
+        return await provider_router.complete(
+            TRANSLATE_SYSTEM_PROMPT, user_prompt, max_tokens=4000, endpoint="translate"
+        )
+    return await _cached("translate", piece, target_language, generate)
+
+
+async def _personalize_piece(piece: str, user_level: str) -> str:
+    async def generate() -> str:
+        user_prompt = f"Personalize this content:\n\n{piece}"
+        return await provider_router.complete(
+            personalize_system_prompt(user_level), user_prompt, max_tokens=4000, endpoint="personalize"
+        )
+    return await _cached("personalize", piece, user_level, generate)
+
+
+async def _pieces_as_completed(
+    pieces: List[str],
+    handle: Callable[[str], Awaitable[str]]
+) -> AsyncIterator[Tuple[int, str]]:
+    """Run `handle` over the pieces under the concurrency limit, yielding (index, result) as each finishes."""
+    semaphore = asyncio.Semaphore(PIECE_CONCURRENCY)
+
+    async def run(index: int, piece: str) -> Tuple[int, str]:
+        async with semaphore:
+            return index, await handle(piece)
+
+    tasks = [asyncio.create_task(run(i, piece)) for i, piece in enumerate(pieces)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _generate(content: str, handle: Callable[[str], Awaitable[str]]) -> str:
+    pieces = split_content(content)
+    results = [""] * len(pieces)
+    async for index, text in _pieces_as_completed(pieces, handle):
+        results[index] = text
+    return "\n\n".join(results)
+
+
+async def translate(content: str, target_language: str = "urdu") -> str:
+    """Translate content, keeping technical terms in English."""
+    return await _cached(
+        "translate-document", content, target_language,
+        lambda: _generate(content, lambda piece: _translate_piece(piece, target_language))
+    )
+
+
+async def personalize(content: str, user_level: str = "intermediate") -> str:
+    """Adjust content to the learner's experience level."""
+    return await _cached(
+        "personalize-document", content, user_level,
+        lambda: _generate(content, lambda piece: _personalize_piece(piece, user_level))
+    )
+
+
+def translate_pieces(content: str, target_language: str = "urdu") -> Tuple[int, AsyncIterator[Tuple[int, str]]]:
+    """Piece count plus an iterator of (index, translated piece) in completion order."""
+    pieces = split_content(content)
+    return len(pieces), _pieces_as_completed(
+        pieces, lambda piece: _translate_piece(piece, target_language)
+    )
+
+
+def personalize_pieces(content: str, user_level: str = "intermediate") -> Tuple[int, AsyncIterator[Tuple[int, str]]]:
+    """Piece count plus an iterator of (index, personalized piece) in completion order."""
+    pieces = split_content(content)
+    return len(pieces), _pieces_as_completed(
+        pieces, lambda piece: _personalize_piece(piece, user_level)
+    )
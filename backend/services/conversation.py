@@ -0,0 +1,237 @@
+"""
+Conversation - Server-side chat sessions with bounded memory
+The last few turns are kept verbatim; older turns are folded into a rolling
+summary by a background LLM call, so the history part of each prompt stays
+within a fixed token budget however long the conversation runs.
+Sessions are kept in shared state, so a follow-up that lands on another
+worker process continues the same conversation.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+from services.chunking import estimate_tokens
+from services.metrics import registry
+from services.provider_router import provider_router
+from services.shared_state import SharedState, shared_state
+
+# Turns kept word for word
+CONVERSATION_RECENT_TURNS = int(os.getenv("CONVERSATION_RECENT_TURNS", "4"))
+# Tokens of conversation history (summary plus recent turns) sent per prompt
+CONVERSATION_TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "800"))
+# Target length of the rolling summary
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "250"))
+# Idle sessions are forgotten after this many seconds
+CONVERSATION_TTL = float(os.getenv("CONVERSATION_TTL", "3600"))
+CONVERSATION_MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "10000"))
+CONVERSATION_NAMESPACE = "conversation"
+
+SUMMARY_SYSTEM_PROMPT = """You maintain a running summary of a tutoring conversation about the Physical AI & Humanoid Robotics textbook.
+Merge the new exchanges into the existing summary. Keep the student's goals, what was already explained,
+open questions and any names or values they may refer back to. Drop pleasantries.
+Write plain prose of at most {words} words. Only return the summary."""
+
+Turn = Tuple[str, str]
+
+
+def clip_tokens(text: str, budget: int) -> str:
+    """Cut text to roughly `budget` tokens, keeping the beginning."""
+    if estimate_tokens(text) <= budget:
+        return text
+    return text[:max(0, budget * 4 - 3)].rstrip() + "..."
+
+
+class Session:
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.recent: deque = deque()
+        self.pending: List[Turn] = []  # fell out of `recent`, not yet in the summary
+        self.summary = ""
+        self.summarized = 0  # turns folded into `summary`
+        self.turns = 0
+        self.last_question: Optional[str] = None
+        self.summarizing: Optional[asyncio.Task] = None
+        self.touched = time.monotonic()
+
+
+class ConversationStore:
+    """
+    Sessions stored in shared state and mirrored in memory by the worker
+    that serves them, least recently used evicted first. A session is
+    refreshed from shared state when another worker has moved it on. Turns
+    and the summary are stored under separate keys, so a summary finishing
+    on one worker cannot overwrite a turn recorded on another.
+    """
+
+    def __init__(
+        self,
+        recent_turns: int = CONVERSATION_RECENT_TURNS,
+        token_budget: int = CONVERSATION_TOKEN_BUDGET,
+        summary_tokens: int = CONVERSATION_SUMMARY_TOKENS,
+        ttl: float = CONVERSATION_TTL,
+        max_sessions: int = CONVERSATION_MAX_SESSIONS,
+        state: SharedState = shared_state
+    ):
+        self.state = state
+        self.recent_turns = recent_turns
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.summaries = 0
+        self.summary_failures = 0
+
+    async def session(self, session_id: Optional[str]) -> Session:
+        """The live session with this id, whichever worker served it, or a new one."""
+        now = time.monotonic()
+        session = self._sessions.get(session_id) if session_id else None
+        if session is not None and now - session.touched > self.ttl:
+            self._sessions.pop(session.id, None)
+            session = None
+        if session_id:
+            turns, summary = await asyncio.wrap_future(self.state.submit(self._read, session_id))
+            # Another request may have loaded it while this one was reading
+            session = self._sessions.get(session_id, session)
+            if turns is not None or summary is not None:
+                session = session or Session(session_id)
+                self._restore(session, turns, summary)
+        if session is None:
+            session = Session(session_id or uuid.uuid4().hex)
+        if session.id not in self._sessions:
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session.id)
+        session.touched = now
+        return session
+
+    def _read(self, session_id: str) -> Tuple[Optional[Dict], Optional[Dict]]:
+        return (
+            self.state.get(CONVERSATION_NAMESPACE, f"turns:{session_id}"),
+            self.state.get(CONVERSATION_NAMESPACE, f"summary:{session_id}"),
+        )
+
+    def _restore(self, session: Session, turns: Optional[Dict], summary: Optional[Dict]):
+        """Take whatever another worker has added since this one last saw the session."""
+        if summary is not None and summary["through"] > session.summarized:
+            session.summary = summary["text"]
+            session.summarized = summary["through"]
+        if turns is not None and turns["turns"] > session.turns:
+            session.turns = turns["turns"]
+            session.last_question = turns["last_question"]
+            first = session.turns - len(turns["log"]) + 1
+            log = [tuple(turn) for number, turn in enumerate(turns["log"], first) if number > session.summarized]
+            split = max(0, len(log) - self.recent_turns)
+            session.recent = deque(log[split:])
+            session.pending[:] = log[:split]
+        self._drop_summarized(session)
+
+    def _drop_summarized(self, session: Session):
+        first_pending = session.turns - len(session.recent) - len(session.pending) + 1
+        del session.pending[:max(0, session.summarized - first_pending + 1)]
+
+    def history(self, session: Session) -> str:
+        """
+        Summary plus the most recent turns that fit the token budget.
+        Turns waiting to be summarized are included while they still fit, so
+        nothing drops out of the prompt before the summary has caught up.
+        """
+        summary = clip_tokens(session.summary, self.summary_tokens) if session.summary else ""
+        remaining = self.token_budget - estimate_tokens(summary)
+        # Each recent turn gets an equal share of what the summary leaves, so
+        # one long answer cannot crowd out the rest
+        share = max(64, (self.token_budget - self.summary_tokens) // max(1, self.recent_turns))
+        lines: List[str] = []
+        for question, answer in reversed(list(session.pending) + list(session.recent)):
+            question = clip_tokens(question, share // 3)
+            answer = clip_tokens(answer, share - estimate_tokens(question) - 8)
+            text = f"Student: {question}\nAssistant: {answer}"
+            cost = estimate_tokens(text)
+            if cost > remaining:
+                break
+            lines.append(text)
+            remaining -= cost
+        parts = []
+        if summary:
+            parts.append(f"Summary of earlier conversation: {summary}")
+        parts.extend(reversed(lines))
+        return "\n\n".join(parts)
+
+    def record(self, session: Session, question: str, answer: str):
+        """Add a finished turn; overflowing turns are summarized in the background."""
+        session.recent.append((question, answer))
+        session.turns += 1
+        session.last_question = question
+        while len(session.recent) > self.recent_turns:
+            session.pending.append(session.recent.popleft())
+        if session.pending and session.summarizing is None:
+            # If summaries keep failing, forget the oldest turns rather than grow
+            del session.pending[:-self.recent_turns * 4]
+            session.summarizing = asyncio.ensure_future(self._summarize(session))
+        self.state.set_later(CONVERSATION_NAMESPACE, f"turns:{session.id}", {
+            "turns": session.turns,
+            "last_question": question,
+            "log": [list(turn) for turn in list(session.pending) + list(session.recent)],
+        }, self.ttl)
+
+    async def _summarize(self, session: Session):
+        try:
+            while session.pending:
+                batch = list(session.pending)
+                through = session.turns - len(session.recent) - len(session.pending) + len(batch)
+                exchanges = "\n\n".join(
+                    f"Student: {clip_tokens(q, 200)}\nAssistant: {clip_tokens(a, 400)}" for q, a in batch
+                )
+                user_prompt = (
+                    f"Existing summary:\n{session.summary or '(none)'}\n\nNew exchanges:\n{exchanges}"
+                )
+                try:
+                    summary = await provider_router.complete(
+                        SUMMARY_SYSTEM_PROMPT.format(words=self.summary_tokens * 3 // 4),
+                        user_prompt,
+                        max_tokens=self.summary_tokens + 50,
+                        endpoint="summarize"
+                    )
+                except Exception as e:
+                    # Pending turns stay in the prompt while they fit; try again after the next turn
+                    self.summary_failures += 1
+                    print(f"Conversation summary failed: {e}")
+                    return
+                session.summary = summary.strip()
+                session.summarized = max(session.summarized, through)
+                self._drop_summarized(session)
+                self.summaries += 1
+                self.state.set_later(CONVERSATION_NAMESPACE, f"summary:{session.id}", {
+                    "text": session.summary,
+                    "through": session.summarized,
+                }, self.ttl)
+        finally:
+            session.summarizing = None
+
+    def stats(self) -> Dict:
+        return {
+            "sessions": len(self._sessions),
+            "summaries": self.summaries,
+            "summary_failures": self.summary_failures,
+        }
+
+
+# Shared sessions for the chat router
+conversations = ConversationStore()
+
+registry.collector(
+    "conversation_sessions", "Conversation sessions held in this worker's memory", "gauge",
+    lambda: [("", {}, len(conversations._sessions))]
+)
+registry.collector(
+    "conversation_summaries_total", "Rolling summary updates by outcome", "counter",
+    lambda: [
+        ("", {"outcome": "success"}, conversations.summaries),
+        ("", {"outcome": "failed"}, conversations.summary_failures),
+    ]
+)
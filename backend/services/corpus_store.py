@@ -0,0 +1,350 @@
+"""
+Corpus Store - Textbook chapters read from a directory of markdown files
+Only chapter metadata stays resident; bodies are read on demand through mmap
+and kept in a small LRU. A polling watcher reports changed and removed
+chapters so indexes and caches can update just those entries.
+
+Each file starts with a frontmatter block:
+
+    ---
+    chapter: 1.1
+    title: Introduction to Physical AI
+    short_title: Physical AI          (optional, used in the sidebar)
+    module_title: The Robotic Nervous System (ROS 2)   (optional)
+    ---
+    Markdown body...
+
+Files may live in nested directories (one per book or module). When no corpus
+directory exists the store serves the built-in chapters from
+data/textbook_content.py, so a fresh checkout works unchanged.
+
+Export the built-in chapters to markdown (from the backend directory):
+    python -m services.corpus_store export [DIR]
+"""
+
+import asyncio
+import mmap
+import os
+import re
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "corpus")
+CORPUS_DIR = os.getenv("CORPUS_DIR", DEFAULT_DIR)
+# Seconds between scans for edited, added or deleted files; 0 disables watching
+CORPUS_POLL_INTERVAL = float(os.getenv("CORPUS_POLL_INTERVAL", "5"))
+# Chapter bodies kept decoded in memory
+CORPUS_BODY_CACHE = int(os.getenv("CORPUS_BODY_CACHE", "64"))
+
+FRONTMATTER_FIELDS = ("chapter", "title", "short_title", "module_title")
+FRONTMATTER_LINE = re.compile(r"^([a-z_]+):\s*(.*?)\s*$")
+
+ChangeListener = Callable[[List[str], List[str]], None]
+
+
+def chapter_sort_key(chapter_id: str) -> Tuple:
+    """Order "2.10" after "2.9"."""
+    return tuple(
+        (0, int(part), "") if part.isdigit() else (1, 0, part)
+        for part in chapter_id.split(".")
+    )
+
+
+def module_of(chapter_id: str) -> str:
+    return chapter_id.split(".")[0]
+
+
+def read_header(path: str) -> Tuple[Dict[str, str], int]:
+    """
+    Parse the frontmatter of a markdown file.
+    Returns (fields, body_offset) where body_offset is the byte offset of the body.
+    """
+    fields: Dict[str, str] = {}
+    with open(path, "rb") as f:
+        first = f.readline()
+        if first.strip() != b"---":
+            raise ValueError(f"{path}: missing frontmatter")
+        while True:
+            line = f.readline()
+            if not line:
+                raise ValueError(f"{path}: unterminated frontmatter")
+            if line.strip() == b"---":
+                break
+            match = FRONTMATTER_LINE.match(line.decode("utf-8"))
+            if match and match.group(1) in FRONTMATTER_FIELDS:
+                fields[match.group(1)] = match.group(2).strip("\"'")
+        offset = f.tell()
+    if "chapter" not in fields or "title" not in fields:
+        raise ValueError(f"{path}: frontmatter needs chapter and title")
+    return fields, offset
+
+
+def read_body(path: str, offset: int) -> str:
+    """Read the body after the frontmatter through a read-only memory map."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= offset:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped[offset:].decode("utf-8").strip()
+
+
+def write_chapter(path: str, chapter: Dict, module_title: Optional[str] = None):
+    lines = ["---", f"chapter: {chapter['chapter']}", f"title: {chapter['title']}"]
+    if chapter.get("short_title"):
+        lines.append(f"short_title: {chapter['short_title']}")
+    if module_title:
+        lines.append(f"module_title: {module_title}")
+    lines.append("---")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n" + chapter["content"].strip() + "\n")
+
+
+class CorpusStore:
+    """
+    Chapter metadata keyed by chapter id, with bodies loaded lazily.
+    Metadata entries are plain dicts: chapter, title, optional short_title and
+    module_title, plus the source path, mtime, size and body offset.
+    """
+
+    def __init__(self, directory: Optional[str] = CORPUS_DIR, body_cache: int = CORPUS_BODY_CACHE):
+        self.directory = directory if directory and os.path.isdir(directory) else None
+        self.body_cache = body_cache
+        self._meta: Dict[str, Dict] = {}
+        self._order: List[str] = []
+        self._paths: Dict[str, str] = {}
+        self._bodies: "OrderedDict[Tuple[str, float], str]" = OrderedDict()
+        self._builtin: Dict[str, str] = {}
+        self._listeners: List[ChangeListener] = []
+        self._lock = threading.Lock()
+        self._watcher: Optional[asyncio.Task] = None
+        if self.directory:
+            self.poll(notify=False)
+        else:
+            self._load_builtin()
+
+    def _load_builtin(self):
+        from data.textbook_content import CHAPTERS, MODULES
+
+        for chapter in CHAPTERS:
+            meta = {"chapter": chapter["chapter"], "title": chapter["title"]}
+            if chapter.get("short_title"):
+                meta["short_title"] = chapter["short_title"]
+            module_title = MODULES.get(module_of(chapter["chapter"]))
+            if module_title:
+                meta["module_title"] = module_title
+            self._meta[chapter["chapter"]] = meta
+            self._builtin[chapter["chapter"]] = chapter["content"]
+        self._order = sorted(self._meta, key=chapter_sort_key)
+
+    # Reading
+
+    def __len__(self) -> int:
+        return len(self._meta)
+
+    def __contains__(self, chapter_id: str) -> bool:
+        return chapter_id in self._meta
+
+    def ids(self) -> List[str]:
+        return list(self._order)
+
+    def get(self, chapter_id: str) -> Optional[Dict]:
+        return self._meta.get(chapter_id)
+
+    def chapters(self) -> List[Dict]:
+        """Metadata of every chapter in reading order (no bodies)."""
+        # A poll in another thread may drop a chapter between the two reads
+        return [meta for meta in map(self._meta.get, self._order) if meta is not None]
+
+    def modules(self) -> Dict[str, str]:
+        titles: Dict[str, str] = {}
+        for meta in self.chapters():
+            if meta.get("module_title"):
+                titles.setdefault(module_of(meta["chapter"]), meta["module_title"])
+        return titles
+
+    def body(self, chapter_id: str) -> Optional[str]:
+        meta = self._meta.get(chapter_id)
+        if meta is None:
+            return None
+        if "path" not in meta:
+            return self._builtin.get(chapter_id)
+        key = (meta["path"], meta["mtime"])
+        with self._lock:
+            body = self._bodies.get(key)
+            if body is not None:
+                self._bodies.move_to_end(key)
+                return body
+        try:
+            body = read_body(meta["path"], meta["offset"])
+        except OSError:
+            return None  # deleted since the last scan; the next poll drops it
+        with self._lock:
+            self._bodies[key] = body
+            while len(self._bodies) > self.body_cache:
+                self._bodies.popitem(last=False)
+        return body
+
+    def chapter(self, chapter_id: str) -> Optional[Dict]:
+        """Metadata plus the body under "content"."""
+        meta = self._meta.get(chapter_id)
+        if meta is None:
+            return None
+        return {**meta, "content": self.body(chapter_id) or ""}
+
+    def signature(self, chapter_id: str) -> Optional[str]:
+        """Changes whenever the chapter's file (or built-in text) does; saved indexes compare it."""
+        meta = self._meta.get(chapter_id)
+        if meta is None:
+            return None
+        if "path" not in meta:
+            return f"builtin:{zlib.crc32(self._builtin[chapter_id].encode('utf-8'))}"
+        return f"{meta['mtime']}:{meta['size']}"
+
+    def iter_chapters(self) -> Iterator[Dict]:
+        """Full chapters in reading order, loading one body at a time."""
+        for chapter_id in self.ids():
+            chapter = self.chapter(chapter_id)
+            if chapter is not None:
+                yield chapter
+
+    # Change detection
+
+    def _scan(self) -> Dict[str, os.stat_result]:
+        found: Dict[str, os.stat_result] = {}
+        pending = [self.directory]
+        while pending:
+            try:
+                entries = os.scandir(pending.pop())
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.name.endswith(".md") and entry.is_file():
+                        found[entry.path] = entry.stat()
+        return found
+
+    def poll(self, notify: bool = True) -> Tuple[List[str], List[str]]:
+        """
+        Re-stat the corpus directory and pick up edits. Only files whose mtime
+        or size changed are re-read. Returns (changed, removed) chapter ids and
+        passes them to the subscribers. The watcher runs this in a worker
+        thread, so subscribers must be safe to call off the event loop.
+        """
+        if not self.directory:
+            return [], []
+        files = self._scan()
+        changed: List[str] = []
+        removed: List[str] = []
+
+        for path in set(self._paths) - set(files):
+            chapter_id = self._paths.pop(path)
+            self._meta.pop(chapter_id, None)
+            removed.append(chapter_id)
+
+        for path in sorted(files):
+            stat = files[path]
+            chapter_id = self._paths.get(path)
+            meta = self._meta.get(chapter_id) if chapter_id else None
+            if meta is not None and (meta["mtime"], meta["size"]) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            try:
+                fields, offset = read_header(path)
+            except (OSError, UnicodeDecodeError, ValueError) as e:
+                print(f"Skipping corpus file: {e}")
+                continue
+            owner = self._meta.get(fields["chapter"])
+            if owner is not None and owner["path"] != path:
+                print(f"Skipping {path}: chapter {fields['chapter']} is already defined in {owner['path']}")
+                continue
+            if chapter_id is not None and chapter_id != fields["chapter"]:
+                # The file was renumbered
+                self._meta.pop(chapter_id, None)
+                removed.append(chapter_id)
+            self._paths[path] = fields["chapter"]
+            self._meta[fields["chapter"]] = {
+                **fields,
+                "path": path,
+                "mtime": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "offset": offset,
+            }
+            changed.append(fields["chapter"])
+
+        removed = [chapter_id for chapter_id in removed if chapter_id not in self._meta]
+        if changed or removed:
+            self._order = sorted(self._meta, key=chapter_sort_key)
+            if notify:
+                for listener in self._listeners:
+                    listener(changed, removed)
+        return changed, removed
+
+    def subscribe(self, listener: ChangeListener):
+        """Call listener(changed_ids, removed_ids) after each poll that found changes."""
+        self._listeners.append(listener)
+
+    async def _watch(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                files = await run_in_threadpool(self._scan)
+                if self._differs(files):
+                    # Headers are re-read and subscribers reindex in a worker thread
+                    await run_in_threadpool(self.poll)
+            except Exception as e:
+                print(f"Corpus reload failed: {e}")
+
+    def _differs(self, files: Dict[str, os.stat_result]) -> bool:
+        if set(files) != set(self._paths):
+            return True
+        for path, stat in files.items():
+            meta = self._meta.get(self._paths[path])
+            if meta is None or (meta["mtime"], meta["size"]) != (stat.st_mtime_ns, stat.st_size):
+                return True
+        return False
+
+    def start(self, interval: float = CORPUS_POLL_INTERVAL):
+        """Start the background watcher (only for a directory-backed corpus)."""
+        if self.directory and interval > 0 and self._watcher is None:
+            self._watcher = asyncio.ensure_future(self._watch(interval))
+
+    async def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+
+def export_builtin(directory: str) -> int:
+    """Write the built-in chapters as markdown files, one directory per module."""
+    from data.textbook_content import CHAPTERS, MODULES
+
+    for chapter in CHAPTERS:
+        module = module_of(chapter["chapter"])
+        module_dir = os.path.join(directory, f"module-{module}")
+        os.makedirs(module_dir, exist_ok=True)
+        path = os.path.join(module_dir, f"{chapter['chapter'].replace('.', '-')}.md")
+        write_chapter(path, chapter, MODULES.get(module))
+    return len(CHAPTERS)
+
+
+# Shared store used by the chat and content routers
+corpus_store = CorpusStore()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "export":
+        print(__doc__)
+        sys.exit(1)
+    target = sys.argv[2] if len(sys.argv) > 2 else CORPUS_DIR
+    print(f"Exported {export_builtin(target)} chapters to {target}")
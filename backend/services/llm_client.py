@@ -0,0 +1,332 @@
+"""
+LLM Client - Non-blocking provider calls shared by the chat and content routers
+One pooled keep-alive httpx.AsyncClient serves Groq, Gemini and OpenAI requests.
+httpx and the OpenAI SDK are imported on first use, not at app import time.
+"""
+
+import asyncio
+import json
+import os
+import time
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI
+
+# Overridable so benchmarks can point every provider at a local stand-in server
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+
+GROQ_MODEL = "llama-3.3-70b-versatile"
+GEMINI_MODEL = "gemini-2.0-flash"
+OPENAI_MODEL = "gpt-4o-mini"
+
+REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))
+MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "200"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "50"))
+
+
+PROVIDERS = ("groq", "gemini", "openai")
+
+
+class ProviderError(Exception):
+    """A provider call failed; carries the HTTP status and Retry-After when known."""
+
+    def __init__(
+        self,
+        provider: str,
+        message: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+        configured: bool = True
+    ):
+        super().__init__(message)
+        self.provider = provider
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.configured = configured
+
+    @property
+    def rate_limited(self) -> bool:
+        return self.status_code == 429
+
+
+class ProviderNotConfiguredError(ValueError):
+    """The provider's API key is not set; the router stops trying that provider."""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def to_provider_error(provider: str, error: Exception) -> ProviderError:
+    """Classify an SDK or transport exception without matching on its text."""
+    if isinstance(error, ProviderError):
+        return error
+    if isinstance(error, ProviderNotConfiguredError):
+        return ProviderError(provider, str(error), configured=False)
+    status_code = getattr(error, "status_code", None)
+    response = getattr(error, "response", None)
+    if status_code is None and response is not None:
+        status_code = getattr(response, "status_code", None)
+    headers = getattr(response, "headers", None) or {}
+    return ProviderError(
+        provider,
+        f"{provider} error: {error}",
+        status_code=status_code,
+        retry_after=parse_retry_after(headers.get("retry-after"))
+    )
+
+
+def load_sdks():
+    """Import httpx and the OpenAI SDK; they take most of a second to import."""
+    import httpx  # noqa: F401
+    import openai  # noqa: F401
+
+
+class LLMClient:
+    """
+    Async clients for every provider, created once at app startup.
+    Clients are also created lazily so scripts can use this without the app.
+    """
+
+    def __init__(self):
+        self._http: Optional["httpx.AsyncClient"] = None
+        self._groq_client: Optional["AsyncOpenAI"] = None
+        self._openai_client: Optional["AsyncOpenAI"] = None
+
+    async def startup(self):
+        """Import the SDKs off the event loop, then open the shared connection pool."""
+        await asyncio.to_thread(load_sdks)
+        self._open()
+
+    async def shutdown(self):
+        """Close the shared connection pool."""
+        if self._http is not None:
+            await self._http.aclose()
+        self._http = None
+        self._groq_client = None
+        self._openai_client = None
+
+    def _open(self) -> "httpx.AsyncClient":
+        if self._http is None:
+            import httpx
+
+            self._http = httpx.AsyncClient(
+                timeout=REQUEST_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS
+                )
+            )
+        return self._http
+
+    @property
+    def http(self) -> "httpx.AsyncClient":
+        return self._open()
+
+    @property
+    def groq_client(self) -> "AsyncOpenAI":
+        """Groq client for chat completions (OpenAI-compatible API)"""
+        if self._groq_client is None:
+            from openai import AsyncOpenAI
+
+            api_key = os.getenv("GROQ_API_KEY")
+            if not api_key:
+                raise ProviderNotConfiguredError("GROQ_API_KEY environment variable is required")
+            self._groq_client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=GROQ_BASE_URL,
+                http_client=self.http,
+                max_retries=0  # the provider router decides where to retry
+            )
+        return self._groq_client
+
+    @property
+    def openai_client(self) -> "AsyncOpenAI":
+        if self._openai_client is None:
+            from openai import AsyncOpenAI
+
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ProviderNotConfiguredError("OPENAI_API_KEY environment variable is required")
+            self._openai_client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=OPENAI_BASE_URL,
+                http_client=self.http,
+                max_retries=0
+            )
+        return self._openai_client
+
+    async def call_groq(self, system_prompt: str, user_prompt: str, max_tokens: int = 1000) -> str:
+        response = await self.groq_client.chat.completions.create(
+            model=GROQ_MODEL,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.3,
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message.content or ""
+
+    async def call_openai(self, system_prompt: str, user_prompt: str, max_tokens: int = 1000) -> str:
+        response = await self.openai_client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.3,
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message.content or ""
+
+    async def call_gemini(self, prompt: str, max_tokens: int = 1000, model: str = GEMINI_MODEL) -> str:
+        """Call Gemini API directly via REST."""
+        import httpx
+
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ProviderNotConfiguredError("GEMINI_API_KEY not configured")
+
+        url = f"{GEMINI_BASE_URL}/models/{model}:generateContent?key={api_key}"
+
+        payload = {
+            "contents": [{"parts": [{"text": prompt}]}],
+            "generationConfig": {
+                "maxOutputTokens": max_tokens,
+                "temperature": 0.3
+            }
+        }
+
+        # Retry up to 2 times on timeout
+        for attempt in range(2):
+            try:
+                response = await self.http.post(url, json=payload)
+                response.raise_for_status()
+                data = response.json()
+            except httpx.TimeoutException:
+                if attempt == 1:
+                    print("Gemini timeout after 2 attempts")
+                    raise Exception("Gemini request timed out.")
+                print(f"Gemini timeout, retrying... (attempt {attempt + 1})")
+                continue
+
+            # Check if response has the expected structure
+            candidates = data.get("candidates") or []
+            if candidates:
+                parts = candidates[0].get("content", {}).get("parts") or []
+                if parts:
+                    return parts[0]["text"]
+
+            print(f"Unexpected Gemini response structure: {data}")
+            raise Exception("Invalid response format from Gemini API")
+
+    async def _stream_openai_compatible(
+        self,
+        client: "AsyncOpenAI",
+        model: str,
+        messages: List[Dict],
+        max_tokens: int
+    ) -> AsyncIterator[str]:
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.3,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def _stream_gemini(self, prompt: str, max_tokens: int, model: str) -> AsyncIterator[str]:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ProviderNotConfiguredError("GEMINI_API_KEY not configured")
+
+        url = f"{GEMINI_BASE_URL}/models/{model}:streamGenerateContent?alt=sse&key={api_key}"
+        payload = {
+            "contents": [{"parts": [{"text": prompt}]}],
+            "generationConfig": {
+                "maxOutputTokens": max_tokens,
+                "temperature": 0.3
+            }
+        }
+        async with self.http.stream("POST", url, json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = json.loads(line[5:])
+                for candidate in data.get("candidates") or []:
+                    for part in candidate.get("content", {}).get("parts") or []:
+                        if part.get("text"):
+                            yield part["text"]
+
+    async def stream(
+        self,
+        provider: str,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int = 1000,
+        models: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[str]:
+        """Stream text deltas from one provider; failures are raised as ProviderError."""
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        try:
+            if provider == "groq":
+                chunks = self._stream_openai_compatible(self.groq_client, GROQ_MODEL, messages, max_tokens)
+            elif provider == "gemini":
+                model = (models or {}).get("gemini", GEMINI_MODEL)
+                chunks = self._stream_gemini(f"{system_prompt}\n\n{user_prompt}", max_tokens, model)
+            elif provider == "openai":
+                chunks = self._stream_openai_compatible(self.openai_client, OPENAI_MODEL, messages, max_tokens)
+            else:
+                raise ValueError(f"Unknown LLM provider: {provider}")
+            async for text in chunks:
+                yield text
+        except Exception as e:
+            raise to_provider_error(provider, e) from e
+
+    async def complete(
+        self,
+        provider: str,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int = 1000,
+        models: Optional[Dict[str, str]] = None
+    ) -> str:
+        """Call one provider; any failure is raised as a ProviderError."""
+        try:
+            if provider == "groq":
+                return await self.call_groq(system_prompt, user_prompt, max_tokens)
+            if provider == "gemini":
+                model = (models or {}).get("gemini", GEMINI_MODEL)
+                return await self.call_gemini(f"{system_prompt}\n\n{user_prompt}", max_tokens, model=model)
+            if provider == "openai":
+                return await self.call_openai(system_prompt, user_prompt, max_tokens)
+        except Exception as e:
+            raise to_provider_error(provider, e) from e
+        raise ValueError(f"Unknown LLM provider: {provider}")
+
+
+# Shared instance, opened and closed by the app lifespan in main.py
+llm_client = LLMClient()
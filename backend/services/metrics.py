@@ -0,0 +1,183 @@
+"""
+Metrics - Counters and histograms rendered in the Prometheus text format
+Recording is a dict lookup plus a bisect, cheap enough to leave on in
+production. Counters that services already keep (cache hits, queue depth)
+are read through collectors at scrape time instead of on the hot path.
+Values are per process: under gunicorn each worker has its own registry and
+/metrics shows the worker that served the scrape (see gunicorn.conf.py).
+"""
+
+import bisect
+import math
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+SIZE_BUCKETS = (100, 300, 1000, 3000, 10000, 30000, 100000, 300000, 1000000)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 1500, 2000, 3000, 5000, 10000)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, labels)))} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram; observe() costs one bisect and three additions."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.bounds = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [0.0] * (len(self.bounds) + 2)
+        series[bisect.bisect_left(self.bounds, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._values.items()):
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0.0
+            for bound, count in zip(self.bounds + (math.inf,), series):
+                cumulative += count
+                bucket_labels = _format_labels({**base, "le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(base)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(base)} {_format_value(cumulative)}")
+        return lines
+
+
+class Collector:
+    """Samples produced at scrape time from state a service already tracks."""
+
+    def __init__(self, name: str, documentation: str, kind: str, collect: Callable[[], Iterable[Sample]]):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self.collect():
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, name: str, documentation: str, kind: str, collect: Callable[[], Iterable[Sample]]) -> Collector:
+        """`collect` yields (suffix, labels, value); kind is "counter" or "gauge"."""
+        return self._add(Collector(name, documentation, kind, collect))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                lines.append(f"# {metric.name} unavailable: {_escape(str(e))}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry served at /metrics
+registry = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_SECONDS = registry.histogram(
+    "http_request_seconds", "Time to send the full HTTP response", ("method", "route", "status")
+)
+HTTP_RESPONSE_BYTES = registry.histogram(
+    "http_response_bytes", "HTTP response body sizes", ("route",), SIZE_BUCKETS
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request. Requests are labelled with the
+    route template ("/api/content/chapters/{chapter_id}") rather than the raw
+    path, so the number of series stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_SECONDS.observe(time.perf_counter() - start, scope["method"], path, str(status))
+            HTTP_RESPONSE_BYTES.observe(size, path)
@@ -0,0 +1,144 @@
+"""
+Password Hasher - Password hashing and verification off the event loop
+sha256_crypt is deliberately slow pure CPU work; running it in a bounded
+process pool keeps a login burst from stalling every other request.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+from services.metrics import registry
+
+# Worker processes; 0 hashes inline on the event loop (single-process debugging)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+# Hash jobs queued or running before new ones are refused with 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(max(1, PASSWORD_HASH_WORKERS) * 8)))
+# sha256_crypt work factor for new hashes; existing hashes keep their own rounds
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "535000"))
+
+HASH_SECONDS = registry.histogram(
+    "password_hash_seconds", "Time to hash or verify a password, queueing included", ("op",)
+)
+
+# One CryptContext per work factor, built on first use inside each worker process
+_contexts: Dict[int, object] = {}
+
+
+def _crypt_context(rounds: int):
+    context = _contexts.get(rounds)
+    if context is None:
+        from passlib.context import CryptContext
+
+        context = CryptContext(schemes=["sha256_crypt"], deprecated="auto", sha256_crypt__rounds=rounds)
+        _contexts[rounds] = context
+    return context
+
+
+def hash_password(password: str, rounds: int = PASSWORD_HASH_ROUNDS) -> str:
+    return _crypt_context(rounds).hash(password)
+
+
+def verify_password(password: str, hashed: str, rounds: int = PASSWORD_HASH_ROUNDS) -> bool:
+    return _crypt_context(rounds).verify(password, hashed)
+
+
+class HasherBusyError(Exception):
+    """Too many hash jobs are already queued, or the pool keeps failing."""
+
+    def __init__(self, retry_after: float = 1.0):
+        super().__init__("Password hashing is at capacity, try again shortly")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """
+    Runs hash/verify in a process pool with at most `max_pending` jobs in
+    flight. Past that limit calls fail fast with HasherBusyError instead of
+    joining an ever-growing queue.
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+        rounds: int = PASSWORD_HASH_ROUNDS
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+        self.rejected = 0
+
+    def startup(self):
+        if self.workers > 0 and self._pool is None:
+            # spawn: forking a process that already runs threads is unsafe
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def _run(self, op: str, fn, *args):
+        start = time.monotonic()
+        if self.workers <= 0:
+            result = fn(*args, self.rounds)
+            HASH_SECONDS.observe(time.monotonic() - start, op)
+            return result
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HasherBusyError()
+        self.pending += 1
+        try:
+            # One retry on a fresh pool if a worker process died (e.g. OOM-killed)
+            for _ in range(2):
+                self.startup()
+                pool = self._pool
+                try:
+                    result = await asyncio.get_running_loop().run_in_executor(pool, fn, *args, self.rounds)
+                except BrokenProcessPool:
+                    # Concurrent calls see the same broken pool; only the first replaces it
+                    if self._pool is pool:
+                        print("Password hashing pool broke, starting a new one")
+                        self._pool = None
+                        pool.shutdown(wait=False, cancel_futures=True)
+                    continue
+                HASH_SECONDS.observe(time.monotonic() - start, op)
+                return result
+            raise HasherBusyError()
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", hash_password, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run("verify", verify_password, password, hashed)
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+            "rounds": self.rounds,
+        }
+
+
+# Shared hasher for the auth router
+password_hasher = PasswordHasher()
+
+registry.collector(
+    "password_hash_pending", "Hash jobs queued or running in the pool", "gauge",
+    lambda: [("", {}, password_hasher.pending)]
+)
+registry.collector(
+    "password_hash_rejected_total", "Hash jobs refused because the pool was at capacity", "counter",
+    lambda: [("", {}, password_hasher.rejected)]
+)
@@ -0,0 +1,555 @@
+"""
+Provider Router - Health-aware LLM provider selection with circuit breakers
+Routes each call to the fastest healthy provider and skips throttled ones,
+optionally hedging slow calls with a second provider
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from services.admission import AdmissionController, AdmissionRejected, request_ticket
+from services.chunking import estimate_tokens
+from services.llm_client import PROVIDERS, ProviderError, llm_client
+from services.metrics import SIZE_BUCKETS, TOKEN_BUCKETS, registry
+from services.shared_state import SHARED_STATE_SYNC_INTERVAL, SharedState, shared_state
+
+# Weight of the newest observation in the latency and error-rate averages
+EWMA_ALPHA = float(os.getenv("LLM_EWMA_ALPHA", "0.2"))
+# Cooldown when a provider returns 429 without a Retry-After header
+DEFAULT_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+# Consecutive non-429 failures that open the breaker
+FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+# Latency assumed before a provider has been measured; keeps the
+# historical Groq -> Gemini -> OpenAI preference on a cold start
+PRIOR_LATENCY = {"groq": 1.0, "gemini": 2.0, "openai": 3.0}
+
+# Hedging: race a second provider when the first is slower than its usual
+# LLM_HEDGE_PERCENTILE latency. Off unless LLM_HEDGING is set.
+HEDGING_ENABLED = os.getenv("LLM_HEDGING", "false").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.5"))
+# Maximum share of each endpoint's calls that may be hedged
+HEDGE_BUDGETS = {
+    name: float(share)
+    for name, share in (
+        item.split("=") for item in
+        os.getenv("LLM_HEDGE_BUDGETS", "chat=0.1,translate=0.05,personalize=0.05").split(",")
+        if item
+    )
+}
+LATENCY_WINDOW = 200
+
+PROVIDER_SECONDS = registry.histogram(
+    "llm_provider_seconds", "Latency of individual LLM provider calls", ("provider", "outcome")
+)
+PROMPT_CHARS = registry.histogram(
+    "llm_prompt_chars", "Characters in the system plus user prompt", ("endpoint",), SIZE_BUCKETS
+)
+PROMPT_TOKENS = registry.histogram(
+    "llm_prompt_tokens", "Estimated tokens in the system plus user prompt", ("endpoint",), TOKEN_BUCKETS
+)
+COMPLETION_CHARS = registry.histogram(
+    "llm_completion_chars", "Characters in successful completions", ("endpoint",), SIZE_BUCKETS
+)
+FALLBACKS = registry.counter(
+    "llm_fallbacks_total", "Provider failures that moved a request on to another provider", ("endpoint", "provider")
+)
+REQUESTS = registry.counter(
+    "llm_requests_total", "Routed LLM requests by final outcome", ("endpoint", "outcome")
+)
+
+# Open breakers are published here so every worker backs off a throttled provider
+COOLDOWN_NAMESPACE = "provider_cooldowns"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProvidersUnavailableError(Exception):
+    """Every provider failed or is cooling down."""
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class OverloadedError(ProvidersUnavailableError):
+    """Every usable provider is saturated; the request was shed before calling out."""
+
+    status_code = 429
+
+
+class ProviderHealth:
+    """Rolling health of one provider plus its circuit breaker state."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.ewma_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.consecutive_failures = 0
+        self.probing = False
+        self.calls = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.last_error: Optional[str] = None
+        self.recent_latencies: deque = deque(maxlen=LATENCY_WINDOW)
+
+    def available(self, now: float) -> bool:
+        """Closed breakers accept calls; an expired open breaker lets one probe through."""
+        if self.state == OPEN and now >= self.open_until:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            return not self.probing
+        return self.state == CLOSED
+
+    def expected_latency(self) -> float:
+        latency = self.ewma_latency if self.ewma_latency is not None else PRIOR_LATENCY.get(self.name, 5.0)
+        # Penalize flaky providers: a 50% error rate doubles the expected cost
+        return latency * (1 + 2 * self.error_rate)
+
+    def latency_percentile(self, percentile: float) -> float:
+        if not self.recent_latencies:
+            return PRIOR_LATENCY.get(self.name, 5.0)
+        ordered = sorted(self.recent_latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index]
+
+    def record_success(self, latency: float):
+        self.calls += 1
+        self.recent_latencies.append(latency)
+        self.ewma_latency = latency if self.ewma_latency is None else (
+            EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.ewma_latency
+        )
+        self.error_rate *= 1 - EWMA_ALPHA
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.probing = False
+
+    def record_failure(self, error: ProviderError, now: float):
+        self.calls += 1
+        self.failures += 1
+        self.error_rate = EWMA_ALPHA + (1 - EWMA_ALPHA) * self.error_rate
+        self.consecutive_failures += 1
+        self.last_error = str(error)
+        self.probing = False
+        if error.rate_limited:
+            self.rate_limited += 1
+            self._open(now, error.retry_after or DEFAULT_COOLDOWN)
+        elif self.state == HALF_OPEN or self.consecutive_failures >= FAILURE_THRESHOLD:
+            self._open(now, DEFAULT_COOLDOWN)
+
+    def _open(self, now: float, cooldown: float):
+        self.state = OPEN
+        self.open_until = max(self.open_until, now + cooldown)
+
+    def snapshot(self, now: float) -> Dict:
+        return {
+            "provider": self.name,
+            "state": self.state,
+            "retry_in": round(max(0.0, self.open_until - now), 2) if self.state == OPEN else 0.0,
+            "ewma_latency": round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "calls": self.calls,
+            "failures": self.failures,
+            "rate_limited": self.rate_limited,
+            "last_error": self.last_error,
+        }
+
+
+class HedgeStats:
+    """Hedging counters and budget for one endpoint."""
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0
+        self.budget_exhausted = 0
+
+    def allow_hedge(self) -> bool:
+        # One hedge of burst allowance so the first slow call can be hedged
+        if self.hedges + 1 <= self.budget * self.requests + 1:
+            return True
+        self.budget_exhausted += 1
+        return False
+
+    def snapshot(self) -> Dict:
+        return {
+            "budget": self.budget,
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "primary_wins": self.primary_wins,
+            "budget_exhausted": self.budget_exhausted,
+        }
+
+
+# Marks "no result yet" so an empty completion still counts as an answer
+_NO_RESULT = object()
+
+
+class ProviderRouter:
+    """Replaces the fixed Groq -> Gemini -> OpenAI chain with health-based routing."""
+
+    def __init__(
+        self,
+        providers=PROVIDERS,
+        client=llm_client,
+        hedging: bool = HEDGING_ENABLED,
+        state: SharedState = shared_state
+    ):
+        self.client = client
+        self.state = state
+        self._next_sync = 0.0
+        self._syncing: Optional[Future] = None
+        self.health = {name: ProviderHealth(name) for name in providers}
+        self.unconfigured: set = set()
+        self.hedging = hedging
+        self.hedge_stats = {name: HedgeStats(budget) for name, budget in HEDGE_BUDGETS.items()}
+        self.admission = AdmissionController(providers)
+
+    def candidates(self) -> List[ProviderHealth]:
+        """Healthy providers, fastest expected first."""
+        now = time.monotonic()
+        self._sync_cooldowns(now)
+        healthy = [
+            health for health in self.health.values()
+            if health.name not in self.unconfigured and health.available(now)
+        ]
+        return sorted(healthy, key=lambda health: health.expected_latency())
+
+    def _sync_cooldowns(self, now: float):
+        """
+        Open breakers that another worker opened, at most once per sync interval.
+        The read runs on the shared state thread; its result is applied by the
+        next routing decision after it finishes.
+        """
+        syncing = self._syncing
+        if syncing is not None and syncing.done():
+            self._syncing = None
+            try:
+                self._apply_cooldowns(syncing.result(), now)
+            except Exception as e:
+                print(f"Provider cooldown sync failed: {e}")
+        if now < self._next_sync or self._syncing is not None:
+            return
+        self._next_sync = now + SHARED_STATE_SYNC_INTERVAL
+        self._syncing = self.state.submit(self.state.get_all, COOLDOWN_NAMESPACE)
+
+    def _apply_cooldowns(self, cooldowns: Dict[str, float], now: float):
+        wall = time.time()
+        for name, until in cooldowns.items():
+            health = self.health.get(name)
+            if health is not None and now + (until - wall) > health.open_until:
+                health._open(now, until - wall)
+
+    def _record_failure(self, health: ProviderHealth, error: ProviderError):
+        now = time.monotonic()
+        health.record_failure(error, now)
+        if health.state != OPEN:
+            return
+        cooldown = health.open_until - now
+        self.state.set_later(COOLDOWN_NAMESPACE, health.name, time.time() + cooldown, ttl=cooldown)
+
+    async def _attempt(
+        self,
+        health: ProviderHealth,
+        call: Callable[[str], Awaitable[str]],
+        ticket: Tuple[int, float]
+    ) -> str:
+        """
+        Call one provider within its concurrency limit and record the outcome
+        in its health. Raises AdmissionRejected if the request was shed.
+        """
+        priority, deadline = ticket
+        async with self.admission.slot(health.name, priority, deadline, health.expected_latency()):
+            if health.state == HALF_OPEN:
+                health.probing = True
+            start = time.monotonic()
+            try:
+                result = await call(health.name)
+            except ProviderError as e:
+                if not e.configured:
+                    print(f"{health.name} is not configured, skipping it: {e}")
+                    self.unconfigured.add(health.name)
+                    health.probing = False
+                else:
+                    self._record_failure(health, e)
+                    PROVIDER_SECONDS.observe(time.monotonic() - start, health.name, "error")
+                raise
+            except asyncio.CancelledError:
+                # Lost a hedge race; not a provider failure
+                health.probing = False
+                PROVIDER_SECONDS.observe(time.monotonic() - start, health.name, "cancelled")
+                raise
+            latency = time.monotonic() - start
+            health.record_success(latency)
+            PROVIDER_SECONDS.observe(latency, health.name, "success")
+            return result
+
+    async def _hedged(
+        self,
+        primary: ProviderHealth,
+        secondary: ProviderHealth,
+        stats: HedgeStats,
+        call: Callable[[str], Awaitable[str]],
+        ticket: Tuple[int, float],
+        tried: Set[str],
+        errors: List[str],
+        shed: List[AdmissionRejected]
+    ):
+        """
+        Start the primary; if it has not answered within its percentile latency,
+        race the secondary. The first success wins and the other is cancelled.
+        Returns _NO_RESULT when every provider tried here failed.
+        """
+        tried.add(primary.name)
+        primary_task = asyncio.create_task(self._attempt(primary, call, ticket))
+        delay = max(HEDGE_MIN_DELAY, primary.latency_percentile(HEDGE_PERCENTILE))
+        done, _ = await asyncio.wait({primary_task}, timeout=delay)
+        if done or not stats.allow_hedge():
+            try:
+                return await primary_task
+            except ProviderError as e:
+                if e.configured:
+                    errors.append(str(e))
+                return _NO_RESULT
+            except AdmissionRejected as e:
+                shed.append(e)
+                return _NO_RESULT
+
+        stats.hedges += 1
+        tried.add(secondary.name)
+        hedge_task = asyncio.create_task(self._attempt(secondary, call, ticket))
+        pending = {primary_task, hedge_task}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        result = task.result()
+                    except ProviderError as e:
+                        if e.configured:
+                            errors.append(str(e))
+                        continue
+                    except AdmissionRejected as e:
+                        shed.append(e)
+                        continue
+                    if task is hedge_task:
+                        stats.hedge_wins += 1
+                    else:
+                        stats.primary_wins += 1
+                    return result
+        finally:
+            for task in pending:
+                task.cancel()
+        return _NO_RESULT
+
+    async def complete(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int = 1000,
+        models: Optional[Dict[str, str]] = None,
+        endpoint: Optional[str] = None
+    ) -> str:
+        """
+        Call the best healthy provider, falling through the rest on failure.
+        `endpoint` sets the request's priority and deadline for admission
+        control, and names the hedging budget to use when hedging is enabled.
+        """
+        async def call(provider: str) -> str:
+            return await self.client.complete(provider, system_prompt, user_prompt, max_tokens, models=models)
+
+        label = endpoint or "other"
+        prompt = len(system_prompt) + len(user_prompt)
+        PROMPT_CHARS.observe(prompt, label)
+        PROMPT_TOKENS.observe(estimate_tokens(system_prompt) + estimate_tokens(user_prompt), label)
+
+        ticket = request_ticket(endpoint)
+        candidates = self.candidates()
+        errors: List[str] = []
+        shed: List[AdmissionRejected] = []
+        tried: Set[str] = set()
+
+        stats = self.hedge_stats.get(endpoint) if self.hedging else None
+        if stats is not None and len(candidates) >= 2:
+            stats.requests += 1
+            result = await self._hedged(candidates[0], candidates[1], stats, call, ticket, tried, errors, shed)
+            if result is not _NO_RESULT:
+                return self._succeeded(label, result)
+
+        for health in candidates:
+            if health.name in tried or health.name in self.unconfigured:
+                continue
+            try:
+                return self._succeeded(label, await self._attempt(health, call, ticket))
+            except ProviderError as e:
+                if e.configured:
+                    print(f"{health.name} failed ({e.status_code or 'no status'}), trying next provider")
+                    FALLBACKS.inc(label, health.name)
+                    errors.append(str(e))
+            except AdmissionRejected as e:
+                shed.append(e)
+
+        failure = self._failure(errors, shed)
+        REQUESTS.inc(label, "shed" if isinstance(failure, OverloadedError) else "failed")
+        raise failure
+
+    def _succeeded(self, endpoint: str, result: str) -> str:
+        REQUESTS.inc(endpoint, "success")
+        COMPLETION_CHARS.observe(len(result), endpoint)
+        return result
+
+    async def stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int = 1000,
+        models: Optional[Dict[str, str]] = None,
+        endpoint: str = "chat"
+    ) -> AsyncIterator[str]:
+        """
+        Stream from the best healthy provider.
+        Falls through to the next provider only until the first token has been
+        sent; after that a failure is raised to the caller. Streams are not
+        hedged, and hold their provider slot until the last token.
+        """
+        PROMPT_CHARS.observe(len(system_prompt) + len(user_prompt), endpoint)
+        PROMPT_TOKENS.observe(estimate_tokens(system_prompt) + estimate_tokens(user_prompt), endpoint)
+        priority, deadline = request_ticket(endpoint)
+        errors: List[str] = []
+        shed: List[AdmissionRejected] = []
+        for health in self.candidates():
+            queue = self.admission.queues[health.name]
+            try:
+                await queue.acquire(priority, deadline, health.expected_latency())
+            except AdmissionRejected as e:
+                shed.append(e)
+                continue
+            if health.state == HALF_OPEN:
+                health.probing = True
+            start = time.monotonic()
+            started = False
+            length = 0
+            chunks = self.client.stream(health.name, system_prompt, user_prompt, max_tokens, models=models)
+            try:
+                async for text in chunks:
+                    started = True
+                    length += len(text)
+                    yield text
+            except ProviderError as e:
+                if not e.configured:
+                    print(f"{health.name} is not configured, skipping it: {e}")
+                    self.unconfigured.add(health.name)
+                    health.probing = False
+                    continue
+                self._record_failure(health, e)
+                PROVIDER_SECONDS.observe(time.monotonic() - start, health.name, "error")
+                if started:
+                    REQUESTS.inc(endpoint, "failed")
+                    raise
+                print(f"{health.name} stream failed ({e.status_code or 'no status'}), trying next provider")
+                FALLBACKS.inc(endpoint, health.name)
+                errors.append(str(e))
+                continue
+            finally:
+                health.probing = False
+                queue.release()
+                await chunks.aclose()
+            latency = time.monotonic() - start
+            health.record_success(latency)
+            PROVIDER_SECONDS.observe(latency, health.name, "success")
+            REQUESTS.inc(endpoint, "success")
+            COMPLETION_CHARS.observe(length, endpoint)
+            return
+
+        failure = self._failure(errors, shed)
+        REQUESTS.inc(endpoint, "shed" if isinstance(failure, OverloadedError) else "failed")
+        raise failure
+
+    def _failure(self, errors: List[str], shed: Optional[List[AdmissionRejected]] = None) -> Exception:
+        if shed and not errors:
+            # Nothing failed upstream; the providers that could serve it are saturated
+            return OverloadedError(
+                "LLM capacity is saturated, try again shortly: " + "; ".join(str(e) for e in shed),
+                retry_after=max(1.0, min(e.retry_after for e in shed))
+            )
+        if not errors and len(self.unconfigured) == len(self.health):
+            return ValueError("No LLM provider configured: set GROQ_API_KEY, GEMINI_API_KEY or OPENAI_API_KEY")
+        return ProvidersUnavailableError(
+            "All LLM services failed or are cooling down" + (f": {'; '.join(errors)}" if errors else ""),
+            retry_after=self.retry_after()
+        )
+
+    def retry_after(self) -> Optional[float]:
+        """Seconds until the first open breaker closes, if any."""
+        now = time.monotonic()
+        waits = [
+            health.open_until - now for health in self.health.values()
+            if health.state == OPEN and health.name not in self.unconfigured
+        ]
+        return max(0.0, min(waits)) if waits else None
+
+    def snapshot(self) -> Dict:
+        now = time.monotonic()
+        return {
+            "providers": [
+                {**health.snapshot(now), "configured": health.name not in self.unconfigured}
+                for health in self.health.values()
+            ],
+            "routing_order": [health.name for health in self.candidates()],
+            "hedging": {
+                "enabled": self.hedging,
+                "percentile": HEDGE_PERCENTILE,
+                "endpoints": {name: stats.snapshot() for name, stats in self.hedge_stats.items()},
+            },
+            "admission": self.admission.snapshot(),
+        }
+
+
+# Shared instance used by the chat and content routers
+provider_router = ProviderRouter()
+
+
+def _provider_states():
+    for health in provider_router.health.values():
+        for state in (CLOSED, OPEN, HALF_OPEN):
+            yield "", {"provider": health.name, "state": state}, 1.0 if health.state == state else 0.0
+
+
+def _hedges():
+    for endpoint, stats in provider_router.hedge_stats.items():
+        for result, value in (("hedged", stats.hedges), ("hedge_won", stats.hedge_wins),
+                              ("primary_won", stats.primary_wins), ("budget_exhausted", stats.budget_exhausted)):
+            yield "", {"endpoint": endpoint, "result": result}, value
+
+
+def _admission(field: str):
+    def collect():
+        for name, queue in provider_router.admission.queues.items():
+            yield "", {"provider": name}, getattr(queue, field)
+    return collect
+
+
+def _admission_outcomes():
+    for name, queue in provider_router.admission.queues.items():
+        for outcome in ("admitted", "shed", "timed_out"):
+            yield "", {"provider": name, "outcome": outcome}, getattr(queue, outcome)
+
+
+registry.collector("llm_breaker_state", "Circuit breaker state per provider (1 = current)", "gauge", _provider_states)
+registry.collector("llm_hedges_total", "Hedged requests and which call won", "counter", _hedges)
+registry.collector("llm_queue_depth", "Requests waiting for a provider slot", "gauge", _admission("_waiting"))
+registry.collector("llm_queue_active", "Provider calls currently holding a slot", "gauge", _admission("active"))
+registry.collector("llm_admission_total", "Admission decisions per provider", "counter", _admission_outcomes)
@@ -1,150 +1,410 @@
 """
 RAG Service - Simple chatbot using Groq LLM with textbook content
-No vector database needed - uses keyword matching for context retrieval
+No vector database needed - uses a BM25 inverted index for context retrieval,
+optionally fused with an in-process hashed vector index (RAG_RETRIEVAL_MODE)
+
+Save the indexes at build time so the app memory-maps them instead of
+re-tokenizing the corpus on every start (from the backend directory):
+    python -m services.rag_service build-index [DIR]
 """
 
+import json
 import os
+import shutil
+import sys
+import threading
+import time
 import uuid
-import httpx
-from typing import Optional, List, Dict
-from openai import OpenAI
-from data.textbook_content import CHAPTERS
+import numpy as np
+from typing import AsyncIterator, Optional, List, Dict, Tuple
+from starlette.concurrency import run_in_threadpool
+from services.corpus_store import CorpusStore, corpus_store
+from services.search_index import BM25Index
+from services.chunking import (
+    MAX_CHUNK_CHARS, MIN_CHUNK_CHARS, chunk_text, estimate_tokens, format_chunk, pack_context, split_chapter
+)
+from services.vector_index import DEFAULT_DIM, VectorIndex, top_k
+from services.provider_router import ProvidersUnavailableError, provider_router
+from services.answer_cache import AnswerCache, answer_scope
+from services.metrics import FAST_BUCKETS, TOKEN_BUCKETS, registry
+
+# Prompt budget for retrieved textbook context (approximate tokens)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "1500"))
+
+# "keyword" (BM25 only), "dense" (vectors only) or "hybrid" (weighted fusion)
+RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "keyword").lower()
+# Weight of the dense score in hybrid mode; the keyword score gets the rest
+HYBRID_ALPHA = float(os.getenv("RAG_HYBRID_ALPHA", "0.5"))
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".data", "rag_index")
+# Saved indexes loaded at startup when present; empty to always build in memory
+INDEX_DIR = os.getenv("RAG_INDEX_DIR", DEFAULT_INDEX_DIR)
+# Share of chapters that may have changed since the index was saved before it is rebuilt instead
+INDEX_MAX_STALE = float(os.getenv("RAG_INDEX_MAX_STALE", "0.25"))
+# Bumped whenever the saved layout or tokenization changes
+INDEX_FORMAT = 1
+
+RETRIEVAL_SECONDS = registry.histogram(
+    "rag_retrieval_seconds", "Time to rank and pack textbook context for a question", ("mode",), FAST_BUCKETS
+)
+CONTEXT_TOKENS = registry.histogram(
+    "rag_context_tokens", "Estimated tokens of textbook context packed into a prompt", (), TOKEN_BUCKETS
+)
+
+
+def conversation_key(context: Optional[str], history: str) -> Optional[str]:
+    """Selected text plus conversation history, for scoping cached answers."""
+    return "\n\n".join(part for part in (context, history) if part) or None
 
 
 class RAGService:
-    def __init__(self):
-        self._groq_client = None
-        self.chat_model = "llama-3.3-70b-versatile"
-        self.chapters = CHAPTERS
+    def __init__(
+        self,
+        corpus: CorpusStore = corpus_store,
+        retrieval_mode: str = RETRIEVAL_MODE,
+        index_dir: Optional[str] = None,
+        warm: bool = True
+    ):
+        self.gemini_model = "gemini-2.5-flash"
+        self.corpus = corpus
+        self.context_token_budget = CONTEXT_TOKEN_BUDGET
+        self.retrieval_mode = retrieval_mode
+        self.index_dir = index_dir
+        self.answer_cache = AnswerCache()
 
-    @property
-    def groq_client(self):
-        """Groq client for chat completions"""
-        if self._groq_client is None:
-            api_key = os.getenv("GROQ_API_KEY")
-            if not api_key:
-                raise ValueError("GROQ_API_KEY environment variable is required")
-            self._groq_client = OpenAI(
-                api_key=api_key,
-                base_url="https://api.groq.com/openai/v1"
-            )
-        return self._groq_client
+        # Chunks keep only (start, end) offsets; their text is sliced from the
+        # chapter body when a chunk is actually used
+        self.index = BM25Index()
+        self.chunk_index = BM25Index()
+        self._chunks_by_id: Dict[str, Dict] = {}
+        self._chapter_chunks: Dict[str, List[str]] = {}
+        self.chapter_vectors: Optional[VectorIndex] = None
+        self.chunk_vectors: Optional[VectorIndex] = None
 
-    def call_gemini(self, prompt: str, max_tokens: int = 1000) -> str:
-        """Call Gemini API as fallback when Groq hits rate limits."""
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not configured")
+        # Set once the indexes are loaded or built; /health/ready waits for it
+        self.ready = threading.Event()
+        self._lock = threading.RLock()
+        self.corpus.subscribe(self.apply_changes)
+        if warm:
+            self.warm()
 
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={api_key}"
+    @property
+    def dense(self) -> bool:
+        return self.retrieval_mode in ("dense", "hybrid")
 
-        payload = {
-            "contents": [{"parts": [{"text": prompt}]}],
-            "generationConfig": {
-                "maxOutputTokens": max_tokens,
-                "temperature": 0.3
-            }
-        }
+    def warm(self):
+        """
+        Load the saved indexes from `index_dir`, or build them from the corpus.
+        Runs once; searches call it, so a cold service warms on first use.
+        """
+        if self.ready.is_set():
+            return
+        with self._lock:
+            if self.ready.is_set():
+                return
+            start = time.perf_counter()
+            if self.index_dir and self._load_index(self.index_dir):
+                source = f"loaded from {self.index_dir}"
+            else:
+                self._build_index()
+                source = "built"
+            self.ready.set()
+        print(f"Retrieval index {source} in {time.perf_counter() - start:.2f}s "
+              f"({len(self.index)} chapters, {len(self._chunks_by_id)} chunks)")
 
-        # Retry up to 2 times on timeout
-        for attempt in range(2):
-            try:
-                response = httpx.post(url, json=payload, timeout=120.0)
-                response.raise_for_status()
-                data = response.json()
-                return data["candidates"][0]["content"]["parts"][0]["text"]
-            except httpx.TimeoutException:
-                if attempt == 1:
-                    raise Exception("Request timed out.")
-                print(f"Gemini timeout in RAG, retrying... (attempt {attempt + 1})")
-            except Exception as e:
-                raise e
+    def _build_index(self):
+        chapter_texts: List[Tuple[str, str]] = []
+        chunk_texts: List[Tuple[str, str]] = []
+        dense = self.dense
+        for chapter in self.corpus.iter_chapters():
+            for chunk in self._index_chapter(chapter):
+                if dense:
+                    chunk_texts.append((chunk["id"], f"{chunk['title']}\n{chunk_text(chapter['content'], chunk)}"))
+            if dense:
+                chapter_texts.append((chapter["chapter"], f"{chapter['title']}\n{chapter['content']}"))
 
-    def call_llm(self, system_prompt: str, user_prompt: str, max_tokens: int = 1000) -> str:
-        """Call LLM with automatic fallback from Groq to Gemini on rate limit."""
-        full_prompt = f"{system_prompt}\n\n{user_prompt}"
+        if dense:
+            self.chapter_vectors = VectorIndex.from_documents(chapter_texts)
+            self.chunk_vectors = VectorIndex.from_documents(chunk_texts)
 
-        # Try Groq first
+    def save_index(self, directory: str):
+        """
+        Write the keyword and vector indexes, chunk spans and per-chapter corpus
+        signatures, so a later start can mmap them instead of re-tokenizing.
+        """
+        self.warm()
+        with self._lock:
+            staging = f"{directory}.tmp"
+            shutil.rmtree(staging, ignore_errors=True)
+            self.index.save(os.path.join(staging, "chapters"))
+            self.chunk_index.save(os.path.join(staging, "chunks"))
+            if self.chapter_vectors is not None and self.chunk_vectors is not None:
+                self.chapter_vectors.save(os.path.join(staging, "chapter_vectors"))
+                self.chunk_vectors.save(os.path.join(staging, "chunk_vectors"))
+            chapters = [chapter_id for chapter_id in self.corpus.ids() if chapter_id in self._chapter_chunks]
+            spans = [
+                (self._chunks_by_id[chunk_id]["start"], self._chunks_by_id[chunk_id]["end"])
+                for chapter_id in chapters for chunk_id in self._chapter_chunks[chapter_id]
+            ]
+            np.save(os.path.join(staging, "spans.npy"), np.array(spans, dtype=np.int64).reshape(-1, 2))
+            with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump({
+                    "format": INDEX_FORMAT,
+                    "chunk_chars": [MIN_CHUNK_CHARS, MAX_CHUNK_CHARS],
+                    "vector_dim": DEFAULT_DIM if self.chapter_vectors is not None else None,
+                    "chapters": [
+                        [chapter_id, self.corpus.signature(chapter_id), len(self._chapter_chunks[chapter_id])]
+                        for chapter_id in chapters
+                    ],
+                }, f)
+            shutil.rmtree(directory, ignore_errors=True)
+            os.replace(staging, directory)
+
+    def _load_index(self, directory: str) -> bool:
+        """
+        Adopt a saved index when it fits this corpus and configuration.
+        Chapters edited since it was saved are reindexed; when too many are,
+        returns False and the caller builds from scratch.
+        """
+        manifest_path = os.path.join(directory, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return False
         try:
-            response = self.groq_client.chat.completions.create(
-                model=self.chat_model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3,
-                max_tokens=max_tokens
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest["format"] != INDEX_FORMAT or manifest["chunk_chars"] != [MIN_CHUNK_CHARS, MAX_CHUNK_CHARS]:
+                print(f"Saved retrieval index in {directory} is from another version; rebuilding")
+                return False
+            if self.dense and manifest["vector_dim"] != DEFAULT_DIM:
+                print(f"Saved retrieval index in {directory} has no matching vectors; rebuilding")
+                return False
+
+            index = BM25Index.load(os.path.join(directory, "chapters"))
+            chunk_index = BM25Index.load(os.path.join(directory, "chunks"))
+            chapter_vectors = chunk_vectors = None
+            if self.dense:
+                chapter_vectors = VectorIndex.load(os.path.join(directory, "chapter_vectors"))
+                chunk_vectors = VectorIndex.load(os.path.join(directory, "chunk_vectors"))
+            spans = iter(np.load(os.path.join(directory, "spans.npy")).tolist())
+            chunks_by_id: Dict[str, Dict] = {}
+            chapter_chunks: Dict[str, List[str]] = {}
+            saved: Dict[str, str] = {}
+            for chapter_id, signature, count in manifest["chapters"]:
+                meta = self.corpus.get(chapter_id)
+                title = meta["title"] if meta else ""
+                ids = []
+                for position in range(count):
+                    start, end = next(spans)
+                    chunk_id = f"{chapter_id}#{position}"
+                    chunks_by_id[chunk_id] = {
+                        "id": chunk_id, "chapter": chapter_id, "title": title,
+                        "position": position, "start": start, "end": end,
+                    }
+                    ids.append(chunk_id)
+                chapter_chunks[chapter_id] = ids
+                saved[chapter_id] = signature
+        except (OSError, KeyError, ValueError, StopIteration) as e:
+            print(f"Ignoring saved retrieval index in {directory}: {e!r}")
+            return False
+
+        current = {chapter_id: self.corpus.signature(chapter_id) for chapter_id in self.corpus.ids()}
+        changed = [chapter_id for chapter_id, signature in current.items() if saved.get(chapter_id) != signature]
+        removed = [chapter_id for chapter_id in saved if chapter_id not in current]
+        if len(changed) + len(removed) > INDEX_MAX_STALE * max(1, len(saved)):
+            print(f"Saved retrieval index in {directory} is stale ({len(changed)} changed, {len(removed)} removed); rebuilding")
+            return False
+
+        self.index, self.chunk_index = index, chunk_index
+        self.chapter_vectors, self.chunk_vectors = chapter_vectors, chunk_vectors
+        self._chunks_by_id, self._chapter_chunks = chunks_by_id, chapter_chunks
+        if changed or removed:
+            self._apply_changes(changed, removed)
+        return True
+
+    def _index_chapter(self, chapter: Dict) -> List[Dict]:
+        """Add one chapter and its chunks to the keyword indexes."""
+        body = chapter["content"]
+        self.index.add(chapter["chapter"], chapter["title"], body)
+        chunks = split_chapter(chapter)
+        for chunk in chunks:
+            self._chunks_by_id[chunk["id"]] = chunk
+            self.chunk_index.add(chunk["id"], chunk["title"], chunk_text(body, chunk))
+        self._chapter_chunks[chapter["chapter"]] = [chunk["id"] for chunk in chunks]
+        return chunks
+
+    def _unindex_chapter(self, chapter_id: str):
+        self.index.remove(chapter_id)
+        if self.chapter_vectors is not None:
+            self.chapter_vectors.remove(chapter_id)
+        for chunk_id in self._chapter_chunks.pop(chapter_id, ()):
+            self._chunks_by_id.pop(chunk_id, None)
+            self.chunk_index.remove(chunk_id)
+            if self.chunk_vectors is not None:
+                self.chunk_vectors.remove(chunk_id)
+
+    def apply_changes(self, changed: List[str], removed: List[str]):
+        """
+        Reindex only the chapters that changed on disk and drop cached answers
+        that were built from them. Vector updates reuse the IDF weights fitted
+        at startup. Before warm() there is nothing to update: it reads the
+        corpus as it is then. Called from the corpus watcher's thread; searches
+        hold the same lock while they read the indexes.
+        """
+        with self._lock:
+            if self.ready.is_set():
+                self._apply_changes(changed, removed)
+
+    def _apply_changes(self, changed: List[str], removed: List[str]):
+        for chapter_id in list(changed) + list(removed):
+            self._unindex_chapter(chapter_id)
+        for chapter_id in changed:
+            chapter = self.corpus.chapter(chapter_id)
+            if chapter is None:
+                continue
+            chunks = self._index_chapter(chapter)
+            if self.chapter_vectors is not None:
+                self.chapter_vectors.upsert(chapter_id, f"{chapter['title']}\n{chapter['content']}")
+            if self.chunk_vectors is not None:
+                for chunk in chunks:
+                    self.chunk_vectors.upsert(chunk["id"], f"{chunk['title']}\n{chunk_text(chapter['content'], chunk)}")
+        self.answer_cache.invalidate_chapters(list(changed) + list(removed))
+
+    def _with_text(self, chunk: Dict) -> Dict:
+        return {**chunk, "content": chunk_text(self.corpus.body(chunk["chapter"]) or "", chunk)}
+
+    async def call_llm(self, system_prompt: str, user_prompt: str, max_tokens: int = 1000) -> str:
+        """Call the fastest healthy LLM provider, falling back to the others on failure."""
+        return await provider_router.complete(
+            system_prompt, user_prompt, max_tokens,
+            models={"gemini": self.gemini_model}, endpoint="chat"
+        )
+
+    def _rank(
+        self,
+        query: str,
+        keyword_index: BM25Index,
+        vectors: Optional[VectorIndex],
+        limit: int
+    ) -> List[Tuple[str, float]]:
+        """
+        Rank documents for the configured retrieval mode.
+        Keyword scores come from the postings of the query terms only; in
+        hybrid mode they are max-normalized and fused with the cosine scores
+        of one matrix-vector product over all document vectors.
+        """
+        if vectors is None or self.retrieval_mode == "keyword":
+            return [
+                (doc_id, min(score / 10, 1.0))
+                for doc_id, score in keyword_index.search(query, limit=limit)
+            ]
+        if self.retrieval_mode == "dense":
+            return vectors.search(query, limit=limit)
+
+        fused = HYBRID_ALPHA * np.clip(vectors.scores(query), 0.0, None)
+        keyword_hits = keyword_index.search(query, limit=None)
+        if keyword_hits:
+            best = keyword_hits[0][1]
+            rows = [vectors.positions[doc_id] for doc_id, _ in keyword_hits]
+            fused[rows] += (1 - HYBRID_ALPHA) * np.array(
+                [score / best for _, score in keyword_hits], dtype=np.float32
             )
-            return response.choices[0].message.content or ""
-        except Exception as e:
-            error_str = str(e)
-            # Check if it's a rate limit error (429)
-            if "429" in error_str or "rate_limit" in error_str.lower():
-                print(f"Groq rate limit hit in RAG, falling back to Gemini")
-                return self.call_gemini(full_prompt, max_tokens)
-            else:
-                raise e
+        return top_k(vectors.ids, fused, limit)
 
     def search_relevant_chapters(self, query: str, limit: int = 3) -> List[Dict]:
         """
-        Simple keyword-based search to find relevant chapters.
-        Scores chapters based on keyword matches in title and content.
+        Search chapters with the prebuilt indexes.
+        Only the postings of the query terms are visited, not the whole corpus.
         """
-        query_lower = query.lower()
-        query_words = set(query_lower.split())
-
+        self.warm()
+        with self._lock:
+            ranked = self._rank(query, self.index, self.chapter_vectors, limit)
         scored_chapters = []
-        for chapter in self.chapters:
-            title_lower = chapter["title"].lower()
-            content_lower = chapter["content"].lower()
-
-            # Score based on keyword matches
-            score = 0
-            for word in query_words:
-                if len(word) > 2:  # Skip very short words
-                    if word in title_lower:
-                        score += 3  # Title matches are more important
-                    if word in content_lower:
-                        score += content_lower.count(word)
-
-            if score > 0:
-                scored_chapters.append({
-                    "chapter": chapter["chapter"],
-                    "title": chapter["title"],
-                    "content": chapter["content"],
-                    "relevance": min(score / 10, 1.0)  # Normalize to 0-1
-                })
-
-        # Sort by score and return top results
-        scored_chapters.sort(key=lambda x: x["relevance"], reverse=True)
-        return scored_chapters[:limit]
+        for chapter_id, relevance in ranked:
+            chapter = self.corpus.chapter(chapter_id)
+            if chapter is None:
+                continue
+            scored_chapters.append({
+                "chapter": chapter["chapter"],
+                "title": chapter["title"],
+                "content": chapter["content"],
+                "relevance": relevance  # Normalized to 0-1
+            })
+        return scored_chapters
 
-    async def get_answer(
+    def search_relevant_chunks(self, query: str, limit: int = 20) -> List[Dict]:
+        """Rank paragraph chunks for the query, best first."""
+        self.warm()
+        with self._lock:
+            chunks = [
+                (self._chunks_by_id[chunk_id], relevance)
+                for chunk_id, relevance in self._rank(query, self.chunk_index, self.chunk_vectors, limit)
+                if chunk_id in self._chunks_by_id
+            ]
+        return [{**self._with_text(chunk), "relevance": relevance} for chunk, relevance in chunks]
+
+    def build_context(self, question: str) -> Tuple[str, List[Dict]]:
+        """
+        Pack the best non-redundant chunks into the prompt token budget.
+        Returns (context_text, sources); sources are empty when nothing matched.
+        """
+        ranked = self.search_relevant_chunks(question)
+        if ranked:
+            packed = pack_context(ranked, self.context_token_budget)
+        else:
+            # Fall back to the opening chunk of each chapter, as far as the budget allows;
+            # only the openings that can fit are read from the corpus
+            openings, budget = [], self.context_token_budget
+            for chapter_id in self.corpus.ids():
+                with self._lock:
+                    chunk_ids = self._chapter_chunks.get(chapter_id)
+                    chunk = self._chunks_by_id.get(chunk_ids[0]) if chunk_ids else None
+                if chunk is None:
+                    continue
+                size = (chunk["end"] - chunk["start"] + 3) // 4  # estimate_tokens() from the span
+                if size > budget:
+                    continue
+                openings.append(self._with_text(chunk))
+                budget -= size
+            packed = pack_context(openings, self.context_token_budget)
+
+        # One source per chapter, keeping the best chunk relevance
+        sources: Dict[str, Dict] = {}
+        for chunk in packed:
+            if "relevance" not in chunk:
+                continue
+            source = sources.get(chunk["chapter"])
+            if source is None or chunk["relevance"] > source["relevance"]:
+                sources[chunk["chapter"]] = {
+                    "chapter": chunk["chapter"],
+                    "title": chunk["title"],
+                    "relevance": chunk["relevance"]
+                }
+
+        for source in sources.values():
+            source["relevance"] = round(source["relevance"], 2)
+
+        context_text = "\n\n".join(format_chunk(chunk) for chunk in packed)
+        return context_text, list(sources.values())
+
+    def build_prompts(
         self,
         question: str,
         context: Optional[str] = None,
-        user_id: Optional[str] = None,
-        language: str = "english"
-    ) -> Dict:
+        language: str = "english",
+        history: str = "",
+        previous_question: Optional[str] = None
+    ) -> Tuple[str, str, List[Dict]]:
         """
-        Get answer using Groq LLM with textbook content as context.
-        Supports multiple languages: english, urdu
+        Retrieve context and build the (system, user) prompts plus the sources.
+        In a conversation, `history` is the bounded summary of earlier turns and
+        the previous question is added to the retrieval query so follow-ups
+        ("what about its QoS?") find the same chapters.
         """
-        # Search for relevant chapters
-        relevant_chunks = self.search_relevant_chapters(question)
-
-        # Build context from all chapters if no specific match, or use matched chapters
-        if relevant_chunks:
-            context_text = "\n\n".join([
-                f"[Chapter {chunk['chapter']} - {chunk['title']}]\n{chunk['content']}"
-                for chunk in relevant_chunks
-            ])
-        else:
-            # Include a summary of all chapters as fallback
-            context_text = "\n\n".join([
-                f"[Chapter {ch['chapter']} - {ch['title']}]\n{ch['content'][:500]}..."
-                for ch in self.chapters[:5]
-            ])
+        query = f"{previous_question}\n{question}" if previous_question else question
+        start = time.perf_counter()
+        context_text, sources = self.build_context(query)
+        RETRIEVAL_SECONDS.observe(time.perf_counter() - start, self.retrieval_mode)
+        CONTEXT_TOKENS.observe(estimate_tokens(context_text))
 
         # Build language instruction
         language_instruction = ""
@@ -158,29 +418,48 @@ Always cite which chapter your information comes from when applicable.
 Keep your answers clear, concise, and helpful for students learning robotics.
 If the question is not related to the textbook content, politely redirect to robotics topics.{language_instruction}"""
 
+        conversation = f"Conversation so far:\n{history}\n\n" if history else ""
         user_prompt = f"""Context from textbook:
 {context_text}
 
-User question: {question}
+{conversation}User question: {question}
 
 {"Additional context from user: " + context if context else ""}
 
 Please provide a helpful, accurate answer based on the textbook content."""
 
-        try:
-            answer = self.call_llm(system_prompt, user_prompt, max_tokens=1000)
-        except Exception as e:
-            answer = f"I apologize, but I encountered an error: {str(e)}. Please make sure the API is configured correctly."
-
-        # Format sources
-        sources = [
-            {
-                "chapter": chunk["chapter"],
-                "title": chunk["title"],
-                "relevance": round(chunk["relevance"], 2)
-            }
-            for chunk in relevant_chunks
-        ]
+        return system_prompt, user_prompt, sources
+
+    async def get_answer(
+        self,
+        question: str,
+        context: Optional[str] = None,
+        user_id: Optional[str] = None,
+        language: str = "english",
+        history: str = "",
+        previous_question: Optional[str] = None
+    ) -> Dict:
+        """
+        Get answer using Groq LLM with textbook content as context.
+        Supports multiple languages: english, urdu
+        """
+        # In a worker thread: retrieval may wait for a corpus change being reindexed
+        system_prompt, user_prompt, sources = await run_in_threadpool(
+            self.build_prompts, question, context, language, history, previous_question
+        )
+
+        # Repeated (or near-identical) questions over the same chapters skip the LLM;
+        # within a conversation the history is part of the scope
+        scope = answer_scope([source["chapter"] for source in sources], language, conversation_key(context, history))
+        answer = self.answer_cache.get(question, scope)
+        if answer is None:
+            try:
+                answer = await self.call_llm(system_prompt, user_prompt, max_tokens=1000)
+                self.answer_cache.set(question, scope, answer)
+            except ProvidersUnavailableError:
+                raise  # shed or cooling down: the client should retry later
+            except Exception as e:
+                answer = f"I apologize, but I encountered an error: {str(e)}. Please make sure the API is configured correctly."
 
         return {
             "answer": answer,
@@ -188,9 +467,63 @@ Please provide a helpful, accurate answer based on the textbook content."""
             "message_id": str(uuid.uuid4())
         }
 
+    async def stream_answer(
+        self,
+        question: str,
+        context: Optional[str] = None,
+        user_id: Optional[str] = None,
+        language: str = "english",
+        history: str = "",
+        previous_question: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Stream an answer as (event, data) pairs: "sources" first, then one
+        "token" per text delta, an "error" if generation fails, and "done".
+        """
+        # In a worker thread: retrieval may wait for a corpus change being reindexed
+        system_prompt, user_prompt, sources = await run_in_threadpool(
+            self.build_prompts, question, context, language, history, previous_question
+        )
+        yield "sources", {"sources": sources}
+
+        scope = answer_scope([source["chapter"] for source in sources], language, conversation_key(context, history))
+        cached = self.answer_cache.get(question, scope)
+        if cached is not None:
+            yield "token", {"text": cached}
+            yield "done", {"message_id": str(uuid.uuid4())}
+            return
+
+        parts = []
+        try:
+            async for text in provider_router.stream(
+                system_prompt, user_prompt, max_tokens=1000,
+                models={"gemini": self.gemini_model}
+            ):
+                parts.append(text)
+                yield "token", {"text": text}
+            self.answer_cache.set(question, scope, "".join(parts))
+        except ProvidersUnavailableError as e:
+            yield "error", {"detail": str(e), "retry_after": e.retry_after}
+        except Exception as e:
+            yield "error", {
+                "detail": f"I apologize, but I encountered an error: {str(e)}. Please make sure the API is configured correctly."
+            }
+
+        yield "done", {"message_id": str(uuid.uuid4())}
+
     def get_all_chapters(self) -> List[Dict]:
         """Return list of all available chapters"""
         return [
             {"chapter": ch["chapter"], "title": ch["title"]}
-            for ch in self.chapters
+            for ch in self.corpus.chapters()
         ]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "build-index":
+        print(__doc__)
+        sys.exit(1)
+    target = sys.argv[2] if len(sys.argv) > 2 else INDEX_DIR
+    service = RAGService(retrieval_mode=RETRIEVAL_MODE)
+    service.save_index(target)
+    print(f"Saved {len(service.index)} chapters and {len(service._chunks_by_id)} chunks to {target}")
@@ -0,0 +1,230 @@
+"""
+Search Index - Tokenized inverted index with BM25 scoring
+Built once from the textbook content so queries only touch matching postings.
+Documents can be added, replaced and removed in place; an update costs the
+size of the changed document, not the size of the corpus. An index can be
+saved as flat posting arrays and loaded back through mmap without re-tokenizing.
+"""
+
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Very common words that carry no retrieval signal
+STOP_WORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does",
+    "for", "from", "how", "i", "in", "is", "it", "me", "of", "on", "or",
+    "the", "this", "to", "what", "when", "where", "which", "who", "why",
+    "with", "you", "your", "about", "explain", "tell",
+})
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case text and split it into alphanumeric tokens, dropping stop words."""
+    return [
+        token for token in TOKEN_PATTERN.findall(text.lower())
+        if token not in STOP_WORDS
+    ]
+
+
+class BM25Index:
+    """
+    Inverted index over documents with a title and a body field.
+    Title terms are counted `title_boost` times so title matches weigh more.
+    IDF is derived from posting-list sizes at query time, so it stays exact
+    as documents come and go without a rebuild.
+    A loaded index answers queries from its memory-mapped posting arrays and
+    unpacks them into dicts only on the first add or remove.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, title_boost: int = 3):
+        self.k1 = k1
+        self.b = b
+        self.title_boost = title_boost
+        self.doc_ids: List[Optional[str]] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self._positions: Dict[str, int] = {}
+        self._doc_terms: List[Tuple[str, ...]] = []
+        self._free: List[int] = []
+        self._total_length = 0
+        # (term -> row, row offsets, positions, frequencies) of a loaded index
+        self._packed: Optional[Tuple[Dict[str, int], np.ndarray, np.ndarray, np.ndarray]] = None
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Tuple[str, str, str]], **kwargs) -> "BM25Index":
+        """Build an index from (doc_id, title, body) tuples."""
+        index = cls(**kwargs)
+        for doc_id, title, body in documents:
+            index.add(doc_id, title, body)
+        return index
+
+    def _unpack(self):
+        """Turn loaded posting arrays into the dicts that add and remove update."""
+        if self._packed is None:
+            return
+        rows, offsets, positions, frequencies = self._packed
+        doc_terms: List[List[str]] = [[] for _ in self.doc_ids]
+        postings: Dict[str, Dict[int, int]] = {}
+        for term, row in rows.items():
+            start, end = int(offsets[row]), int(offsets[row + 1])
+            entries = dict(zip(positions[start:end].tolist(), frequencies[start:end].tolist()))
+            postings[term] = entries
+            for position in entries:
+                doc_terms[position].append(term)
+        self.postings = postings
+        self._doc_terms = [tuple(terms) for terms in doc_terms]
+        self._packed = None
+
+    def _postings(self, term: str) -> Iterable[Tuple[int, int]]:
+        """(position, frequency) pairs of one term; empty when it is not indexed."""
+        if self._packed is None:
+            return self.postings.get(term, {}).items()
+        rows, offsets, positions, frequencies = self._packed
+        row = rows.get(term)
+        if row is None:
+            return ()
+        start, end = int(offsets[row]), int(offsets[row + 1])
+        return list(zip(positions[start:end].tolist(), frequencies[start:end].tolist()))
+
+    def add(self, doc_id: str, title: str, body: str):
+        """Index a document, replacing any earlier version with the same id."""
+        self._unpack()
+        if doc_id in self._positions:
+            self.remove(doc_id)
+
+        terms = Counter(tokenize(body))
+        for token in tokenize(title):
+            terms[token] += self.title_boost
+        length = sum(terms.values())
+
+        if self._free:
+            position = self._free.pop()
+            self.doc_ids[position] = doc_id
+            self.doc_lengths[position] = length
+            self._doc_terms[position] = tuple(terms)
+        else:
+            position = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            self.doc_lengths.append(length)
+            self._doc_terms.append(tuple(terms))
+        self._positions[doc_id] = position
+        self._total_length += length
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[position] = frequency
+
+    def remove(self, doc_id: str):
+        """Drop a document; only its own terms' postings are touched."""
+        self._unpack()
+        position = self._positions.pop(doc_id, None)
+        if position is None:
+            return
+        for term in self._doc_terms[position]:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(position, None)
+                if not postings:
+                    del self.postings[term]
+        self._total_length -= self.doc_lengths[position]
+        self.doc_ids[position] = None
+        self.doc_lengths[position] = 0
+        self._doc_terms[position] = ()
+        self._free.append(position)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._positions
+
+    def search(self, query: str, limit: Optional[int] = 10) -> List[Tuple[str, float]]:
+        """
+        Score documents against the query with BM25.
+        Returns (doc_id, score) pairs, best first; `limit=None` returns every match.
+        """
+        total_docs = len(self._positions)
+        if not total_docs:
+            return []
+        avg_length = (self._total_length / total_docs) or 1.0
+        # Length normalisation k1 * (1 - b + b * length / avg), split into two constants
+        norm_base = self.k1 * (1 - self.b)
+        norm_scale = self.k1 * self.b / avg_length
+        k1_plus_one = self.k1 + 1
+        doc_lengths = self.doc_lengths
+
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, frequency in postings:
+                norm = norm_base + norm_scale * doc_lengths[position]
+                score = idf * frequency * k1_plus_one / (frequency + norm)
+                scores[position] = scores.get(position, 0.0) + score
+
+        if limit is None:
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        else:
+            ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(self.doc_ids[position], score) for position, score in ranked]
+
+    def save(self, directory: str):
+        """
+        Write the postings as flat .npy arrays (memory-mappable): row offsets
+        per term, then the positions and frequencies of every posting.
+        """
+        os.makedirs(directory, exist_ok=True)
+        if self._packed is not None:
+            rows, offsets, positions, frequencies = self._packed
+            terms = sorted(rows, key=rows.get)
+        else:
+            terms = list(self.postings)
+            sizes = [len(self.postings[term]) for term in terms]
+            offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+            np.cumsum(sizes, out=offsets[1:])
+            positions = np.fromiter(
+                (position for term in terms for position in self.postings[term]),
+                dtype=np.int32, count=int(offsets[-1])
+            )
+            frequencies = np.fromiter(
+                (frequency for term in terms for frequency in self.postings[term].values()),
+                dtype=np.int32, count=int(offsets[-1])
+            )
+        np.save(os.path.join(directory, "offsets.npy"), offsets)
+        np.save(os.path.join(directory, "positions.npy"), positions)
+        np.save(os.path.join(directory, "frequencies.npy"), frequencies)
+        np.save(os.path.join(directory, "lengths.npy"), np.array(self.doc_lengths, dtype=np.int32))
+        with open(os.path.join(directory, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "k1": self.k1, "b": self.b, "title_boost": self.title_boost,
+                "doc_ids": self.doc_ids, "terms": terms,
+            }, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "BM25Index":
+        with open(os.path.join(directory, "index.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        index = cls(k1=meta["k1"], b=meta["b"], title_boost=meta["title_boost"])
+        index.doc_ids = meta["doc_ids"]
+        index.doc_lengths = np.load(os.path.join(directory, "lengths.npy")).tolist()
+        index._positions = {doc_id: i for i, doc_id in enumerate(index.doc_ids) if doc_id is not None}
+        index._free = [i for i, doc_id in enumerate(index.doc_ids) if doc_id is None]
+        index._doc_terms = [()] * len(index.doc_ids)
+        index._total_length = sum(index.doc_lengths)
+        index._packed = (
+            {term: row for row, term in enumerate(meta["terms"])},
+            np.load(os.path.join(directory, "offsets.npy"), mmap_mode=mode),
+            np.load(os.path.join(directory, "positions.npy"), mmap_mode=mode),
+            np.load(os.path.join(directory, "frequencies.npy"), mmap_mode=mode),
+        )
+        return index
@@ -0,0 +1,235 @@
+"""
+Shared State - Small key/value state that every worker process must agree on
+Token revocations, provider cool-downs and idempotent results are written
+here so that a logout, a 429 or a finished request seen by one uvicorn or
+gunicorn worker holds for all of them. The SQLite backend keeps everything
+in one WAL database file; the memory backend suits a single process. Other
+backends (e.g. Redis) only need to implement SharedState's abstract methods.
+
+The methods block (a write may wait for another worker's lock), so code on
+the event loop goes through submit() or set_later(), which run them on the
+backend's own thread.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".data", "shared_state.sqlite3")
+# "sqlite" (shared across worker processes) or "memory" (this process only)
+SHARED_STATE_BACKEND = os.getenv("SHARED_STATE_BACKEND", "sqlite").lower()
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", DEFAULT_PATH)
+# Seconds a worker may serve from its local mirror before re-reading shared state
+SHARED_STATE_SYNC_INTERVAL = float(os.getenv("SHARED_STATE_SYNC_INTERVAL", "1.0"))
+
+PRUNE_INTERVAL = 60.0
+
+SELECT_VALUE = "SELECT value FROM entries WHERE namespace = ? AND key = ? AND expires > ?"
+SELECT_NAMESPACE = "SELECT key, value FROM entries WHERE namespace = ? AND expires > ?"
+SELECT_CHANGES = "SELECT key, value, seq FROM entries WHERE namespace = ? AND seq > ? AND expires > ? ORDER BY seq"
+# seq comes from a counter row bumped in the same transaction, so it keeps
+# increasing across processes even after expired entries are pruned
+NEXT_SEQ = "UPDATE sequence SET seq = seq + 1"
+UPSERT = (
+    "INSERT OR REPLACE INTO entries (namespace, key, value, expires, seq) "
+    "VALUES (?, ?, ?, ?, (SELECT seq FROM sequence))"
+)
+DELETE = "DELETE FROM entries WHERE namespace = ? AND key = ?"
+DELETE_EXPIRED = "DELETE FROM entries WHERE expires <= ?"
+
+Change = Tuple[str, Any]
+
+
+class SharedState(ABC):
+    """
+    Namespaced JSON values with an optional time to live in seconds.
+    `changes` lets a worker keep a local mirror of a namespace up to date by
+    reading only what was written since its last sync.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def get_all(self, namespace: str) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        ...
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str):
+        ...
+
+    @abstractmethod
+    def changes(self, namespace: str, since: int) -> Tuple[List[Change], int]:
+        """Live entries written after cursor `since`, and the new cursor."""
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """
+        Run one of the blocking methods on this process's state thread. One
+        thread keeps writes in order; it is recreated after a fork.
+        """
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-state")
+            self._executor_pid = os.getpid()
+        return self._executor.submit(fn, *args)
+
+    def set_later(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> Future:
+        """set() without waiting for it; a failure is logged."""
+        future = self.submit(self.set, namespace, key, value, ttl)
+        future.add_done_callback(_log_failure(f"Shared state write {namespace}/{key} failed"))
+        return future
+
+    def close(self):
+        """Finish queued writes."""
+        if self._executor is not None and self._executor_pid == os.getpid():
+            self._executor.shutdown(wait=True)
+        self._executor = None
+
+
+def _log_failure(message: str) -> Callable[[Future], None]:
+    def done(future: Future):
+        if not future.cancelled() and future.exception() is not None:
+            print(f"{message}: {future.exception()}")
+    return done
+
+
+def _expiry(ttl: Optional[float]) -> float:
+    return time.time() + ttl if ttl is not None else float("inf")
+
+
+class MemoryState(SharedState):
+    """Dict-backed state for a single worker process."""
+
+    def __init__(self):
+        super().__init__()
+        self._entries: Dict[Tuple[str, str], Tuple[Any, float, int]] = {}
+        self._seq = 0
+        self._next_prune = 0.0
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        entry = self._entries.get((namespace, key))
+        return entry[0] if entry is not None and entry[1] > time.time() else None
+
+    def get_all(self, namespace: str) -> Dict[str, Any]:
+        now = time.time()
+        return {key: value for (ns, key), (value, expires, _) in self._entries.items() if ns == namespace and expires > now}
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        self._seq += 1
+        self._entries[(namespace, key)] = (value, _expiry(ttl), self._seq)
+        now = time.time()
+        if now >= self._next_prune:
+            self._entries = {k: entry for k, entry in self._entries.items() if entry[1] > now}
+            self._next_prune = now + PRUNE_INTERVAL
+
+    def delete(self, namespace: str, key: str):
+        self._entries.pop((namespace, key), None)
+
+    def changes(self, namespace: str, since: int) -> Tuple[List[Change], int]:
+        now = time.time()
+        rows = sorted(
+            (seq, key, value) for (ns, key), (value, expires, seq) in self._entries.items()
+            if ns == namespace and seq > since and expires > now
+        )
+        return [(key, value) for _, key, value in rows], max([since] + [seq for seq, _, _ in rows])
+
+
+class SQLiteState(SharedState):
+    """
+    One table in a WAL-mode SQLite file. Every process opens its own
+    connection on first use (and again after a fork), so the app can be
+    imported in a gunicorn master before its workers are forked.
+    """
+
+    def __init__(self, path: str = SHARED_STATE_PATH):
+        super().__init__()
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._next_prune = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "expires REAL NOT NULL, seq INTEGER NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_seq ON entries (namespace, seq)")
+            conn.execute("CREATE TABLE IF NOT EXISTS sequence (seq INTEGER NOT NULL)")
+            conn.execute("INSERT INTO sequence (seq) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM sequence)")
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._connect().execute(SELECT_VALUE, (namespace, key, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_all(self, namespace: str) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._connect().execute(SELECT_NAMESPACE, (namespace, time.time())).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        # inf is not valid SQL; 1e300 sorts after every real timestamp
+        expires = min(_expiry(ttl), 1e300)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(NEXT_SEQ)
+                conn.execute(UPSERT, (namespace, key, json.dumps(value), expires))
+                now = time.time()
+                if now >= self._next_prune:
+                    conn.execute(DELETE_EXPIRED, (now,))
+                    self._next_prune = now + PRUNE_INTERVAL
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(DELETE, (namespace, key))
+
+    def changes(self, namespace: str, since: int) -> Tuple[List[Change], int]:
+        with self._lock:
+            rows = self._connect().execute(SELECT_CHANGES, (namespace, since, time.time())).fetchall()
+        return [(key, json.loads(value)) for key, value, _ in rows], (rows[-1][2] if rows else since)
+
+    def close(self):
+        super().close()
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+def create_shared_state(backend: str = SHARED_STATE_BACKEND) -> SharedState:
+    if backend == "sqlite":
+        return SQLiteState()
+    if backend == "memory":
+        return MemoryState()
+    raise ValueError(f"Unknown SHARED_STATE_BACKEND: {backend}")
+
+
+# Process-wide backend, closed by the app lifespan in main.py
+shared_state = create_shared_state()
@@ -0,0 +1,168 @@
+"""
+Single Flight - In-flight request coalescing and idempotency keys
+Identical concurrent calls share one upstream generation and its result
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services.metrics import registry
+from services.shared_state import SharedState, shared_state
+
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "600"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+IDEMPOTENCY_NAMESPACE = "idempotency"
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable hash of JSON-serializable request fields."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IdempotencyConflictError(Exception):
+    """An Idempotency-Key was reused with a different request body."""
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. The call runs in its own task, so
+    a caller that disconnects does not cancel the work others are waiting on.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.followers += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        # Mark the outcome as seen even if every waiter has gone away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict:
+        return {"in_flight": len(self._inflight), "leaders": self.leaders, "followers": self.followers}
+
+
+class IdempotencyStore:
+    """
+    Remembers the outcome of requests sent with an Idempotency-Key.
+    A retry with the same key reattaches to the in-flight call or gets the
+    completed result; failures are forgotten so the client can try again.
+    Completed results are also written to shared state, so a retry that lands
+    on another worker process is replayed too (an in-flight call is only
+    joined on the worker running it).
+    """
+
+    def __init__(
+        self,
+        ttl: float = IDEMPOTENCY_TTL,
+        max_entries: int = IDEMPOTENCY_MAX_ENTRIES,
+        state: SharedState = shared_state
+    ):
+        self.state = state
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.replays = 0
+
+    def _live_entry(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is not None and entry["expires"] <= time.monotonic():
+            self._entries.pop(key, None)
+            entry = None
+        return entry
+
+    async def _join(self, entry: Dict, request_fingerprint: str) -> Any:
+        if entry["fingerprint"] != request_fingerprint:
+            raise IdempotencyConflictError("Idempotency-Key was already used for a different request")
+        self.replays += 1
+        return await asyncio.shield(entry["task"])
+
+    async def run(self, key: str, request_fingerprint: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._live_entry(key)
+        if entry is not None:
+            return await self._join(entry, request_fingerprint)
+
+        # Off the event loop: the read may wait for another worker's write
+        stored = await asyncio.wrap_future(self.state.submit(self.state.get, IDEMPOTENCY_NAMESPACE, key))
+        entry = self._live_entry(key)
+        if entry is not None:
+            # Started by a retry that arrived while this one was reading
+            return await self._join(entry, request_fingerprint)
+        if stored is not None:
+            if stored["fingerprint"] != request_fingerprint:
+                raise IdempotencyConflictError("Idempotency-Key was already used for a different request")
+            self.replays += 1
+            return stored["result"]
+
+        task = asyncio.ensure_future(fn())
+        self._entries[key] = {"task": task, "fingerprint": request_fingerprint, "expires": time.monotonic() + self.ttl}
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        def finished(done: asyncio.Task):
+            if done.cancelled() or done.exception() is not None:
+                if self._entries.get(key, {}).get("task") is done:
+                    self._entries.pop(key, None)
+                return
+            # Still replayed by this worker from its own entry if the write fails
+            self.state.set_later(
+                IDEMPOTENCY_NAMESPACE, key,
+                {"fingerprint": request_fingerprint, "result": done.result()}, ttl=self.ttl
+            )
+
+        task.add_done_callback(finished)
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict:
+        return {"entries": len(self._entries), "replays": self.replays}
+
+
+# Shared instances for the LLM-backed endpoints
+single_flight = SingleFlight()
+idempotency_store = IdempotencyStore()
+
+registry.collector(
+    "singleflight_calls_total", "Coalesced calls that ran (leader) or joined one in flight (follower)", "counter",
+    lambda: [
+        ("", {"role": "leader"}, single_flight.leaders),
+        ("", {"role": "follower"}, single_flight.followers),
+        ("", {"role": "idempotent_replay"}, idempotency_store.replays),
+    ]
+)
+
+
+async def coalesce(
+    endpoint: str,
+    request_fingerprint: str,
+    fn: Callable[[], Awaitable[Any]],
+    idempotency_key: Optional[str] = None
+) -> Any:
+    """
+    Share one call among identical concurrent requests to an endpoint; with an
+    Idempotency-Key, retries also reattach to the earlier call or its result.
+    """
+    def call() -> Awaitable[Any]:
+        return single_flight.do(f"{endpoint}:{request_fingerprint}", fn)
+
+    if idempotency_key:
+        return await idempotency_store.run(f"{endpoint}:{idempotency_key}", request_fingerprint, call)
+    return await call()
@@ -0,0 +1,131 @@
+"""
+Token Cache - Verified JWTs and revoked token ids
+A token that already passed signature checks maps straight to its user
+profile until it expires; logout adds the token id to a denylist that is
+shared by all worker processes.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, Optional, Tuple
+
+from services.metrics import registry
+from services.shared_state import SHARED_STATE_SYNC_INTERVAL, SharedState, shared_state
+
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+REVOKED_NAMESPACE = "revoked_tokens"
+
+
+class RevocationList:
+    """
+    Revoked token ids (jti) with the token's own expiry. An entry is only
+    needed until the token would have expired anyway, so the set stays as
+    small as the number of live logged-out tokens.
+    Revocations go through shared state so a logout on one worker holds on
+    every worker; each worker checks a local mirror that it refreshes at most
+    every `sync_interval` seconds. Reads and writes of shared state run on its
+    own thread, so a busy database never stalls the event loop.
+    """
+
+    def __init__(self, state: SharedState = shared_state, sync_interval: float = SHARED_STATE_SYNC_INTERVAL):
+        self.state = state
+        self.sync_interval = sync_interval
+        self._revoked: Dict[str, float] = {}
+        self._cursor = 0
+        self._next_sync = 0.0
+        self._next_prune = 0.0
+        self._syncing: Optional[Future] = None
+        self._lock = threading.Lock()
+
+    def revoke(self, jti: str, expires: float):
+        with self._lock:
+            self._revoked[jti] = expires
+        self.state.set_later(REVOKED_NAMESPACE, jti, expires, ttl=max(0.0, expires - time.time()))
+        self._prune()
+
+    def is_revoked(self, jti: str) -> bool:
+        self._sync()
+        return jti in self._revoked
+
+    def _sync(self):
+        """Start reading newer revocations in the background; the mirror takes them in when done."""
+        now = time.monotonic()
+        if now < self._next_sync or (self._syncing is not None and not self._syncing.done()):
+            return
+        self._next_sync = now + self.sync_interval
+        self._syncing = self.state.submit(self.state.changes, REVOKED_NAMESPACE, self._cursor)
+        self._syncing.add_done_callback(self._merge)
+
+    def _merge(self, future: Future):
+        try:
+            changes, cursor = future.result()
+        except Exception as e:
+            # Keep serving from the mirror; the next sync picks up what was missed
+            print(f"Revocation sync failed: {e}")
+            return
+        with self._lock:
+            for jti, expires in changes:
+                self._revoked[jti] = expires
+            self._cursor = cursor
+        self._prune()
+
+    def _prune(self):
+        now = time.time()
+        if now < self._next_prune:
+            return
+        with self._lock:
+            self._revoked = {jti: expires for jti, expires in self._revoked.items() if expires > now}
+        self._next_prune = now + 60
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+
+class TokenCache:
+    """LRU of token -> (profile, jti, exp). Entries are dropped at the token's exp."""
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, str, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[Tuple[Any, str, float]]:
+        entry = self._entries.get(token)
+        if entry is None or entry[2] <= time.time():
+            if entry is not None:
+                del self._entries[token]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return entry
+
+    def set(self, token: str, profile: Any, jti: str, expires: float):
+        self._entries[token] = (profile, jti, expires)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, token: str):
+        self._entries.pop(token, None)
+
+    def stats(self) -> Dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Shared instances for the auth router
+token_cache = TokenCache()
+revoked_tokens = RevocationList()
+
+registry.collector(
+    "token_cache_lookups_total", "Verified-token cache lookups by result", "counter",
+    lambda: [("", {"result": "hit"}, token_cache.hits), ("", {"result": "miss"}, token_cache.misses)]
+)
+registry.collector(
+    "token_cache_entries", "Tokens held in the verified-token cache", "gauge",
+    lambda: [("", {}, token_cache.stats()["entries"])]
+)
@@ -0,0 +1,133 @@
+"""
+User Store - Persistent user accounts for auth
+SQLite in WAL mode with a unique email index, so lookups are B-tree searches
+and several uvicorn workers can share one database file.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".data", "users.sqlite3")
+USER_DB_PATH = os.getenv("USER_DB_PATH", DEFAULT_PATH)
+# Connections shared by the threadpool; WAL lets readers run alongside one writer
+USER_DB_POOL_SIZE = int(os.getenv("USER_DB_POOL_SIZE", "4"))
+
+COLUMNS = (
+    "id", "email", "name", "password",
+    "programming_experience", "hardware_experience", "primary_interest", "created_at",
+)
+
+# Statements are fixed strings, so each pooled connection prepares them once
+# and reuses them from its statement cache
+SELECT_BY_ID = f"SELECT {', '.join(COLUMNS)} FROM users WHERE id = ?"
+SELECT_BY_EMAIL = f"SELECT {', '.join(COLUMNS)} FROM users WHERE email = ?"
+INSERT_USER = f"INSERT INTO users ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+COUNT_USERS = "SELECT COUNT(*) FROM users"
+
+
+class EmailTakenError(Exception):
+    """A user with this email already exists."""
+
+
+class UserStore:
+    """
+    Users keyed by id with a unique index on email. Blocking SQLite calls run
+    in the threadpool, each on a connection checked out of a fixed-size pool.
+    """
+
+    def __init__(self, path: str = USER_DB_PATH, pool_size: int = USER_DB_POOL_SIZE):
+        self.path = path
+        self.pool_size = pool_size
+        self._pool: Optional["queue.Queue[sqlite3.Connection]"] = None
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _open(self) -> "queue.Queue[sqlite3.Connection]":
+        with self._lock:
+            if self._pool is not None:
+                return self._pool
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+            for _ in range(self.pool_size):
+                conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0, cached_statements=64)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                self._connections.append(conn)
+                pool.put(conn)
+            conn = self._connections[0]
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                "id TEXT PRIMARY KEY, email TEXT NOT NULL, name TEXT NOT NULL, password TEXT NOT NULL, "
+                "programming_experience TEXT NOT NULL, hardware_experience TEXT NOT NULL, "
+                "primary_interest TEXT NOT NULL, created_at TEXT NOT NULL)"
+            )
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS users_email ON users (email)")
+            conn.commit()
+            self._pool = pool
+            return pool
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        pool = self._open()
+        conn = pool.get()
+        try:
+            yield conn
+        finally:
+            pool.put(conn)
+
+    def _fetch(self, sql: str, value: str) -> Optional[Dict]:
+        with self._connection() as conn:
+            row = conn.execute(sql, (value,)).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def get_sync(self, user_id: str) -> Optional[Dict]:
+        return self._fetch(SELECT_BY_ID, user_id)
+
+    def get_by_email_sync(self, email: str) -> Optional[Dict]:
+        return self._fetch(SELECT_BY_EMAIL, email)
+
+    def create_sync(self, user: Dict):
+        with self._connection() as conn:
+            try:
+                conn.execute(INSERT_USER, tuple(user[column] for column in COLUMNS))
+                conn.commit()
+            except sqlite3.IntegrityError as e:
+                conn.rollback()
+                raise EmailTakenError(user["email"]) from e
+
+    def create_many_sync(self, users: Iterable[Dict]):
+        """Bulk insert in one transaction (imports and benchmarks)."""
+        with self._connection() as conn:
+            conn.executemany(INSERT_USER, (tuple(user[column] for column in COLUMNS) for user in users))
+            conn.commit()
+
+    def count_sync(self) -> int:
+        with self._connection() as conn:
+            return conn.execute(COUNT_USERS).fetchone()[0]
+
+    async def get(self, user_id: str) -> Optional[Dict]:
+        return await run_in_threadpool(self.get_sync, user_id)
+
+    async def get_by_email(self, email: str) -> Optional[Dict]:
+        return await run_in_threadpool(self.get_by_email_sync, email)
+
+    async def create(self, user: Dict):
+        """Insert a user; raises EmailTakenError if the email is registered."""
+        await run_in_threadpool(self.create_sync, user)
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+            self._pool = None
+
+
+# Shared store for the auth router
+user_store = UserStore()
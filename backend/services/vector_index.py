@@ -0,0 +1,169 @@
+"""
+Vector Index - Offline dense retrieval with a hashed TF-IDF projection
+No network or model download: features are hashed into a fixed-size float32 space
+"""
+
+import json
+import os
+import zlib
+from collections import Counter
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.search_index import tokenize
+
+DEFAULT_DIM = int(os.getenv("RAG_VECTOR_DIM", "128"))
+CHAR_NGRAM = 4
+# Sub-word features help paraphrases match ("simulate" vs "simulation")
+CHAR_NGRAM_WEIGHT = 0.5
+
+
+def _features(text: str) -> Counter:
+    features: Counter = Counter()
+    for token in tokenize(text):
+        features["w:" + token] += 1.0
+        padded = f"<{token}>"
+        for i in range(max(1, len(padded) - CHAR_NGRAM + 1)):
+            features["c:" + padded[i:i + CHAR_NGRAM]] += CHAR_NGRAM_WEIGHT
+    return features
+
+
+def _bucket(feature: str, dim: int) -> Tuple[int, float]:
+    digest = zlib.crc32(feature.encode("utf-8"))
+    return digest % dim, (1.0 if (digest >> 31) & 1 else -1.0)
+
+
+class HashingEmbedder:
+    """
+    Signed feature hashing of words and character n-grams, weighted by IDF.
+    `fit` learns per-bucket document frequencies from the corpus.
+    """
+
+    def __init__(self, dim: int = DEFAULT_DIM, idf: Optional[np.ndarray] = None):
+        self.dim = dim
+        self.idf = idf if idf is not None else np.ones(dim, dtype=np.float32)
+
+    def _raw(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in _features(text).items():
+            position, sign = _bucket(feature, self.dim)
+            vector[position] += sign * (1.0 + np.log(weight))
+        return vector
+
+    def fit(self, texts: Sequence[str]) -> "HashingEmbedder":
+        document_frequency = np.zeros(self.dim, dtype=np.float32)
+        for text in texts:
+            buckets = {_bucket(feature, self.dim)[0] for feature in _features(text)}
+            document_frequency[list(buckets)] += 1
+        self.idf = np.log((1 + len(texts)) / (1 + document_frequency)).astype(np.float32) + 1.0
+        return self
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = self._raw(text) * self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_many(self, texts: Iterable[str]) -> np.ndarray:
+        rows = [self.embed(text) for text in texts]
+        if not rows:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.ascontiguousarray(np.vstack(rows), dtype=np.float32)
+
+
+class VectorIndex:
+    """
+    Row-normalized float32 matrix of document vectors.
+    Scoring a query is a single matrix-vector product.
+    Rows can be replaced, appended or cleared in place; the IDF weights fitted
+    at build time are kept for incremental updates.
+    """
+
+    def __init__(self, ids: List[Optional[str]], matrix: np.ndarray, embedder: HashingEmbedder):
+        self.ids = ids
+        self.matrix = matrix
+        self.embedder = embedder
+        self.positions = {doc_id: i for i, doc_id in enumerate(ids) if doc_id is not None}
+        self._free = [i for i, doc_id in enumerate(ids) if doc_id is None]
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Tuple[str, str]], dim: int = DEFAULT_DIM) -> "VectorIndex":
+        """Build an index from (doc_id, text) pairs."""
+        documents = list(documents)
+        texts = [text for _, text in documents]
+        embedder = HashingEmbedder(dim).fit(texts)
+        return cls([doc_id for doc_id, _ in documents], embedder.embed_many(texts), embedder)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def _writable(self):
+        # A memory-mapped artifact is read-only; copy it on the first update
+        if not self.matrix.flags.writeable:
+            self.matrix = np.array(self.matrix, dtype=np.float32)
+
+    def upsert(self, doc_id: str, text: str):
+        """Insert or replace one document's vector."""
+        self._writable()
+        vector = self.embedder.embed(text)
+        position = self.positions.get(doc_id)
+        if position is None:
+            if not self._free:
+                self._grow()
+            position = self._free.pop()
+        self.ids[position] = doc_id
+        self.matrix[position] = vector
+        self.positions[doc_id] = position
+
+    def _grow(self):
+        """Double the row capacity so appends cost amortized O(dim)."""
+        rows = len(self.ids)
+        extra = max(16, rows)
+        self.matrix = np.vstack([self.matrix, np.zeros((extra, self.embedder.dim), dtype=np.float32)])
+        self.ids.extend([None] * extra)
+        self._free.extend(reversed(range(rows, rows + extra)))
+
+    def remove(self, doc_id: str):
+        """Clear a document's row; a zero row never scores above zero."""
+        position = self.positions.pop(doc_id, None)
+        if position is None:
+            return
+        self._writable()
+        self.matrix[position] = 0.0
+        self.ids[position] = None
+        self._free.append(position)
+
+    def scores(self, query: str) -> np.ndarray:
+        """Cosine similarity of the query against every row."""
+        return self.matrix @ self.embedder.embed(query)
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        return top_k(self.ids, self.scores(query), limit)
+
+    def save(self, directory: str):
+        """Write the matrix as .npy (memory-mappable) plus ids and IDF weights."""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "vectors.npy"), self.matrix)
+        np.save(os.path.join(directory, "idf.npy"), self.embedder.idf)
+        with open(os.path.join(directory, "ids.json"), "w", encoding="utf-8") as f:
+            json.dump(self.ids, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "VectorIndex":
+        matrix = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r" if mmap else None)
+        idf = np.load(os.path.join(directory, "idf.npy"))
+        with open(os.path.join(directory, "ids.json"), encoding="utf-8") as f:
+            ids = json.load(f)
+        return cls(ids, matrix, HashingEmbedder(matrix.shape[1], idf))
+
+
+def top_k(ids: List[str], scores: np.ndarray, limit: int) -> List[Tuple[str, float]]:
+    """Best `limit` (id, score) pairs with positive scores, using a partial sort."""
+    if limit <= 0 or len(scores) == 0:
+        return []
+    if limit < len(scores):
+        candidates = np.argpartition(-scores, limit - 1)[:limit]
+    else:
+        candidates = np.arange(len(scores))
+    candidates = candidates[np.argsort(-scores[candidates])]
+    return [(ids[i], float(scores[i])) for i in candidates if scores[i] > 0]
@@ -0,0 +1,16 @@
+from services.answer_cache import AnswerCache, answer_scope, normalize_question
+
+
+def test_normalize_keeps_question_words():
+    assert normalize_question("  Why use URDF?! ") == "why use urdf"
+    assert normalize_question("How do I use URDF?") == "how do i use urdf"
+
+
+def test_different_question_words_miss_each_other():
+    cache = AnswerCache()
+    scope = answer_scope(["ch1"], "english", None)
+    cache.set("Why use URDF?", scope, "because")
+
+    assert cache.get("How do I use URDF?", scope) is None
+    assert cache.get("What is URDF used for?", scope) is None
+    assert cache.get("why use URDF", scope) == "because"
@@ -10,6 +10,8 @@ interface Message {
   content: string;
   translatedContent?: string;
   isTranslating?: boolean;
+  // Set when the stream failed after part of the answer was shown
+  incompleteReason?: string;
   sources?: Array<{
     chapter: string;
     title: string;
@@ -211,10 +213,14 @@ export function ChatWidget() {
     setInput("");
     setIsLoading(true);
 
+    const pendingId = `pending-${Date.now()}`;
+    const updateAssistant = (update: (message: Message) => Message) =>
+      setMessages((prev) => prev.map((m) => (m.id === pendingId ? update(m) : m)));
+
     try {
       const apiUrl = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
       const response = await fetch(
-        `${apiUrl}/api/chat/`,
+        `${apiUrl}/api/chat/stream`,
         {
           method: "POST",
           headers: { "Content-Type": "application/json" },
@@ -225,18 +231,42 @@ export function ChatWidget() {
         }
       );
 
-      if (!response.ok) throw new Error("Failed to get response");
+      if (!response.ok || !response.body) throw new Error("Failed to get response");
 
-      const data = await response.json();
+      setMessages((prev) => [...prev, { id: pendingId, role: "assistant", content: "" }]);
+      setIsLoading(false);
 
-      const assistantMessage: Message = {
-        id: data.message_id,
-        role: "assistant",
-        content: data.answer,
-        sources: data.sources,
-      };
+      // Parse server-sent events: sources, token..., error?, done
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split("\n\n");
+        buffer = events.pop() || "";
+        for (const raw of events) {
+          const event = raw.match(/^event: (.*)$/m)?.[1];
+          const data = raw.match(/^data: (.*)$/m)?.[1];
+          if (!event || !data) continue;
+          const payload = JSON.parse(data);
+          if (event === "sources") {
+            updateAssistant((m) => ({ ...m, sources: payload.sources }));
+          } else if (event === "token") {
+            updateAssistant((m) => ({ ...m, content: m.content + payload.text }));
+          } else if (event === "error") {
+            updateAssistant((m) =>
+              m.content
+                ? { ...m, incompleteReason: payload.detail }
+                : { ...m, content: payload.detail }
+            );
+          } else if (event === "done") {
+            updateAssistant((m) => ({ ...m, id: payload.message_id }));
+          }
+        }
+      }
 
-      setMessages((prev) => [...prev, assistantMessage]);
       setSelectedText("");
     } catch {
       setMessages((prev) => [
@@ -373,6 +403,13 @@ export function ChatWidget() {
                           : message.content}
                       </p>
 
+                      {/* Marker for an answer cut short by a generation error */}
+                      {message.incompleteReason && (
+                        <p className="mt-2 text-xs text-red-600" title={message.incompleteReason}>
+                          This answer is incomplete: generation failed partway through. Please try again.
+                        </p>
+                      )}
+
                       {/* Translation Button for Assistant Messages */}
                       {message.role === "assistant" && message.id !== "welcome" && (
                         <div className="mt-2 pt-2 border-t border-gray-300">